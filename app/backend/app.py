@@ -19,6 +19,13 @@ load_dotenv(env_path)
 def create_app():
     app = Flask(__name__)
     
+    # Serialize ObjectId and datetime natively in every JSON response
+    try:
+        from backend.json_provider import MongoJSONProvider
+    except ImportError:
+        from json_provider import MongoJSONProvider
+    app.json = MongoJSONProvider(app)
+    
     # Configuration
     jwt_secret = os.getenv('JWT_SECRET_KEY')
     if not jwt_secret:
@@ -26,6 +33,14 @@ def create_app():
     app.config['JWT_SECRET_KEY'] = jwt_secret
     # Set token expiration to 24 hours for security
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 86400  # 24 hours in seconds
+    # Number of documents fetched per Mongo round trip when streaming exports
+    app.config['EXPORT_BATCH_SIZE'] = int(os.getenv('EXPORT_BATCH_SIZE', 500))
+    # Delta sync re-sends changes this recent, covering writes still in flight
+    app.config['SYNC_SAFETY_WINDOW_MS'] = int(os.getenv('SYNC_SAFETY_WINDOW_MS', 2000))
+    # Server-Sent Events: keepalive interval and maximum stream lifetime in seconds
+    app.config['EVENTS_HEARTBEAT_SECONDS'] = float(os.getenv('EVENTS_HEARTBEAT_SECONDS', 15))
+    app.config['EVENTS_MAX_STREAM_SECONDS'] = float(os.getenv('EVENTS_MAX_STREAM_SECONDS', 300))
+    app.config['EVENTS_TOKEN_SECONDS'] = int(os.getenv('EVENTS_TOKEN_SECONDS', 60))
     
     # Initialize extensions
     # CORS configuration - restrict to specific origins in production
@@ -39,7 +54,27 @@ def create_app():
     CORS(app, 
          resources={r"/api/*": {"origins": allowed_origins}},
          supports_credentials=True)
-    JWTManager(app)
+    # Verified tokens are cached so hot endpoints skip signature checks
+    try:
+        from backend.jwt_cache import JWT_CACHE_SIZE, CachingJWTManager
+    except ImportError:
+        from jwt_cache import JWT_CACHE_SIZE, CachingJWTManager
+    jwt = CachingJWTManager(app) if JWT_CACHE_SIZE > 0 else JWTManager(app)
+    
+    # Sampled and on-demand cProfile dumps, and a log of requests slower than
+    # SLOW_REQUEST_MS with their MongoDB commands. Registered before the other
+    # hooks so its timing covers them
+    try:
+        from backend.profiling import PROFILE_DEFAULT_DIR, register_profiling
+    except ImportError:
+        from profiling import PROFILE_DEFAULT_DIR, register_profiling
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+    app.config['PROFILE_TOKEN'] = os.getenv('PROFILE_TOKEN', '')
+    app.config['PROFILE_DIR'] = os.getenv('PROFILE_DIR') or PROFILE_DEFAULT_DIR
+    app.config['SLOW_REQUEST_MS'] = float(os.getenv('SLOW_REQUEST_MS', 0))
+    if (app.config['PROFILE_SAMPLE_RATE'] > 0 or app.config['PROFILE_TOKEN']
+            or app.config['SLOW_REQUEST_MS'] > 0):
+        register_profiling(app)
     
     # Register blueprints
     # In Docker, files are in /app, not /app/backend
@@ -54,11 +89,96 @@ def create_app():
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(todos_bp, url_prefix='/api/todos')
     
+    # Index management: `flask indexes ensure|check` and optional startup bootstrap
+    try:
+        from backend import models
+        from backend.indexes import ensure_indexes, indexes_cli
+        from backend.sharding import RingMismatch, register_ring_check, shards_cli
+        from backend.archive import ARCHIVE_JOB_ENABLED, ArchiveJob, archive_command
+    except ImportError:
+        import models
+        from indexes import ensure_indexes, indexes_cli
+        from sharding import RingMismatch, register_ring_check, shards_cli
+        from archive import ARCHIVE_JOB_ENABLED, ArchiveJob, archive_command
+    app.cli.add_command(indexes_cli)
+    app.cli.add_command(shards_cli)
+    # With MONGO_SHARDS, refuse API requests until users are placed by the configured ring
+    register_ring_check(app, models.db)
+    app.cli.add_command(archive_command)
+    
+    # Startup work that talks to MongoDB. With LAZY_STARTUP it runs in the
+    # background and /ready answers 503 until it is done; otherwise create_app
+    # waits for it as before
+    try:
+        from backend.startup import READINESS_TIMEOUT_MS, Startup, ping
+    except ImportError:
+        from startup import READINESS_TIMEOUT_MS, Startup, ping
+    lazy_startup = os.getenv('LAZY_STARTUP', 'false').lower() == 'true'
+    startup = Startup(app.logger)
+    if lazy_startup:
+        # Open the connection pools before the first request needs them
+        startup.add('warmup', lambda: ping(models.db.databases()))
+    if os.getenv('ENSURE_INDEXES_ON_STARTUP', 'true').lower() == 'true':
+        def bootstrap_indexes():
+            for database in models.db.databases():
+                ensure_indexes(database)
+        startup.add('indexes', bootstrap_indexes)
+    app.extensions['startup'] = startup
+    startup.run(background=lazy_startup)
+    
+    # Move old completed todos to todos_archive in the background
+    if ARCHIVE_JOB_ENABLED:
+        app.extensions['archive_job'] = ArchiveJob()
+        app.extensions['archive_job'].start()
+    
+    # Prometheus metrics at /metrics
+    if os.getenv('METRICS_ENABLED', 'true').lower() == 'true':
+        try:
+            from backend.metrics import (
+                pool_stats_collector, register_metrics, registry, token_cache_collector
+            )
+        except ImportError:
+            from metrics import pool_stats_collector, register_metrics, registry, token_cache_collector
+        app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN', '')
+        register_metrics(app)
+        registry.set_collector('mongo_pool', pool_stats_collector(models.client_factory))
+        if isinstance(jwt, CachingJWTManager):
+            registry.set_collector('jwt_cache', token_cache_collector(jwt.token_cache))
+    
+    # gzip/brotli response compression above COMPRESSION_MIN_SIZE
+    if os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true':
+        try:
+            from backend.compression import register_compression
+        except ImportError:
+            from compression import register_compression
+        register_compression(app)
+    
     # Health check endpoint
     @app.route('/')
     def health_check():
         return jsonify({'status': 'ok', 'message': 'Backend is running'}), 200
     
+    # Readiness probe: startup work is done and MongoDB answers
+    @app.route('/ready')
+    def readiness_check():
+        checks = dict(startup.results)
+        if not startup.finished.is_set():
+            return jsonify({'status': 'starting', 'checks': checks}), 503
+        try:
+            ping(models.db.databases(), timeout_ms=READINESS_TIMEOUT_MS)
+        except Exception:
+            checks['mongo'] = 'unavailable'
+            return jsonify({'status': 'unavailable', 'checks': checks}), 503
+        checks['mongo'] = 'ok'
+        if models.db.router is not None:
+            try:
+                models.db.router.check_layout()
+            except RingMismatch:
+                checks['shards'] = 'rebalancing'
+                return jsonify({'status': 'unavailable', 'checks': checks}), 503
+            checks['shards'] = 'ok'
+        return jsonify({'status': 'ready', 'checks': checks}), 200
+    
     return app
 
 if __name__ == '__main__':
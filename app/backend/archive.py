@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+import logging
+import os
+import threading
+import click
+
+# Completed todos untouched for this many days move to `todos_archive`
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 365))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 500))
+# Run the archival job in the background of each app process
+ARCHIVE_JOB_ENABLED = os.getenv('ARCHIVE_JOB_ENABLED', 'false').lower() == 'true'
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv('ARCHIVE_INTERVAL_SECONDS', 3600))
+
+logger = logging.getLogger(__name__)
+
+
+def _models():
+    try:
+        from backend import models
+    except ImportError:
+        import models
+    return models
+
+
+def run_archival(database, days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, stop=None):
+    """Archive batches until nothing old enough is left; returns the total moved"""
+    if database.router is not None:
+        # Mid-rebalance a user's documents may not be on the shard the ring names
+        database.router.check_layout()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    total = 0
+    while stop is None or not stop.is_set():
+        moved = database.archive_completed_todos(cutoff, batch_size)
+        total += moved
+        # A batch can move nothing when all of it changed meanwhile; more may still be waiting
+        if not moved and not database.has_archivable_todos(cutoff):
+            break
+    return total
+
+
+class ArchiveJob:
+    """Periodically archive old completed todos in a daemon thread.
+
+    Safe to run in several processes at once: archival is idempotent.
+    """
+
+    def __init__(self, interval=ARCHIVE_INTERVAL_SECONDS, days=ARCHIVE_AFTER_DAYS,
+                 batch_size=ARCHIVE_BATCH_SIZE):
+        self.interval = interval
+        self.days = days
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='todo-archiver', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                moved = run_archival(_models().db, self.days, self.batch_size, stop=self._stop)
+                if moved:
+                    logger.info('Archived %d completed todos', moved)
+            except Exception as e:
+                logger.warning('Todo archival failed: %s', e)
+            self._stop.wait(self.interval)
+
+
+@click.command('archive')
+@click.option('--days', default=ARCHIVE_AFTER_DAYS, show_default=True,
+              help='Archive completed todos not updated for this many days')
+@click.option('--batch-size', default=ARCHIVE_BATCH_SIZE, show_default=True)
+def archive_command(days, batch_size):
+    """Move old completed todos into todos_archive"""
+    moved = run_archival(_models().db, days, batch_size)
+    click.echo(f'Archived {moved} todos')
@@ -0,0 +1,64 @@
+"""ASGI entry point serving the same Flask app and blueprints.
+
+An adapter only: request handling and MongoDB access stay synchronous.
+
+Run with any ASGI server that supports app factories, e.g.:
+    uvicorn --factory asgi:create_asgi_app --workers 2
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+try:
+    from backend.app import create_app
+except ImportError:
+    from app import create_app
+
+# Requests handled concurrently by one process
+ASYNC_MAX_INFLIGHT = int(os.getenv('ASYNC_MAX_INFLIGHT', 64))
+
+
+class ConcurrentWsgiToAsgi(WsgiToAsgi):
+    """Adapt a WSGI app to ASGI with many requests in flight per process.
+
+    This is an adapter only: views and pymongo calls stay synchronous and
+    each request runs on a worker thread. Plain WsgiToAsgi runs every
+    request on one shared thread; a ThreadSensitiveContext per request
+    gives each its own, and a semaphore bounds how many run at once.
+    """
+
+    def __init__(self, wsgi_application, max_inflight=ASYNC_MAX_INFLIGHT):
+        super().__init__(wsgi_application)
+        self.max_inflight = max_inflight
+        self._slots = None
+        self._loop = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            # No startup work beyond create_app; acknowledge the protocol
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A semaphore belongs to one event loop
+            self._slots = asyncio.Semaphore(self.max_inflight)
+            self._loop = loop
+        async with self._slots:
+            async with ThreadSensitiveContext():
+                await super().__call__(scope, receive, send)
+
+
+def create_asgi_app(flask_app=None, max_inflight=ASYNC_MAX_INFLIGHT):
+    return ConcurrentWsgiToAsgi(flask_app or create_app(), max_inflight=max_inflight)
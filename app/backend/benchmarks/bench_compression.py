@@ -0,0 +1,67 @@
+"""Compare CPU time against response size for gzip and brotli levels.
+
+Compresses the JSON for a page of todos and for a full NDJSON export and
+reports, per level, the compression time, output size and ratio.
+
+Run from app/backend:
+    python -m benchmarks.bench_compression
+"""
+import os
+import sys
+import time
+from pathlib import Path
+from flask import Flask
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.benchmarks.bench_json import make_todos  # noqa: E402
+from backend.compression import BrotliCompressor, GzipCompressor, brotli  # noqa: E402
+from backend.json_provider import MongoJSONProvider  # noqa: E402
+
+TODO_COUNT = int(os.getenv('BENCH_TODO_COUNT', 10000))
+ROUNDS = int(os.getenv('BENCH_ROUNDS', 5))
+GZIP_LEVELS = (1, 3, 6, 9)
+# Quality 11 takes seconds per megabyte and is only suited to static assets
+BROTLI_QUALITIES = (1, 4, 6, 9)
+
+
+def payloads():
+    provider = MongoJSONProvider(Flask(__name__))
+    todos = make_todos(TODO_COUNT)
+    page = provider.dumps({'todos': todos[:200], 'next_cursor': None}).encode('utf-8')
+    export = ''.join(provider.dumps(todo) + '\n' for todo in todos).encode('utf-8')
+    return {'page of 200': page, f'export of {TODO_COUNT}': export}
+
+
+def measure(make_compressor, data):
+    best = float('inf')
+    size = 0
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        compressor = make_compressor()
+        size = len(compressor.compress(data) + compressor.finish())
+        best = min(best, time.perf_counter() - start)
+    return best, size
+
+
+def main():
+    print(f'Best of {ROUNDS} rounds')
+    print(f"{'payload':<16} {'codec':<10} {'ms':>9} {'MB/s':>8} {'bytes':>10} {'ratio':>7}")
+    for name, data in payloads().items():
+        print(f"{name:<16} {'identity':<10} {0:>9.2f} {'-':>8} {len(data):>10} {1:>7.2f}")
+        codecs = [(f'gzip-{level}', lambda level=level: GzipCompressor(level)) for level in GZIP_LEVELS]
+        if brotli is not None:
+            codecs += [(f'br-{quality}', lambda quality=quality: BrotliCompressor(quality))
+                       for quality in BROTLI_QUALITIES]
+        for codec, make_compressor in codecs:
+            seconds, size = measure(make_compressor, data)
+            print(f'{name:<16} {codec:<10} {seconds * 1000:>9.2f} {len(data) / seconds / 1e6:>8.1f} '
+                  f'{size:>10} {len(data) / size:>7.2f}')
+    if brotli is None:
+        print('brotli levels skipped, Brotli not installed')
+
+
+if __name__ == '__main__':
+    main()
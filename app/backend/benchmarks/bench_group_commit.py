@@ -0,0 +1,85 @@
+"""Inserts per second for Database.create_todo with and without group commit.
+
+Concurrent threads create todos as fast as they can. Against mongomock every
+write waits for a simulated commit (BENCH_COMMIT_MS) and commits are taken
+one at a time, as a write-bound primary would; set BENCH_MONGODB_URI to use
+a local mongod instead. Each create also bumps the user's version with its
+own write, so grouping inserts can at most halve the commits per create.
+
+Run from app/backend:
+    python -m benchmarks.bench_group_commit
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import time
+from benchmarks.common import BENCH_MONGODB_URI, setup_database
+
+import backend.models as models  # noqa: E402  (after benchmarks.common sets up sys.path)
+from backend.group_commit import GroupCommitBuffer  # noqa: E402
+
+COMMIT_MS = float(os.getenv('BENCH_COMMIT_MS', 1))
+INSERTS = int(os.getenv('BENCH_INSERTS', 2000))
+CONCURRENCY_LEVELS = [int(c) for c in os.getenv('BENCH_CONCURRENCY', '1,8,32,64').split(',')]
+
+WRITE_METHODS = {'insert_one', 'insert_many', 'update_one', 'find_one_and_update', 'bulk_write', 'delete_one'}
+
+
+def add_commit_latency(database, commit_seconds):
+    """Make every write wait for its own commit, one commit at a time"""
+    commit_lock = threading.Lock()
+
+    class CommittingCollection:
+        def __init__(self, collection):
+            self._collection = collection
+
+        def __getattr__(self, name):
+            attr = getattr(self._collection, name)
+            if name not in WRITE_METHODS:
+                return attr
+
+            def call(*args, **kwargs):
+                result = attr(*args, **kwargs)
+                with commit_lock:
+                    time.sleep(commit_seconds)
+                return result
+            return call
+
+    database.users = CommittingCollection(models.users_collection)
+    database.todos = CommittingCollection(models.todos_collection)
+
+
+def run(database, concurrency):
+    per_thread = INSERTS // concurrency
+
+    def worker(n):
+        for i in range(per_thread):
+            database.create_todo(f'bench{n % 8}', f'Todo {i}')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return per_thread * concurrency / elapsed
+
+
+def main():
+    backend_label = setup_database()
+    for n in range(8):
+        models.db.create_user(f'bench{n}', 'hash')
+    if not BENCH_MONGODB_URI:
+        add_commit_latency(models.db, COMMIT_MS / 1000)
+
+    print(f'Backend: {backend_label}, {INSERTS} creates per run')
+    print(f"{'threads':>8} {'insert_one/s':>14} {'grouped/s':>12} {'speedup':>8}")
+    for concurrency in CONCURRENCY_LEVELS:
+        models.db.write_buffer = None
+        single = run(models.db, concurrency)
+        models.db.write_buffer = GroupCommitBuffer()
+        grouped = run(models.db, concurrency)
+        print(f'{concurrency:>8} {single:>14,.0f} {grouped:>12,.0f} {grouped / single:>7.2f}x')
+    models.db.write_buffer = None
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Compare JSON serialization throughput for a list of 10k todos.
+
+Run from app/backend:
+    python -m benchmarks.bench_json
+"""
+from datetime import datetime, timezone
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from bson import ObjectId
+from flask import Flask
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.json_provider import MongoJSONProvider, orjson  # noqa: E402
+
+TODO_COUNT = int(os.getenv('BENCH_TODO_COUNT', 10000))
+ROUNDS = int(os.getenv('BENCH_ROUNDS', 5))
+
+
+def make_todos(count):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return [{
+        '_id': ObjectId(),
+        'username': 'benchuser',
+        'title': f'Todo {i}',
+        'description': 'x' * 200,
+        'completed': i % 3 == 0,
+        'created_at': now,
+        'updated_at': now
+    } for i in range(count)]
+
+
+def legacy(todos):
+    """The per-route conversion loop the routes used before the JSON provider"""
+    converted = []
+    for todo in todos:
+        todo = dict(todo)
+        todo['_id'] = str(todo['_id'])
+        todo['created_at'] = todo['created_at'].isoformat()
+        todo['updated_at'] = todo['updated_at'].isoformat()
+        converted.append(todo)
+    return json.dumps({'todos': converted}, separators=(',', ':'), sort_keys=True)
+
+
+def measure(name, fn, todos):
+    fn(todos)  # warm up
+    best = float('inf')
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn(todos)
+        best = min(best, time.perf_counter() - start)
+    print(f'{name:<24} {best * 1000:8.1f} ms   {len(todos) / best:12,.0f} todos/s')
+
+
+def main():
+    todos = make_todos(TODO_COUNT)
+    provider = MongoJSONProvider(Flask(__name__))
+
+    print(f'Serializing {TODO_COUNT} todos, best of {ROUNDS} rounds')
+    measure('legacy loop + json', legacy, todos)
+
+    provider.fast = False
+    measure('provider (stdlib json)', lambda t: provider.dumps({'todos': t}, separators=(',', ':')), todos)
+
+    if orjson is not None:
+        provider.fast = True
+        measure('provider (orjson)', lambda t: provider.dumps({'todos': t}, separators=(',', ':')), todos)
+    else:
+        print('provider (orjson)        skipped, orjson not installed')
+
+
+if __name__ == '__main__':
+    main()
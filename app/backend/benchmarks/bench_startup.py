@@ -0,0 +1,124 @@
+"""Measure cold-start cost: importing backend.app, create_app() and time to ready.
+
+Every run is a fresh interpreter, so module caches from earlier runs do not
+help. Compares the default startup (index bootstrap inside create_app) with
+LAZY_STARTUP=true (startup work in a background thread). Runs against
+mongomock by default, or a local mongod when BENCH_MONGODB_URI is set; only
+mongod shows the cost of the round trips the lazy path moves out of
+create_app.
+
+Run from app/backend:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --importtime   # slowest imports of the backend
+"""
+from statistics import median
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RUNS = int(os.getenv('BENCH_STARTUP_RUNS', 5))
+# How long a run waits for /ready before giving up
+READY_TIMEOUT_SECONDS = 30
+
+# Executed in the child interpreter; prints one JSON line of timings in ms
+CHILD = f'''
+import json, sys, time
+sys.path.append({str(BACKEND_DIR.parent)!r})
+start = time.perf_counter()
+import backend.app
+imported = time.perf_counter()
+# Blueprints, models and pymongo are imported by create_app; timed on their own
+import backend.models
+models_imported = time.perf_counter()
+from benchmarks.common import setup_database
+setup_database()
+created_start = time.perf_counter()
+app = backend.app.create_app()
+created = time.perf_counter()
+client = app.test_client()
+client.get('/')
+first_request = time.perf_counter()
+while client.get('/ready').status_code != 200:
+    if time.perf_counter() - created_start > {READY_TIMEOUT_SECONDS}:
+        raise SystemExit('backend did not become ready')
+    time.sleep(0.001)
+ready = time.perf_counter()
+print(json.dumps({{
+    'import': (imported - start) * 1000,
+    'models': (models_imported - imported) * 1000,
+    'create_app': (created - created_start) * 1000,
+    'first_request': (first_request - created_start) * 1000,
+    'ready': (ready - created_start) * 1000
+}}))
+'''
+
+
+def child_env(lazy):
+    env = dict(os.environ)
+    env.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key-at-least-32-bytes')
+    env['LAZY_STARTUP'] = 'true' if lazy else 'false'
+    return env
+
+
+def run_once(lazy):
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD], cwd=BACKEND_DIR, env=child_env(lazy),
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def report(label, runs):
+    timings = {name: median(run[name] for run in runs) for name in runs[0]}
+    print(f"{label:<8} {timings['import']:9.1f} {timings['models']:9.1f} {timings['create_app']:12.1f} "
+          f"{timings['first_request']:15.1f} {timings['ready']:9.1f}")
+
+
+def importtime(limit=15):
+    """Cumulative import time of the modules backend.app and backend.models import directly"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import backend.app, backend.models'],
+        cwd=BACKEND_DIR.parent, env=child_env(lazy=False),
+        capture_output=True, text=True, check=True
+    )
+    modules = []
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        # A module's imports are listed before the module itself
+        if depth == 1:
+            children.append((int(cumulative), name.strip()))
+        elif depth == 0:
+            if name.strip() in ('backend.app', 'backend.models'):
+                modules.extend(children)
+            children = []
+    print('Slowest imports under backend.app and backend.models (cumulative):')
+    for cumulative, name in sorted(modules, reverse=True)[:limit]:
+        print(f'  {name:<32} {cumulative / 1000:8.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--importtime', action='store_true', help='List the slowest imports instead')
+    args = parser.parse_args()
+    if args.importtime:
+        importtime()
+        return
+
+    backend = 'mongod' if os.getenv('BENCH_MONGODB_URI') else 'mongomock'
+    print(f'Startup against {backend}, median of {RUNS} fresh processes (ms; first request and ready '
+          f'are measured from the start of create_app)')
+    print(f"{'mode':<8} {'import':>9} {'models':>9} {'create_app':>12} {'first request':>15} {'ready':>9}")
+    for label, lazy in (('eager', False), ('lazy', True)):
+        report(label, [run_once(lazy) for _ in range(RUNS)])
+
+
+if __name__ == '__main__':
+    main()
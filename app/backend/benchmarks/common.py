@@ -0,0 +1,50 @@
+"""Shared setup for benchmarks: wire the backend to mongomock or a local mongod."""
+import os
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key-at-least-32-bytes')
+
+import backend.models as models  # noqa: E402
+
+# Set BENCH_MONGODB_URI to run against a real mongod instead of mongomock
+BENCH_MONGODB_URI = os.getenv('BENCH_MONGODB_URI')
+
+
+def setup_database():
+    """Point the models at the benchmark database; returns a backend label"""
+    if BENCH_MONGODB_URI:
+        from pymongo import MongoClient
+        client = MongoClient(BENCH_MONGODB_URI)
+        label = 'mongod'
+        database_name = 'todoapp_benchmark'
+        client.drop_database(database_name)
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+        label = 'mongomock'
+        database_name = models.DATABASE_NAME
+    models.client = client
+    models.db_instance = client[database_name]
+    models.users_collection = models.db_instance.users
+    models.todos_collection = models.db_instance.todos
+    models.db = models.Database()
+    return label
+
+
+def create_benchmark_app():
+    """Create the Flask app after the database has been set up"""
+    from backend.app import create_app
+    app = create_app()
+    app.config.update({'TESTING': True})
+    return app
+
+
+def login_headers(client, username='benchuser', password='benchpass123'):
+    client.post('/api/auth/register', json={'username': username, 'password': password})
+    resp = client.post('/api/auth/login', json={'username': username, 'password': password})
+    return {'Authorization': f"Bearer {resp.get_json()['access_token']}"}
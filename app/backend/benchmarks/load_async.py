@@ -0,0 +1,90 @@
+"""Load test: request throughput of the ASGI mode at increasing concurrency.
+
+Each Mongo call gets an artificial delay (BENCH_DB_LATENCY_MS) so the
+in-memory stand-in behaves like a networked database. Set
+BENCH_MONGODB_URI to use a local mongod and its real latency instead.
+
+Run from app/backend:
+    python -m benchmarks.load_async
+"""
+import asyncio
+import os
+import time
+from benchmarks.common import BENCH_MONGODB_URI, create_benchmark_app, login_headers, setup_database
+
+LATENCY_MS = float(os.getenv('BENCH_DB_LATENCY_MS', 5))
+REQUESTS = int(os.getenv('BENCH_REQUESTS', 256))
+CONCURRENCY_LEVELS = [int(c) for c in os.getenv('BENCH_CONCURRENCY', '1,4,16,64').split(',')]
+
+
+def add_latency(database, latency):
+    """Wrap every collection call so it sleeps for one simulated round trip"""
+    import backend.models as models
+
+    class SlowCollection:
+        def __init__(self, collection):
+            self._collection = collection
+
+        def __getattr__(self, name):
+            attr = getattr(self._collection, name)
+            if not callable(attr):
+                return attr
+
+            def call(*args, **kwargs):
+                time.sleep(latency)
+                return attr(*args, **kwargs)
+            return call
+
+    database.users = SlowCollection(models.users_collection)
+    database.todos = SlowCollection(models.todos_collection)
+
+
+def build_scope(path, headers):
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '',
+        'headers': [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        'server': ('benchmark', 80), 'client': ('127.0.0.1', 1),
+    }
+
+
+async def run_level(asgi_app, scope, concurrency, total):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                pass
+            await asgi_app(scope, receive, send)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return time.perf_counter() - start
+
+
+def main():
+    label = setup_database()
+    import backend.models as models
+    from backend.asgi import create_asgi_app
+
+    app = create_benchmark_app()
+    headers = login_headers(app.test_client())
+    for i in range(20):
+        models.db.create_todo('benchuser', f'Todo {i}')
+    if not BENCH_MONGODB_URI:
+        add_latency(models.db, LATENCY_MS / 1000)
+
+    asgi_app = create_asgi_app(app, max_inflight=max(CONCURRENCY_LEVELS))
+    scope = build_scope('/api/todos/', headers)
+    print(f'GET /api/todos/ x {REQUESTS} on {label}, simulated latency {LATENCY_MS} ms')
+    for concurrency in CONCURRENCY_LEVELS:
+        elapsed = asyncio.run(run_level(asgi_app, scope, concurrency, REQUESTS))
+        print(f'concurrency {concurrency:>3}: {REQUESTS / elapsed:8.0f} req/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""Benchmark and load-test suite for the backend API.
+
+Drives create_app() through realistic scenarios and reports throughput
+and p50/p99 latency per endpoint. Runs against mongomock by default, or
+a local mongod when BENCH_MONGODB_URI is set. mongomock ignores indexes,
+so large-list numbers are only meaningful against mongod; baselines are
+stored per backend in benchmarks/baselines/.
+
+Logins use the configured BCRYPT_ROUNDS (production cost by default) from
+concurrent clients. Every run also times a fixed CPU workload, and
+baseline latencies are scaled by how much faster or slower this machine
+runs it before the tolerance is applied, so a baseline recorded on one
+machine can be checked on another. A baseline only applies to the same
+workload: runs with other sizes, concurrency or bcrypt cost are refused.
+
+Run from app/backend:
+    python -m benchmarks.suite                   # run and compare with the stored baseline
+    python -m benchmarks.suite --save-baseline   # record a new baseline
+    python -m benchmarks.suite --scenario large_list
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from statistics import median
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from benchmarks.common import create_benchmark_app, login_headers, setup_database
+
+import backend.models as models  # noqa: E402  (after benchmarks.common sets up sys.path)
+
+BASELINE_DIR = Path(__file__).parent / 'baselines'
+# A p50 or p99 this much slower than the baseline counts as a regression
+REGRESSION_THRESHOLD = float(os.getenv('BENCH_REGRESSION_THRESHOLD', 0.25))
+# Latencies below this are too noisy to compare
+MIN_COMPARABLE_MS = 0.5
+# Slowdowns smaller than this are noise, whatever the ratio
+TOLERANCE_MS = float(os.getenv('BENCH_TOLERANCE_MS', 1.0))
+
+LOGIN_STORM_REQUESTS = int(os.getenv('BENCH_LOGIN_REQUESTS', 200))
+# Clients logging in at once; kept under PASSWORD_POOL_MAX_PENDING so none is turned away
+LOGIN_STORM_CONCURRENCY = int(os.getenv('BENCH_LOGIN_CONCURRENCY', 16))
+LARGE_LIST_TODOS = int(os.getenv('BENCH_LARGE_LIST_TODOS', 10000))
+MIXED_CRUD_ROUNDS = int(os.getenv('BENCH_MIXED_CRUD_ROUNDS', 200))
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def busy_seconds(intervals):
+    """Time during which at least one of the (start, end) intervals was running"""
+    total = 0.0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def calibrate(rounds=5):
+    """Median time in ms of a fixed pure-Python workload, a yardstick for this machine"""
+    payload = [{'title': f'Todo {i}', 'completed': i % 2 == 0, 'tags': list(range(10))} for i in range(5000)]
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        sorted(json.loads(json.dumps(payload)), key=lambda todo: todo['title'])
+        timings.append(time.perf_counter() - start)
+    return round(median(timings) * 1000, 3)
+
+
+def workload():
+    """Parameters a baseline is only valid for"""
+    from backend.passwords import BCRYPT_ROUNDS
+    return {
+        'bcrypt_rounds': BCRYPT_ROUNDS,
+        'login_storm_requests': LOGIN_STORM_REQUESTS,
+        'login_storm_concurrency': LOGIN_STORM_CONCURRENCY,
+        'large_list_todos': LARGE_LIST_TODOS,
+        'mixed_crud_rounds': MIXED_CRUD_ROUNDS
+    }
+
+
+class Recorder:
+    """Time test-client requests and group them by Flask endpoint"""
+
+    def __init__(self, app):
+        self.app = app
+        self.client = app.test_client()
+        self.adapter = app.url_map.bind('localhost')
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, path, client=None, **kwargs):
+        """Time one request; pass a client of your own when calling from several threads"""
+        endpoint, _ = self.adapter.match(path.split('?')[0], method=method)
+        start = time.perf_counter()
+        resp = (client or self.client).open(path, method=method, **kwargs)
+        resp.get_data()  # drain streamed responses
+        end = time.perf_counter()
+        if resp.status_code >= 500:
+            raise RuntimeError(f'{method} {path} failed: {resp.get_data(as_text=True)}')
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((start, end))
+        return resp
+
+    def summary(self):
+        report = {}
+        for endpoint, intervals in sorted(self.samples.items()):
+            samples = [end - start for start, end in intervals]
+            # Wall time spent on the endpoint, so overlapping requests are not counted twice
+            busy = busy_seconds(intervals)
+            report[endpoint] = {
+                'requests': len(samples),
+                'throughput_rps': round(len(samples) / busy, 1) if busy else None,
+                'p50_ms': round(percentile(samples, 0.50) * 1000, 3),
+                'p99_ms': round(percentile(samples, 0.99) * 1000, 3)
+            }
+        return report
+
+
+def login_storm(app, recorder):
+    """Many concurrent logins for a handful of users, as after a deploy or outage"""
+    users = [(f'storm{i}', 'password123') for i in range(10)]
+    for username, password in users:
+        recorder.client.post('/api/auth/register', json={'username': username, 'password': password})
+
+    def worker(offset):
+        client = app.test_client()
+        for i in range(offset, LOGIN_STORM_REQUESTS, LOGIN_STORM_CONCURRENCY):
+            username, password = users[i % len(users)]
+            recorder.request('POST', '/api/auth/login', client=client,
+                             json={'username': username, 'password': password})
+
+    with ThreadPoolExecutor(max_workers=LOGIN_STORM_CONCURRENCY) as executor:
+        # list() re-raises a failure from any worker
+        list(executor.map(worker, range(LOGIN_STORM_CONCURRENCY)))
+
+
+def large_list(app, recorder):
+    """A user with many todos listing, paginating and exporting"""
+    headers = login_headers(recorder.client, 'biglist')
+    start = datetime.now(timezone.utc)
+    models.todos_collection.insert_many([{
+        'username': 'biglist',
+        'title': f'Todo {i}',
+        'description': 'x' * 100,
+        'completed': i % 4 == 0,
+        'created_at': start - timedelta(seconds=i),
+        'updated_at': start - timedelta(seconds=i)
+    } for i in range(LARGE_LIST_TODOS)])
+
+    for _ in range(20):
+        recorder.request('GET', '/api/todos/', headers=headers)
+    cursor = None
+    while True:
+        path = '/api/todos/?limit=200' + (f'&cursor={cursor}' if cursor else '')
+        cursor = recorder.request('GET', path, headers=headers).get_json()['next_cursor']
+        if not cursor:
+            break
+    recorder.request('GET', '/api/todos/export', headers=headers)
+
+
+def mixed_crud(app, recorder):
+    """Create, edit, toggle, list and delete interleaved"""
+    headers = login_headers(recorder.client, 'cruduser')
+    for i in range(MIXED_CRUD_ROUNDS):
+        todo = recorder.request('POST', '/api/todos/', headers=headers,
+                                json={'title': f'Todo {i}', 'description': 'desc'}).get_json()['todo']
+        recorder.request('PUT', f"/api/todos/{todo['_id']}", headers=headers,
+                         json={'title': f'Todo {i} edited'})
+        recorder.request('PATCH', f"/api/todos/{todo['_id']}/toggle", headers=headers)
+        recorder.request('GET', '/api/todos/', headers=headers)
+        if i % 2:
+            recorder.request('DELETE', f"/api/todos/{todo['_id']}", headers=headers)
+
+
+SCENARIOS = {
+    'login_storm': login_storm,
+    'large_list': large_list,
+    'mixed_crud': mixed_crud
+}
+
+
+class WorkloadMismatch(Exception):
+    """The baseline was recorded with different workload parameters"""
+
+
+def compare(run, baseline):
+    """Return a list of human-readable regressions against a baseline.
+
+    Both are {'workload', 'calibration_ms', 'results'} documents. Baseline
+    latencies are scaled by the ratio of the two calibration timings, and
+    a latency is reported only when it exceeds the scaled baseline by more
+    than REGRESSION_THRESHOLD and by more than TOLERANCE_MS.
+    """
+    recorded = baseline.get('workload') or {}
+    differences = [f'{name} {recorded.get(name)} in the baseline, {value} now'
+                   for name, value in sorted(run['workload'].items()) if recorded.get(name) != value]
+    if differences:
+        raise WorkloadMismatch('; '.join(differences))
+    speed = run['calibration_ms'] / baseline['calibration_ms']
+    regressions = []
+    for scenario, endpoints in run['results'].items():
+        for endpoint, stats in endpoints.items():
+            base = baseline['results'].get(scenario, {}).get(endpoint)
+            if not base:
+                continue
+            for key in ('p50_ms', 'p99_ms'):
+                expected = base[key] * speed
+                if expected < MIN_COMPARABLE_MS:
+                    continue
+                ratio = stats[key] / expected
+                if ratio > 1 + REGRESSION_THRESHOLD and stats[key] - expected > TOLERANCE_MS:
+                    regressions.append(
+                        f'{scenario} {endpoint} {key}: {stats[key]} ms is {ratio:.2f}x the baseline '
+                        f'{base[key]} ms scaled to this machine ({expected:.3f} ms)'
+                    )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                        help='run only this scenario (repeatable)')
+    parser.add_argument('--save-baseline', action='store_true', help='store results as the new baseline')
+    parser.add_argument('--output', help='also write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    backend_label = setup_database()
+    app = create_benchmark_app()
+    calibration_ms = calibrate()
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        # Each scenario starts from empty collections
+        models.users_collection.delete_many({})
+        models.todos_collection.delete_many({})
+        recorder = Recorder(app)
+        SCENARIOS[name](app, recorder)
+        results[name] = recorder.summary()
+
+    print(f'Backend: {backend_label}, calibration {calibration_ms} ms')
+    print(f"{'scenario':<12} {'endpoint':<22} {'requests':>8} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for scenario, endpoints in results.items():
+        for endpoint, stats in endpoints.items():
+            print(f"{scenario:<12} {endpoint:<22} {stats['requests']:>8} {stats['throughput_rps']:>9} "
+                  f"{stats['p50_ms']:>9} {stats['p99_ms']:>9}")
+
+    run = {'workload': workload(), 'calibration_ms': calibration_ms, 'results': results}
+    if args.output:
+        Path(args.output).write_text(json.dumps(run, indent=2) + '\n')
+
+    baseline_path = BASELINE_DIR / f'{backend_label}.json'
+    if args.save_baseline:
+        if args.scenario:
+            parser.error('--save-baseline records every scenario; drop --scenario')
+        BASELINE_DIR.mkdir(exist_ok=True)
+        baseline_path.write_text(json.dumps(run, indent=2, sort_keys=True) + '\n')
+        print(f'Baseline written to {baseline_path}')
+        return 0
+
+    if not baseline_path.exists():
+        print(f'No baseline at {baseline_path}; run with --save-baseline to create one')
+        return 0
+    try:
+        regressions = compare(run, json.loads(baseline_path.read_text()))
+    except WorkloadMismatch as e:
+        print(f'Not comparing with {baseline_path.name}, the workload differs: {e}')
+        return 2
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    if not regressions:
+        print(f'No regressions against {baseline_path.name} '
+              f'(threshold {REGRESSION_THRESHOLD:.0%}, tolerance {TOLERANCE_MS} ms)')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
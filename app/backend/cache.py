@@ -0,0 +1,48 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class VersionedCache:
+    """Small LRU cache whose entries expire after `ttl` seconds.
+
+    Each entry also records the data version it was computed from; a
+    lookup with a different version misses, so bumping the version (as
+    every todo mutation does) invalidates the entry immediately. A `ttl`
+    of 0 disables the cache.
+    """
+
+    def __init__(self, ttl, max_entries=1024, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """Return the cached value, or None if missing, stale or expired"""
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            cached_version, expires_at, value = entry
+            if cached_version != version or expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, version, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
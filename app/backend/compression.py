@@ -0,0 +1,113 @@
+from flask import request
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip is used without it
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/event-stream'}
+# Streams whose chunks must reach the client as soon as they are produced
+FLUSH_EACH_CHUNK_MIMETYPES = {'text/event-stream'}
+
+
+class GzipCompressor:
+    def __init__(self, level=COMPRESSION_GZIP_LEVEL):
+        # wbits 16+ writes a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self, quality=COMPRESSION_BROTLI_QUALITY):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def available_encodings():
+    """Content codings this process can produce, in order of preference"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def make_compressor(encoding):
+    return BrotliCompressor() if encoding == 'br' else GzipCompressor()
+
+
+def _compress_stream(chunks, compressor, flush_each_chunk):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            if flush_each_chunk:
+                data += compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        # Let the wrapped generator run its cleanup (cursor close, unsubscribe)
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def compress_response(response):
+    """Compress a response in place when the client accepts it and it is worth it"""
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (request.method == 'HEAD' or response.status_code < 200
+            or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers):
+        return response
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        # Streams are compressed chunk by chunk instead of being buffered
+        flush_each_chunk = response.mimetype in FLUSH_EACH_CHUNK_MIMETYPES
+        response.response = _compress_stream(
+            response.response, make_compressor(encoding), flush_each_chunk
+        )
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_SIZE:
+            return response
+        compressor = make_compressor(encoding)
+        response.set_data(compressor.compress(data) + compressor.finish())
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # The encoded bytes differ, but the representation is the same; a weak
+        # validator keeps If-None-Match revalidation working
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def register_compression(app):
+    """Negotiate gzip/brotli for JSON and streamed responses"""
+    app.after_request(compress_response)
@@ -0,0 +1,27 @@
+import hashlib
+from flask import make_response, request
+
+
+def make_etag(username, version, *parts):
+    """Build a strong ETag from the user's data version and request parameters"""
+    digest = hashlib.sha1(
+        '\x00'.join([username, *map(str, parts)]).encode('utf-8')
+    ).hexdigest()[:16]
+    return f'{version}-{digest}'
+
+
+def not_modified(etag):
+    """Return a 304 response if the client already has this ETag, else None"""
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return None
+
+
+def with_etag(response, etag):
+    """Attach the ETag and revalidation headers to a response"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
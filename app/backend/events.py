@@ -0,0 +1,197 @@
+from queue import Empty, Full, Queue
+import itertools
+import logging
+import os
+import threading
+
+# Events buffered per subscriber before it is told to resync
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', 100))
+# 'auto' tries Mongo change streams and falls back to in-process pub/sub
+EVENTS_SOURCE = os.getenv('EVENTS_SOURCE', 'auto')
+
+logger = logging.getLogger(__name__)
+
+RESYNC = {'type': 'resync'}
+
+
+class Subscription:
+    def __init__(self, broker, username):
+        self.broker = broker
+        self.username = username
+        self.queue = Queue(maxsize=EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except Full:
+            # Slow client: drop events and ask it to refetch instead
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Next event, RESYNC after an overflow, or None on timeout"""
+        if self.overflowed:
+            self.overflowed = False
+            with self.queue.mutex:
+                self.queue.queue.clear()
+            return RESYNC
+        try:
+            return self.queue.get(timeout=timeout)
+        except Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    """Fan todo change events out to each user's open event streams.
+
+    Events come from `Database` write methods (in-process) or, when the
+    deployment supports them, from a MongoDB change stream on the todos
+    collection so that writes made by other processes are seen too. The
+    stream is open only while this process has subscribers: each update
+    it reports costs the primary a lookup of the full document.
+    """
+
+    def __init__(self, source=EVENTS_SOURCE):
+        self.source = source
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._watcher = None
+        self._stream = None
+        self._unavailable = False
+        # Result of enabling pre-images, remembered across stream restarts
+        self._pre_images = None
+        self.change_stream_active = False
+        # Whether the stream gets pre-images, without which a delete event has no owner
+        self.delete_pre_images = False
+
+    def subscribe(self, username):
+        subscription = Subscription(self, username)
+        with self._lock:
+            self._subscribers.setdefault(username, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        stream = None
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.username)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.username]
+            if not self._subscribers and self._stream is not None:
+                # Nobody in this process is listening any more
+                stream = self._stream
+                self._reset_stream()
+        if stream is not None:
+            stream.close()
+    
+    def _reset_stream(self):
+        self._stream = None
+        self._watcher = None
+        self.change_stream_active = False
+        self.delete_pre_images = False
+
+    def publish(self, username, event_type, payload):
+        """Deliver an event to every stream the user has open in this process"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(username, ()))
+        if not subscribers:
+            return
+        event = {'id': next(self._ids), 'type': event_type, **payload}
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def publish_local(self, username, event_type, payload):
+        """Publish a write made by this process unless a change stream will report it"""
+        if not self.change_stream_active:
+            self.publish(username, event_type, payload)
+        elif event_type == 'deleted' and not self.delete_pre_images:
+            # The stream cannot tell whose todo was deleted without pre-images
+            self.publish(username, event_type, payload)
+
+    @staticmethod
+    def _enable_pre_images(collection):
+        """Turn on change stream pre-images (MongoDB 6.0+); returns whether they are on"""
+        try:
+            collection.database.command(
+                'collMod', collection.name, changeStreamPreAndPostImages={'enabled': True}
+            )
+        except Exception as e:
+            logger.warning(
+                'Could not enable change stream pre-images on %s; deletes made by other '
+                'processes will not reach event streams: %s', collection.name, e
+            )
+            return False
+        return True
+
+    def start_change_stream(self, collection):
+        """Watch the todos collection unless already watching; returns True if change streams are in use.
+
+        Call after subscribing: the stream is closed again when the last
+        subscriber leaves.
+        """
+        if self.source == 'inprocess' or self._unavailable:
+            return False
+        with self._lock:
+            if self._watcher is not None or self.change_stream_active:
+                return self.change_stream_active
+            try:
+                stream = collection.watch(
+                    [{'$match': {'operationType': {'$in': ['insert', 'update', 'replace', 'delete']}}}],
+                    full_document='updateLookup',
+                    full_document_before_change='whenAvailable'
+                )
+            except Exception as e:
+                # Standalone servers and mongomock have no change streams
+                if self.source == 'changestream':
+                    raise
+                logger.info('Change streams unavailable, using in-process events: %s', e)
+                self._unavailable = True
+                return False
+            if self._pre_images is None:
+                self._pre_images = self._enable_pre_images(collection)
+            self.delete_pre_images = self._pre_images
+            self.change_stream_active = True
+            self._stream = stream
+            self._watcher = threading.Thread(
+                target=self._watch, args=(stream,), name='todo-change-stream', daemon=True
+            )
+            self._watcher.start()
+            return True
+
+    def _watch(self, stream):
+        try:
+            with stream:
+                for change in stream:
+                    self._dispatch(change)
+        except Exception as e:
+            # A stream closed by unsubscribe is no longer current and fails quietly
+            if self._stream is stream:
+                logger.warning('Todo change stream stopped, using in-process events: %s', e)
+        finally:
+            with self._lock:
+                if self._stream is stream:
+                    self._reset_stream()
+
+    def _dispatch(self, change):
+        operation = change['operationType']
+        if operation == 'delete':
+            # Needs pre-images to know the owner; without them publish_local
+            # reports this process's deletes instead
+            before = change.get('fullDocumentBeforeChange')
+            if before:
+                self.publish(before['username'], 'deleted', {'_id': change['documentKey']['_id']})
+            return
+        todo = change.get('fullDocument')
+        if not todo:
+            return
+        event_type = 'created' if operation == 'insert' else 'updated'
+        self.publish(todo['username'], event_type, {'todo': todo})
+
+
+# Create a singleton instance
+broker = EventBroker()
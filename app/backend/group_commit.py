@@ -0,0 +1,98 @@
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+import os
+import threading
+
+# Opt-in: combine concurrent todo inserts into one insert_many
+GROUP_COMMIT_ENABLED = os.getenv('GROUP_COMMIT_ENABLED', 'false').lower() == 'true'
+# How long the first insert of a batch waits for others to join
+GROUP_COMMIT_WINDOW_MS = float(os.getenv('GROUP_COMMIT_WINDOW_MS', 2))
+# A batch is written as soon as it holds this many documents
+GROUP_COMMIT_MAX_BATCH = int(os.getenv('GROUP_COMMIT_MAX_BATCH', 100))
+# Inserts waiting in batches at once; above this new inserts are rejected
+GROUP_COMMIT_MAX_PENDING = int(os.getenv('GROUP_COMMIT_MAX_PENDING', 1000))
+
+
+class WriteBufferFull(Exception):
+    """Raised when the group-commit buffer cannot accept more inserts"""
+
+
+class _Batch:
+    def __init__(self, collection):
+        self.collection = collection
+        self.documents = []
+        self.errors = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class GroupCommitBuffer:
+    """Combine concurrent inserts into one collection into a single insert_many.
+
+    The first caller to open a batch becomes its leader: it waits up to
+    `window_ms` (or until `max_batch` documents have joined), writes the
+    batch and wakes the others. Every caller returns only after the batch
+    is acknowledged with the collection's write concern, and gets back
+    its own error if its document failed, so durability matches
+    insert_one.
+    """
+
+    def __init__(self, window_ms=GROUP_COMMIT_WINDOW_MS, max_batch=GROUP_COMMIT_MAX_BATCH,
+                 max_pending=GROUP_COMMIT_MAX_PENDING):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._open = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(collection):
+        return id(collection.database.client), collection.full_name
+
+    def insert(self, collection, document):
+        """Insert one document as part of a batch; blocks until it is written"""
+        if not self._slots.acquire(blocking=False):
+            raise WriteBufferFull('Too many inserts waiting to be written')
+        try:
+            key = self._key(collection)
+            with self._lock:
+                batch = self._open.get(key)
+                leader = batch is None
+                if leader:
+                    batch = _Batch(collection)
+                    self._open[key] = batch
+                index = len(batch.documents)
+                batch.documents.append(document)
+                if len(batch.documents) >= self.max_batch:
+                    # Close the batch so later inserts start a new one
+                    del self._open[key]
+                    batch.full.set()
+            if leader:
+                batch.full.wait(self.window)
+                with self._lock:
+                    if self._open.get(key) is batch:
+                        del self._open[key]
+                self._flush(batch)
+            else:
+                batch.done.wait()
+            error = batch.errors[index]
+            if error is not None:
+                raise error
+        finally:
+            self._slots.release()
+
+    def _flush(self, batch):
+        errors = [None] * len(batch.documents)
+        try:
+            # Unordered, so one bad document does not fail the ones after it
+            batch.collection.insert_many(batch.documents, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get('writeErrors', []):
+                # Raise what insert_one would have raised for this document
+                error_class = DuplicateKeyError if write_error.get('code') == 11000 else WriteError
+                errors[write_error['index']] = error_class(
+                    write_error.get('errmsg'), write_error.get('code'), write_error
+                )
+        except Exception as e:
+            errors = [e] * len(batch.documents)
+        batch.errors = errors
+        batch.done.set()
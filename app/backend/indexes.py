@@ -0,0 +1,226 @@
+from pymongo import ASCENDING, DESCENDING, TEXT
+import click
+try:
+    from backend.models import TOMBSTONE_TTL_SECONDS
+    from backend.search import FIELD_WEIGHTS
+except ImportError:
+    from models import TOMBSTONE_TTL_SECONDS
+    from search import FIELD_WEIGHTS
+
+# Spec keys passed through to create_index
+INDEX_OPTIONS = ('unique', 'expireAfterSeconds', 'weights')
+
+# Declarative index registry: collection name -> index specs.
+# Every query issued by `Database` should be served by one of these.
+INDEXES = {
+    'users': [
+        {
+            'name': 'username_unique',
+            'keys': [('username', ASCENDING)],
+            'unique': True
+        }
+    ],
+    'todos': [
+        {
+            # Serves per-user listing and keyset pagination on (created_at, _id)
+            'name': 'username_created_at_id',
+            'keys': [('username', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)]
+        },
+        {
+            # Serves listing filtered by completed=
+            'name': 'username_completed_created_at_id',
+            'keys': [('username', ASCENDING), ('completed', ASCENDING),
+                     ('created_at', DESCENDING), ('_id', DESCENDING)]
+        },
+        {
+            # Serves delta sync and sort=updated_at on (updated_at, _id)
+            'name': 'username_updated_at_id',
+            'keys': [('username', ASCENDING), ('updated_at', ASCENDING), ('_id', ASCENDING)]
+        },
+        {
+            # Serves listing filtered by completed= with sort=updated_at
+            'name': 'username_completed_updated_at_id',
+            'keys': [('username', ASCENDING), ('completed', ASCENDING),
+                     ('updated_at', ASCENDING), ('_id', ASCENDING)]
+        },
+        {
+            # Serves the archival job's scan for old completed todos
+            'name': 'completed_updated_at',
+            'keys': [('completed', ASCENDING), ('updated_at', ASCENDING)]
+        },
+        {
+            # Serves /search; the username prefix keeps each query to one user
+            'name': 'username_text',
+            'keys': [('username', ASCENDING), ('title', TEXT), ('description', TEXT)],
+            'weights': FIELD_WEIGHTS
+        }
+    ],
+    'todos_archive': [
+        # include_archived runs the listing queries against the archive too
+        {
+            # Serves include_archived listing and export
+            'name': 'username_created_at_id',
+            'keys': [('username', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)]
+        },
+        {
+            'name': 'username_completed_created_at_id',
+            'keys': [('username', ASCENDING), ('completed', ASCENDING),
+                     ('created_at', DESCENDING), ('_id', DESCENDING)]
+        },
+        {
+            'name': 'username_updated_at_id',
+            'keys': [('username', ASCENDING), ('updated_at', ASCENDING), ('_id', ASCENDING)]
+        },
+        {
+            'name': 'username_completed_updated_at_id',
+            'keys': [('username', ASCENDING), ('completed', ASCENDING),
+                     ('updated_at', ASCENDING), ('_id', ASCENDING)]
+        }
+    ],
+    'todo_tombstones': [
+        {
+            'name': 'username_deleted_at_id',
+            'keys': [('username', ASCENDING), ('deleted_at', ASCENDING), ('_id', ASCENDING)]
+        },
+        {
+            'name': 'deleted_at_ttl',
+            'keys': [('deleted_at', ASCENDING)],
+            'expireAfterSeconds': TOMBSTONE_TTL_SECONDS
+        }
+    ]
+}
+
+
+def _normalize_keys(keys):
+    return [(field, direction if isinstance(direction, str) else int(direction))
+            for field, direction in keys]
+
+
+def _text_signature(keys, weights=None):
+    """Normalize keys so a text index compares equal to its live definition.
+    
+    MongoDB reports text indexes as `_fts`/`_ftsx` keys plus `weights`;
+    the text fields are collapsed into one `('$text', fields)` entry.
+    """
+    text_fields = sorted(weights or {})
+    signature = []
+    for field, direction in _normalize_keys(keys):
+        if direction == TEXT or field in ('_fts', '_ftsx'):
+            if not weights:
+                text_fields.append(field)
+            if ('$text', TEXT) not in signature:
+                signature.append(('$text', TEXT))
+            continue
+        signature.append((field, direction))
+    return signature, sorted(set(text_fields))
+
+
+def ensure_indexes(database, registry=None):
+    """Create every registered index that is missing. Safe to run repeatedly."""
+    registry = registry or INDEXES
+    created = []
+    for collection_name, specs in registry.items():
+        existing = database[collection_name].index_information()
+        for spec in specs:
+            if spec['name'] in existing:
+                continue
+            options = {'name': spec['name'], 'unique': spec.get('unique', False)}
+            options.update({key: spec[key] for key in INDEX_OPTIONS if key in spec})
+            database[collection_name].create_index(spec['keys'], **options)
+            created.append((collection_name, spec['name']))
+    return created
+
+
+def index_drift(database, registry=None):
+    """Compare live indexes against the registry.
+
+    Returns a dict with `missing` (registered but not live), `extra`
+    (live but not registered) and `changed` (same name, different
+    definition) lists of (collection, index name) pairs.
+    """
+    registry = registry or INDEXES
+    drift = {'missing': [], 'extra': [], 'changed': []}
+    for collection_name, specs in registry.items():
+        live = database[collection_name].index_information()
+        expected = {spec['name']: spec for spec in specs}
+        for name, spec in expected.items():
+            if name not in live:
+                drift['missing'].append((collection_name, name))
+                continue
+            info = live[name]
+            live_weights = info.get('weights')
+            if (_text_signature(info['key'], live_weights) != _text_signature(spec['keys'])
+                    or bool(info.get('unique', False)) != spec.get('unique', False)
+                    or info.get('expireAfterSeconds') != spec.get('expireAfterSeconds')
+                    or (live_weights is not None and live_weights != spec.get('weights'))):
+                drift['changed'].append((collection_name, name))
+        for name in live:
+            if name != '_id_' and name not in expected:
+                drift['extra'].append((collection_name, name))
+    return drift
+
+
+def find_covering_index(collection_name, equality_fields, sort=None, registry=None):
+    """Return the registered index that serves a query shape, or None.
+
+    An index serves the query when its key prefix is the equality fields
+    (in any order) followed by the sort keys in the same or fully
+    reversed direction.
+    """
+    registry = registry or INDEXES
+    sort = _normalize_keys(sort or [])
+    equality_fields = set(equality_fields)
+    for spec in registry.get(collection_name, []):
+        keys = _normalize_keys(spec['keys'])
+        prefix = [field for field, _ in keys[:len(equality_fields)]]
+        if set(prefix) != equality_fields:
+            continue
+        sort_keys = keys[len(equality_fields):len(equality_fields) + len(sort)]
+        reversed_sort = [(field, direction if isinstance(direction, str) else -direction)
+                         for field, direction in sort]
+        if sort_keys == sort or sort_keys == reversed_sort:
+            return spec
+    return None
+
+
+@click.group('indexes')
+def indexes_cli():
+    """Manage MongoDB indexes"""
+
+
+@indexes_cli.command('ensure')
+def ensure_command():
+    """Create missing indexes"""
+    try:
+        from backend import models
+    except ImportError:
+        import models
+    created = []
+    for database in models.db.databases():
+        for collection_name, name in ensure_indexes(database):
+            click.echo(f'created {collection_name}.{name}')
+            created.append(name)
+    if not created:
+        click.echo('All indexes present')
+
+
+@indexes_cli.command('check')
+def check_command():
+    """Report drift between registered and live indexes"""
+    try:
+        from backend import models
+    except ImportError:
+        import models
+    has_drift = failed = False
+    for database in models.db.databases():
+        drift = index_drift(database)
+        for kind in ('missing', 'changed', 'extra'):
+            for collection_name, name in drift[kind]:
+                click.echo(f'{kind}: {collection_name}.{name}')
+                has_drift = True
+        # Extra indexes are reported but do not fail the check
+        failed = failed or bool(drift['missing'] or drift['changed'])
+    if not has_drift:
+        click.echo('No index drift')
+    if failed:
+        raise SystemExit(1)
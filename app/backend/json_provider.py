@@ -0,0 +1,42 @@
+from datetime import date, datetime
+import os
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+# orjson is optional; when installed it is used for compact responses
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+USE_FAST_JSON = os.getenv('USE_FAST_JSON', 'true').lower() == 'true'
+
+
+def _bson_default(o):
+    """Serialize BSON and date types the routes return straight from Mongo"""
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes ObjectId and datetime natively.
+
+    Datetimes are written as ISO 8601 strings rather than Flask's default
+    HTTP date format, so documents can be returned without copying.
+    """
+    default = staticmethod(_bson_default)
+    fast = orjson is not None and USE_FAST_JSON
+
+    def dumps(self, obj, **kwargs):
+        # orjson only produces compact output; indent (debug mode) uses the stdlib
+        if self.fast and set(kwargs) <= {'separators'}:
+            option = orjson.OPT_SORT_KEYS if self.sort_keys else 0
+            try:
+                return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+            except TypeError:
+                # e.g. integers wider than 64 bits
+                pass
+        return super().dumps(obj, **kwargs)
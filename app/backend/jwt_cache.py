@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from flask import current_app
+from flask_jwt_extended import JWTManager, decode_token
+from flask_jwt_extended import view_decorators
+import hashlib
+import os
+import threading
+import time
+try:
+    from backend.metrics import jwt_token_cache_total
+except ImportError:
+    from metrics import jwt_token_cache_total
+
+# Verified tokens kept per process; 0 disables the cache
+JWT_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', 10000))
+
+
+def _digest(token):
+    # Raw bearer tokens are never kept in memory as keys
+    return hashlib.sha256(token.encode('utf-8')).digest()
+
+
+class TokenCache:
+    """Bounded LRU of verified JWT claims keyed by a digest of the token.
+
+    Entries are dropped once the token's `exp` passes, so an expired token
+    always goes back through full verification and is rejected there.
+    """
+
+    def __init__(self, max_size=JWT_CACHE_SIZE, clock=time.time):
+        self.max_size = max_size
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, token):
+        key = _digest(token)
+        with self._lock:
+            claims = self._entries.get(key)
+            if claims is None:
+                jwt_token_cache_total.inc('miss')
+                return None
+            if 'exp' in claims and claims['exp'] <= self.clock():
+                del self._entries[key]
+                jwt_token_cache_total.inc('expired')
+                return None
+            self._entries.move_to_end(key)
+        jwt_token_cache_total.inc('hit')
+        return dict(claims)
+
+    def put(self, token, claims):
+        if self.max_size <= 0:
+            return
+        # Tokens that are not valid yet are verified again on every request
+        if 'nbf' in claims and claims['nbf'] > self.clock():
+            return
+        key = _digest(token)
+        with self._lock:
+            self._entries[key] = dict(claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token):
+        """Forget one token"""
+        with self._lock:
+            self._entries.pop(_digest(token), None)
+
+    def invalidate_subject(self, identity, claim='sub'):
+        """Forget every cached token issued to an identity"""
+        with self._lock:
+            for key in [key for key, claims in self._entries.items() if claims.get(claim) == identity]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def cached_decode_token(encoded_token, csrf_value=None, allow_expired=False):
+    """`decode_token` that serves verified claims from the app's `TokenCache`"""
+    cache = getattr(current_app.extensions['flask-jwt-extended'], 'token_cache', None)
+    # Cookie tokens carry a per-request CSRF value; verify those every time
+    if cache is None or csrf_value is not None or allow_expired:
+        return decode_token(encoded_token, csrf_value, allow_expired)
+    claims = cache.get(encoded_token)
+    if claims is None:
+        claims = decode_token(encoded_token)
+        cache.put(encoded_token, claims)
+    return claims
+
+
+def install_decode_cache():
+    """Make jwt_required decode tokens through `cached_decode_token`.
+
+    jwt_required calls the public `decode_token` through its name in
+    flask_jwt_extended.view_decorators. If an upgrade stops doing so this
+    raises instead of leaving the cache silently unused.
+    """
+    if getattr(view_decorators, 'decode_token', None) not in (decode_token, cached_decode_token):
+        raise RuntimeError('flask_jwt_extended.view_decorators no longer calls decode_token; '
+                           'set JWT_CACHE_SIZE=0 or update jwt_cache.py')
+    view_decorators.decode_token = cached_decode_token
+
+
+class CachingJWTManager(JWTManager):
+    """JWTManager that verifies each bearer token once and then serves its
+    claims from a `TokenCache`.
+
+    Revocation hooks are callables taking the decoded claims and returning
+    True for revoked tokens. They are installed as the blocklist check,
+    which flask_jwt_extended runs on every request, cached or not.
+    """
+
+    def __init__(self, app=None, max_size=JWT_CACHE_SIZE):
+        self.token_cache = TokenCache(max_size)
+        self.revocation_hooks = []
+        super().__init__(app)
+        self.token_in_blocklist_loader(self._is_revoked)
+        install_decode_cache()
+
+    def add_revocation_hook(self, hook):
+        self.revocation_hooks.append(hook)
+        return hook
+
+    def _is_revoked(self, jwt_header, jwt_data):
+        return any(hook(jwt_data) for hook in self.revocation_hooks)
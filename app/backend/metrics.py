@@ -0,0 +1,208 @@
+from bisect import bisect_left
+from time import perf_counter
+from flask import Response, g, jsonify, request
+from pymongo import monitoring
+import hmac
+import threading
+
+# Clients that may scrape /metrics without METRICS_TOKEN
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+# Latency buckets in seconds, from sub-millisecond Mongo commands to slow requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labelvalues)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labelvalues -> [per-bucket counts..., +Inf count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labelvalues)
+            if series is None:
+                series = [0] * (len(self.buckets) + 2)
+                self._values[labelvalues] = series
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labelvalues):
+        series = self._values.get(labelvalues)
+        return sum(series[:-1]) if series else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._values.items())
+        for labelvalues, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = _format_labels(self.labelnames, labelvalues, f'le="{le}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f'{self.name}_sum{labels} {series[-1]}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = {}
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def set_collector(self, name, collector):
+        """Register a callable returning extra exposition lines at scrape time"""
+        self.collectors[name] = collector
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors.values():
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    'http_requests_total', 'HTTP requests by endpoint, method and status',
+    ('endpoint', 'method', 'status')
+))
+http_request_duration_seconds = registry.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by endpoint',
+    ('endpoint', 'method')
+))
+bcrypt_duration_seconds = registry.register(Histogram(
+    'bcrypt_duration_seconds', 'Time spent hashing or verifying passwords',
+    ('operation',), buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+))
+mongo_command_duration_seconds = registry.register(Histogram(
+    'mongo_command_duration_seconds', 'MongoDB command latency by command name',
+    ('command', 'outcome')
+))
+
+jwt_token_cache_total = registry.register(Counter(
+    'jwt_token_cache_total', 'Verified-token cache lookups by result',
+    ('result',)
+))
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Record per-command MongoDB latency from pymongo command events"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_command_duration_seconds.observe(
+            event.duration_micros / 1e6, event.command_name, 'success'
+        )
+
+    def failed(self, event):
+        mongo_command_duration_seconds.observe(
+            event.duration_micros / 1e6, event.command_name, 'failure'
+        )
+
+
+def pool_stats_collector(client_factory):
+    """Expose MongoClientFactory pool statistics as gauges"""
+    def collect():
+        stats = client_factory.pool_stats()
+        lines = []
+        for key in ('checked_out', 'waiting', 'open'):
+            if key in stats:
+                name = f'mongo_pool_{key}_connections'
+                lines.extend([f'# TYPE {name} gauge', f'{name} {stats[key]}'])
+        lines.extend(['# TYPE mongo_pool_max_connections gauge',
+                      f'mongo_pool_max_connections {stats["max_pool_size"]}'])
+        return lines
+    return collect
+
+
+def token_cache_collector(token_cache):
+    """Expose the number of cached verified tokens as a gauge"""
+    def collect():
+        return ['# TYPE jwt_token_cache_entries gauge', f'jwt_token_cache_entries {len(token_cache)}']
+    return collect
+
+
+def _scrape_allowed(token):
+    if not token:
+        return request.remote_addr in LOOPBACK_ADDRESSES
+    supplied = request.headers.get('Authorization', '')
+    return hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {token}'.encode('utf-8'))
+
+
+def register_metrics(app):
+    """Time every request and expose the registry at /metrics.
+
+    Scrapers authenticate with `Authorization: Bearer <METRICS_TOKEN>`;
+    without a token configured only loopback clients are served. The
+    registry belongs to this process, so with several workers each one
+    reports only its own requests.
+    """
+    @app.before_request
+    def start_timer():
+        g.request_start = perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('request_start', None)
+        if start is not None:
+            endpoint = request.endpoint or 'unmatched'
+            http_request_duration_seconds.observe(perf_counter() - start, endpoint, request.method)
+            http_requests_total.inc(endpoint, request.method, str(response.status_code))
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if not _scrape_allowed(app.config['METRICS_TOKEN']):
+            return jsonify({'error': 'Metrics require METRICS_TOKEN'}), 401
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
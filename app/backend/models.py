@@ -1,84 +1,697 @@
-from pymongo import MongoClient
-from datetime import datetime, timezone
+from pymongo import DeleteOne, InsertOne, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+import heapq
+import logging
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+try:
+    from backend.events import broker
+    from backend.metrics import MongoCommandMetrics
+    from backend.profiling import RequestTraceListener
+    from backend.mongo import MongoClientFactory
+    from backend.search import SEARCH_BACKEND, search_cache
+    from backend.sharding import MONGO_SHARDS, ShardRouter, parse_shards
+    from backend.group_commit import GROUP_COMMIT_ENABLED, GroupCommitBuffer
+    from backend.replicas import ReadRouter
+except ImportError:
+    from events import broker
+    from metrics import MongoCommandMetrics
+    from profiling import RequestTraceListener
+    from mongo import MongoClientFactory
+    from search import SEARCH_BACKEND, search_cache
+    from sharding import MONGO_SHARDS, ShardRouter, parse_shards
+    from group_commit import GROUP_COMMIT_ENABLED, GroupCommitBuffer
+    from replicas import ReadRouter
 
 # Load environment variables
 # Look for .env in backend directory
 env_path = Path(__file__).parent / '.env'
 load_dotenv(env_path)
 
+logger = logging.getLogger(__name__)
+
 # MongoDB connection
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
 DATABASE_NAME = os.getenv('DATABASE_NAME', 'todoapp')
+# Deletions are remembered this long for delta sync
+TOMBSTONE_TTL_SECONDS = int(os.getenv('TOMBSTONE_TTL_DAYS', 30)) * 86400
+# OperationFailure code for "text index required for $text query"
+INDEX_NOT_FOUND = 27
+
+# The client is created lazily, once per process (see mongo.MongoClientFactory)
+client_factory = MongoClientFactory(MONGODB_URI)
+client_factory.add_listener(MongoCommandMetrics())
+client_factory.add_listener(RequestTraceListener())
+
+# Module-level handles (`client`, `db_instance`, `users_collection`,
+# `todos_collection`, `tombstones_collection`, `archive_collection`) resolve lazily. Assigning them, as the tests do,
+# overrides the factory.
+_LAZY_HANDLES = {
+    'client': lambda: client_factory.get_client(),
+    'db_instance': lambda: _resolve('client')[DATABASE_NAME],
+    'users_collection': lambda: _collection('users'),
+    'todos_collection': lambda: _collection('todos'),
+    'tombstones_collection': lambda: _collection('todo_tombstones'),
+    'archive_collection': lambda: _collection('todos_archive')
+}
 
-client = MongoClient(MONGODB_URI)
-db_instance = client[DATABASE_NAME]
+def _collection(name):
+    if globals().get('client') is None and globals().get('db_instance') is None:
+        return client_factory.get_collection(DATABASE_NAME, name)
+    return _resolve('db_instance')[name]
 
-# Collections
-users_collection = db_instance.users
-todos_collection = db_instance.todos
+def _resolve(name):
+    value = globals().get(name)
+    if value is not None:
+        return value
+    return _LAZY_HANDLES[name]()
+
+def __getattr__(name):
+    if name in _LAZY_HANDLES:
+        return _resolve(name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 class Database:
-    def __init__(self):
-        self.users = users_collection
-        self.todos = todos_collection
+    def __init__(self, users=None, todos=None, tombstones=None, router=None, write_buffer=None,
+                 read_router=None, archive=None):
+        self._users = users
+        self._todos = todos
+        self._tombstones = tombstones
+        self._archive = archive
+        # With a ShardRouter each user's documents live on the shard their username hashes to
+        self.router = router
+        # With a GroupCommitBuffer concurrent creates share one insert_many
+        self.write_buffer = write_buffer
+        # With an enabled ReadRouter, reads of users without recent writes go to secondaries
+        self.read_router = read_router or ReadRouter(mode='primary')
+        # Set once the server turns out not to support $text (e.g. mongomock)
+        self.text_search_unavailable = SEARCH_BACKEND == 'memory'
+    
+    @property
+    def users(self):
+        return self._users if self._users is not None else _resolve('users_collection')
+    
+    @users.setter
+    def users(self, collection):
+        self._users = collection
+    
+    @property
+    def todos(self):
+        return self._todos if self._todos is not None else _resolve('todos_collection')
+    
+    @todos.setter
+    def todos(self, collection):
+        self._todos = collection
+    
+    @property
+    def tombstones(self):
+        return self._tombstones if self._tombstones is not None else _resolve('tombstones_collection')
+    
+    @tombstones.setter
+    def tombstones(self, collection):
+        self._tombstones = collection
+    
+    @property
+    def archive(self):
+        return self._archive if self._archive is not None else _resolve('archive_collection')
+    
+    @archive.setter
+    def archive(self, collection):
+        self._archive = collection
+    
+    def _users_for(self, username):
+        return self.router.collection(username, 'users') if self.router else self.users
+    
+    def _todos_for(self, username):
+        return self.router.collection(username, 'todos') if self.router else self.todos
+    
+    def _tombstones_for(self, username):
+        return self.router.collection(username, 'todo_tombstones') if self.router else self.tombstones
+    
+    def _archive_for(self, username):
+        return self.router.collection(username, 'todos_archive') if self.router else self.archive
+    
+    def _read(self, collection, username, secondary_ok=True):
+        if not secondary_ok:
+            return collection
+        return self.read_router.collection(collection, username)
+    
+    def reads_from_secondary(self, username):
+        """Whether a read of `username`'s data made now may be served by a secondary.
+        
+        Responses built from such reads can lag the primary's version
+        counter, so they must not be stored under a version-based ETag or
+        cache key; pass `secondary_ok=False` to force a primary read instead.
+        """
+        return self.read_router.use_secondary(username)
     
-    def find_user(self, username):
-        """Find a user by username"""
-        return self.users.find_one({'username': username})
+    def databases(self):
+        """Every MongoDB database holding application data"""
+        if self.router:
+            return self.router.databases()
+        return [_resolve('db_instance')]
+    
+    def find_user(self, username, secondary_ok=False):
+        """Find a user by username.
+        
+        Authentication reads stay on the primary; pass `secondary_ok` for
+        display-only reads that may be routed to a secondary.
+        """
+        users = self._users_for(username)
+        if secondary_ok:
+            users = self._read(users, username)
+        return users.find_one({'username': username})
     
     def create_user(self, username, hashed_password):
         """Create a new user"""
         user = {
             'username': username,
             'password': hashed_password,
-            'created_at': datetime.now(timezone.utc)
+            'created_at': datetime.now(timezone.utc),
+            'version': 0,
+            'last_write_at': datetime.now(timezone.utc)
         }
-        return self.users.insert_one(user)
+        result = self._users_for(username).insert_one(user)
+        self.read_router.note_write(username)
+        return result
+    
+    def get_user_version(self, username):
+        """Get the user's data version, bumped by every mutation.
+        
+        Always read from the primary; also tells the read router when the
+        user last wrote.
+        """
+        user = self._users_for(username).find_one(
+            {'username': username}, {'version': 1, 'last_write_at': 1}
+        )
+        if not user:
+            return None
+        self.read_router.note_last_write(username, user.get('last_write_at'))
+        return user.get('version', 0)
+    
+    def _bump_version(self, username):
+        now = datetime.now(timezone.utc)
+        self._users_for(username).update_one(
+            {'username': username},
+            {'$inc': {'version': 1}, '$set': {'last_write_at': now}}
+        )
+        self.read_router.note_write(username, now)
+    
+    def update_user_password(self, username, hashed_password):
+        """Replace a user's stored password hash"""
+        now = datetime.now(timezone.utc)
+        result = self._users_for(username).update_one(
+            {'username': username},
+            {'$set': {'password': hashed_password, 'last_write_at': now}, '$inc': {'version': 1}}
+        )
+        self.read_router.note_write(username, now)
+        return result
     
     def get_user_todos(self, username):
         """Get all todos for a user"""
-        return list(self.todos.find({'username': username}).sort('created_at', -1))
+        todos = self._read(self._todos_for(username), username)
+        return list(todos.find({'username': username}).sort('created_at', -1))
     
-    def create_todo(self, username, title, description=''):
-        """Create a new todo"""
-        todo = {
+    def get_user_todos_page(self, username, limit, after=None, completed=None,
+                            sort=('created_at', -1), fields=None, include_archived=False,
+                            secondary_ok=True):
+        """Get one page of todos for a user, newest first by default.
+        
+        `after` is a (timestamp, _id) keyset position from a previous page
+        on the same `sort` field and direction. `completed` filters by
+        status and `fields` limits the returned fields (the sort field and
+        `_id` are always included so the next cursor can be built).
+        `include_archived` merges in todos moved to the archive.
+        Returns the page and whether more todos follow it.
+        """
+        sort_field, direction = sort
+        query = {'username': username}
+        if completed is not None:
+            query['completed'] = completed
+        if after:
+            position, todo_id = after
+            operator = '$lt' if direction < 0 else '$gt'
+            query['$or'] = [
+                {sort_field: {operator: position}},
+                {sort_field: position, '_id': {operator: todo_id}}
+            ]
+        projection = None
+        if fields is not None:
+            projection = dict.fromkeys([*fields, sort_field], 1)
+        collections = [self._todos_for(username)]
+        if include_archived:
+            collections.append(self._archive_for(username))
+        todos = []
+        for collection in collections:
+            # Fetch one extra document to know whether another page exists
+            todos.extend(self._read(collection, username, secondary_ok).find(query, projection).sort(
+                [(sort_field, direction), ('_id', direction)]
+            ).limit(limit + 1))
+        if include_archived:
+            todos = self._merge_archived(todos, sort_field, direction)
+        has_more = len(todos) > limit
+        return todos[:limit], has_more
+    
+    def _merge_archived(self, todos, sort_field, direction):
+        # A todo caught mid-archival can briefly exist in both collections
+        unique = {}
+        for todo in todos:
+            unique.setdefault(todo['_id'], todo)
+        return sorted(
+            unique.values(),
+            key=lambda todo: (todo[sort_field], todo['_id']),
+            reverse=direction < 0
+        )
+    
+    def iter_user_todos(self, username, batch_size=500, include_archived=False, secondary_ok=True):
+        """Return a lazy cursor over all todos for a user, newest first"""
+        def cursor(collection):
+            return self._read(collection, username, secondary_ok).find({'username': username}).sort(
+                [('created_at', -1), ('_id', -1)]
+            ).batch_size(batch_size)
+        
+        if not include_archived:
+            return cursor(self._todos_for(username))
+        return self._iter_merged(cursor(self._todos_for(username)), cursor(self._archive_for(username)))
+    
+    def _iter_merged(self, *cursors):
+        try:
+            seen = set()
+            merged = heapq.merge(
+                *cursors, key=lambda todo: (todo['created_at'], todo['_id']), reverse=True
+            )
+            for todo in merged:
+                if todo['_id'] not in seen:
+                    seen.add(todo['_id'])
+                    yield todo
+        finally:
+            for cursor in cursors:
+                cursor.close()
+    
+    def archive_completed_todos(self, cutoff, batch_size=500):
+        """Move one batch of todos completed before `cutoff` into the archive.
+        
+        Each batch is copied with idempotent upserts and only then deleted
+        from `todos`, so an interrupted run can simply be started again.
+        Todos changed while being archived stay in `todos`, and todos deleted
+        meanwhile end up in neither collection. Returns the number of todos
+        archived; 0 means nothing is left to do.
+        """
+        archived = 0
+        for todos, archive in self._archive_targets():
+            batch = list(todos.find(
+                {'completed': True, 'updated_at': {'$lt': cutoff}}
+            ).sort('updated_at', 1).limit(batch_size))
+            if not batch:
+                continue
+            now = datetime.now(timezone.utc)
+            archive.bulk_write([
+                ReplaceOne({'_id': todo['_id']}, dict(todo, archived_at=now), upsert=True)
+                for todo in batch
+            ], ordered=False)
+            # Delete only what is unchanged since it was copied, one todo at a
+            # time: only a todo this delete removed counts as moved. One changed
+            # or deleted by its user meanwhile must not stay in the archive.
+            moved = {}
+            stale = []
+            for todo in batch:
+                result = todos.delete_one(
+                    {'_id': todo['_id'], 'updated_at': todo['updated_at'], 'completed': True}
+                )
+                if result.deleted_count:
+                    moved.setdefault(todo['username'], []).append(todo['_id'])
+                else:
+                    stale.append(todo['_id'])
+            if stale:
+                archive.delete_many({'_id': {'$in': stale}})
+            # To delta sync and event subscribers an archived todo is a deleted one
+            for username, todo_ids in moved.items():
+                self._record_tombstones(username, todo_ids)
+                self._bump_version(username)
+                for todo_id in todo_ids:
+                    broker.publish_local(username, 'deleted', {'_id': todo_id})
+            archived += len(batch) - len(stale)
+        return archived
+    
+    def has_archivable_todos(self, cutoff):
+        """Whether any todo completed before `cutoff` is still waiting to be archived"""
+        return any(
+            todos.find_one({'completed': True, 'updated_at': {'$lt': cutoff}}, {'_id': 1}) is not None
+            for todos, _ in self._archive_targets()
+        )
+    
+    def _unarchive(self, username, todo_ids):
+        """Move archived todos back into `todos`; returns the ids restored"""
+        archive = self._archive_for(username)
+        restored = list(archive.find({'_id': {'$in': todo_ids}, 'username': username}))
+        if not restored:
+            return set()
+        # Copy before deleting, as archival does, so a failure loses nothing
+        self._todos_for(username).bulk_write([
+            ReplaceOne({'_id': todo['_id']}, {k: v for k, v in todo.items() if k != 'archived_at'},
+                       upsert=True)
+            for todo in restored
+        ], ordered=False)
+        ids = [todo['_id'] for todo in restored]
+        archive.delete_many({'_id': {'$in': ids}})
+        # The next change reports the todo again, so delta sync must not drop it
+        self._tombstones_for(username).delete_many({'_id': {'$in': ids}})
+        return set(ids)
+    
+    def _archive_targets(self):
+        if self.router:
+            return [(database.todos, database.todos_archive) for database in self.router.databases()]
+        return [(self.todos, self.archive)]
+    
+    def get_todo_stats(self, username, days=30, secondary_ok=True):
+        """Count a user's todos in one aggregation.
+        
+        Returns total, completed and open counts plus, for todos created
+        in the last `days` days, the number created (and how many of those
+        are completed) per UTC day.
+        """
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        result = next(self._read(self._todos_for(username), username, secondary_ok).aggregate([
+            {'$match': {'username': username}},
+            {'$facet': {
+                'totals': [{'$group': {
+                    '_id': None,
+                    'total': {'$sum': 1},
+                    'completed': {'$sum': {'$cond': ['$completed', 1, 0]}}
+                }}],
+                'per_day': [
+                    {'$match': {'created_at': {'$gte': since}}},
+                    {'$group': {
+                        '_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$created_at'}},
+                        'created': {'$sum': 1},
+                        'completed': {'$sum': {'$cond': ['$completed', 1, 0]}}
+                    }},
+                    {'$sort': {'_id': 1}}
+                ]
+            }}
+        ]), {})
+        totals = (result.get('totals') or [{}])[0]
+        total = totals.get('total', 0)
+        completed = totals.get('completed', 0)
+        return {
+            'total': total,
+            'completed': completed,
+            'open': total - completed,
+            'per_day': [
+                {'date': day['_id'], 'created': day['created'], 'completed': day['completed']}
+                for day in result.get('per_day', [])
+            ]
+        }
+    
+    def search_todos(self, username, query, limit, offset=0, secondary_ok=True):
+        """Search a user's todos by title and description, best match first.
+        
+        Uses the Mongo text index when available and otherwise an
+        in-process inverted index rebuilt whenever the user's data
+        version changes. Returns the page (each todo with a `score`) and
+        whether more results follow it.
+        """
+        if not self.text_search_unavailable:
+            try:
+                cursor = self._read(self._todos_for(username), username, secondary_ok).find(
+                    {'username': username, '$text': {'$search': query}},
+                    {'score': {'$meta': 'textScore'}}
+                ).sort([('score', {'$meta': 'textScore'}), ('_id', -1)]).skip(offset).limit(limit + 1)
+                todos = list(cursor)
+                return todos[:limit], len(todos) > limit
+            except NotImplementedError:
+                # mongomock has no $text
+                if SEARCH_BACKEND == 'text':
+                    raise
+                self.text_search_unavailable = True
+            except OperationFailure as e:
+                # Only a missing text index falls back, for this call; any other
+                # failure is a real error and must not turn into in-process scans
+                if SEARCH_BACKEND == 'text' or e.code != INDEX_NOT_FOUND:
+                    logger.error('Text search failed for %s: %s', username, e)
+                    raise
+                logger.warning('No text index on todos, searching in process: %s', e)
+        
+        version = self.get_user_version(username)
+        # Cached under the primary's version, so built from the primary
+        index = search_cache.get(
+            username, version, lambda: self.iter_user_todos(username, secondary_ok=False)
+        )
+        todos = index.search(query)
+        return todos[offset:offset + limit], len(todos) > offset + limit
+    
+    def _build_todo(self, username, title, description=''):
+        """Build a new todo document with its _id assigned client-side"""
+        now = datetime.now(timezone.utc)
+        # Mongo stores datetimes with millisecond precision
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        return {
+            '_id': ObjectId(),
             'username': username,
             'title': title,
             'description': description,
             'completed': False,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
+            'created_at': now,
+            'updated_at': now
         }
-        return self.todos.insert_one(todo)
+    
+    def _as_stored(self, todo):
+        """Return a copy of a locally built todo as a read from Mongo would return it"""
+        todo = dict(todo)
+        for field in ('created_at', 'updated_at'):
+            todo[field] = todo[field].replace(tzinfo=None)
+        return todo
+    
+    def create_todo(self, username, title, description=''):
+        """Create a new todo and return the created document"""
+        todo = self._build_todo(username, title, description)
+        if self.write_buffer:
+            self.write_buffer.insert(self._todos_for(username), todo)
+        else:
+            self._todos_for(username).insert_one(todo)
+        self._bump_version(username)
+        todo = self._as_stored(todo)
+        broker.publish_local(username, 'created', {'todo': todo})
+        return todo
     
     def update_todo(self, todo_id, username, update_data):
-        """Update a todo"""
-        update_data['updated_at'] = datetime.now(timezone.utc)
-        return self.todos.update_one(
-            {'_id': todo_id, 'username': username},
-            {'$set': update_data}
-        )
+        """Update a todo and return the updated document, or None if not found.
+        
+        An archived todo is moved back into `todos` first.
+        """
+        update_data = dict(update_data, updated_at=datetime.now(timezone.utc))
+        
+        def update():
+            return self._todos_for(username).find_one_and_update(
+                {'_id': todo_id, 'username': username},
+                {'$set': update_data},
+                return_document=ReturnDocument.AFTER
+            )
+        
+        todo = update()
+        if todo is None and self._unarchive(username, [todo_id]):
+            todo = update()
+        if todo:
+            self._bump_version(username)
+            broker.publish_local(username, 'updated', {'todo': todo})
+        return todo
     
     def delete_todo(self, todo_id, username):
-        """Delete a todo"""
-        return self.todos.delete_one({'_id': todo_id, 'username': username})
+        """Delete a todo, archived or not"""
+        result = self._todos_for(username).delete_one({'_id': todo_id, 'username': username})
+        if not result.deleted_count:
+            result = self._archive_for(username).delete_one({'_id': todo_id, 'username': username})
+        if result.deleted_count:
+            self._record_tombstones(username, [todo_id])
+            self._bump_version(username)
+            broker.publish_local(username, 'deleted', {'_id': todo_id})
+        return result
     
-    def toggle_todo(self, todo_id, username):
-        """Toggle the completed status of a todo"""
-        todo = self.todos.find_one({'_id': todo_id, 'username': username})
-        if not todo:
-            return None
+    def _record_tombstones(self, username, todo_ids):
+        """Remember deletions so delta sync can report them"""
+        now = datetime.now(timezone.utc)
+        # Upserts keep this idempotent if the same id is deleted twice
+        self._tombstones_for(username).bulk_write([
+            UpdateOne(
+                {'_id': todo_id},
+                {'$set': {'username': username, 'deleted_at': now}},
+                upsert=True
+            )
+            for todo_id in todo_ids
+        ], ordered=False)
+    
+    def get_changes(self, username, after, limit):
+        """Get todos changed and todos deleted after a (timestamp, _id) position.
         
-        new_status = not todo.get('completed', False)
-        result = self.todos.update_one(
-            {'_id': todo_id, 'username': username},
-            {'$set': {'completed': new_status, 'updated_at': datetime.now(timezone.utc)}}
+        Both sources are read in (timestamp, _id) order and merged, so a
+        page never splits a run of equal timestamps. Returns
+        (changed todos, deleted ids, has_more, position of the last item).
+        """
+        since, since_id = after
+        
+        def keyset(field):
+            return {'username': username, '$or': [
+                {field: {'$gt': since}},
+                {field: since, '_id': {'$gt': since_id}}
+            ]}
+        
+        todos = self._todos_for(username).find(keyset('updated_at')).sort(
+            [('updated_at', 1), ('_id', 1)]
+        ).limit(limit + 1)
+        tombstones = self._tombstones_for(username).find(keyset('deleted_at')).sort(
+            [('deleted_at', 1), ('_id', 1)]
+        ).limit(limit + 1)
+        merged = sorted(
+            [(todo['updated_at'], todo['_id'], 'changed', todo) for todo in todos]
+            + [(tomb['deleted_at'], tomb['_id'], 'deleted', tomb) for tomb in tombstones],
+            key=lambda item: (item[0], item[1])
         )
-        return result if result.matched_count > 0 else None
+        has_more = len(merged) > limit
+        page = merged[:limit]
+        changed = [item[3] for item in page if item[2] == 'changed']
+        deleted = [item[1] for item in page if item[2] == 'deleted']
+        last = (page[-1][0], page[-1][1]) if page else None
+        return changed, deleted, has_more, last
+    
+    def toggle_todo(self, todo_id, username):
+        """Toggle the completed status of a todo and return the updated document, or None if not found.
+        
+        An archived todo is moved back into `todos` first.
+        """
+        def toggle():
+            # Pipeline update flips the flag atomically on the server
+            return self._todos_for(username).find_one_and_update(
+                {'_id': todo_id, 'username': username},
+                [{'$set': {
+                    'completed': {'$not': '$completed'},
+                    'updated_at': datetime.now(timezone.utc)
+                }}],
+                return_document=ReturnDocument.AFTER
+            )
+        
+        todo = toggle()
+        if todo is None and self._unarchive(username, [todo_id]):
+            todo = toggle()
+        if todo:
+            self._bump_version(username)
+            broker.publish_local(username, 'toggled', {'todo': todo})
+        return todo
+    
+    def bulk_write_todos(self, username, operations, ordered=True):
+        """Apply a list of todo mutations in a single bulk_write.
+        
+        Each operation is one of ('create', {'title', 'description'}),
+        ('update', todo_id, update_data), ('delete', todo_id) or
+        ('toggle', todo_id). Returns one result dict per operation with a
+        `status` of 'ok', 'not_found', 'error' or 'skipped'. An ordered batch
+        stops at the first todo that is not found, like at a write error:
+        earlier operations are applied and later ones are skipped.
+        """
+        now = datetime.now(timezone.utc)
+        results = [None] * len(operations)
+        
+        # One query to find which referenced todos belong to the user
+        ids = [op[1] for op in operations if op[0] != 'create']
+        owned = set()
+        if ids:
+            owned = {todo['_id'] for todo in self._todos_for(username).find(
+                {'_id': {'$in': ids}, 'username': username}, {'_id': 1}
+            )}
+            missing = [todo_id for todo_id in ids if todo_id not in owned]
+            if missing:
+                # Archived todos are restored and then changed like any other
+                owned |= self._unarchive(username, missing)
+        
+        requests = []
+        request_positions = []
+        stopped = False
+        for i, op in enumerate(operations):
+            kind = op[0]
+            if stopped:
+                results[i] = {'status': 'skipped'}
+                continue
+            if kind == 'create':
+                todo = self._build_todo(username, **op[1])
+                requests.append(InsertOne(todo))
+                results[i] = {'status': 'ok', 'todo': self._as_stored(todo)}
+            elif op[1] not in owned:
+                results[i] = {'status': 'not_found'}
+                stopped = ordered
+                continue
+            elif kind == 'update':
+                update_data = dict(op[2], updated_at=now)
+                requests.append(UpdateOne(
+                    {'_id': op[1], 'username': username},
+                    {'$set': update_data}
+                ))
+                results[i] = {'status': 'ok'}
+            elif kind == 'toggle':
+                requests.append(UpdateOne(
+                    {'_id': op[1], 'username': username},
+                    [{'$set': {'completed': {'$not': '$completed'}, 'updated_at': now}}]
+                ))
+                results[i] = {'status': 'ok'}
+            elif kind == 'delete':
+                requests.append(DeleteOne({'_id': op[1], 'username': username}))
+                results[i] = {'status': 'ok'}
+            else:
+                raise ValueError(f'Unknown operation: {kind}')
+            request_positions.append(i)
+        
+        if requests:
+            try:
+                self._todos_for(username).bulk_write(requests, ordered=ordered)
+            except BulkWriteError as e:
+                failed = {err['index']: err.get('errmsg', 'Write failed')
+                          for err in e.details.get('writeErrors', [])}
+                first_failure = min(failed) if failed else len(requests)
+                for position, i in enumerate(request_positions):
+                    if position in failed:
+                        results[i] = {'status': 'error', 'error': failed[position]}
+                    elif ordered and position > first_failure:
+                        results[i] = {'status': 'skipped'}
+            deleted_ids = [op[1] for op, result in zip(operations, results)
+                           if op[0] == 'delete' and result['status'] == 'ok']
+            if deleted_ids:
+                self._record_tombstones(username, deleted_ids)
+            self._bump_version(username)
+        
+        # One query to load the post-write state of updated and toggled todos
+        changed = [operations[i][1] for i in request_positions
+                   if operations[i][0] in ('update', 'toggle') and results[i]['status'] == 'ok']
+        if changed:
+            current = {todo['_id']: todo for todo in self._todos_for(username).find(
+                {'_id': {'$in': changed}, 'username': username}
+            )}
+            for i in request_positions:
+                if operations[i][0] in ('update', 'toggle') and results[i]['status'] == 'ok':
+                    todo = current.get(operations[i][1])
+                    results[i] = {'status': 'ok', 'todo': todo} if todo else {'status': 'not_found'}
+        
+        event_types = {'create': 'created', 'update': 'updated', 'toggle': 'toggled', 'delete': 'deleted'}
+        for op, result in zip(operations, results):
+            if result['status'] != 'ok':
+                continue
+            if op[0] == 'delete':
+                broker.publish_local(username, 'deleted', {'_id': op[1]})
+            else:
+                broker.publish_local(username, event_types[op[0]], {'todo': result['todo']})
+        return results
+
+# Optional username-hash sharding across several named deployments (MONGO_SHARDS)
+_shards = parse_shards(MONGO_SHARDS)
+shard_router = ShardRouter(_shards, DATABASE_NAME) if _shards else None
+if shard_router:
+    shard_router.add_listener(MongoCommandMetrics())
+    shard_router.add_listener(RequestTraceListener())
 
 # Create a singleton instance
-db = Database()
+db = Database(
+    router=shard_router,
+    write_buffer=GroupCommitBuffer() if GROUP_COMMIT_ENABLED else None,
+    read_router=ReadRouter()
+)
 
@@ -0,0 +1,161 @@
+from pymongo import MongoClient, monitoring
+import os
+import threading
+
+
+def _int_env(name):
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else None
+
+
+def client_options_from_env():
+    """Build MongoClient keyword arguments from MONGO_* environment variables.
+
+    Unset variables are left out so pymongo's defaults apply.
+    """
+    options = {
+        'maxPoolSize': _int_env('MONGO_MAX_POOL_SIZE'),
+        'minPoolSize': _int_env('MONGO_MIN_POOL_SIZE'),
+        'maxIdleTimeMS': _int_env('MONGO_MAX_IDLE_TIME_MS'),
+        'waitQueueTimeoutMS': _int_env('MONGO_WAIT_QUEUE_TIMEOUT_MS'),
+        'connectTimeoutMS': _int_env('MONGO_CONNECT_TIMEOUT_MS'),
+        'serverSelectionTimeoutMS': _int_env('MONGO_SERVER_SELECTION_TIMEOUT_MS'),
+        'socketTimeoutMS': _int_env('MONGO_SOCKET_TIMEOUT_MS'),
+        # e.g. "zstd,snappy,zlib"; zstd and snappy need their optional packages
+        'compressors': os.getenv('MONGO_COMPRESSORS') or None,
+    }
+    write_concern = os.getenv('MONGO_WRITE_CONCERN')
+    if write_concern:
+        options['w'] = int(write_concern) if write_concern.isdigit() else write_concern
+    journal = os.getenv('MONGO_JOURNAL')
+    if journal:
+        options['journal'] = journal.lower() == 'true'
+    return {key: value for key, value in options.items() if value is not None}
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Track connection pool usage from pymongo CMAP events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.waiting = 0
+        self.open = 0
+        self.created = 0
+        self.checkout_failures = 0
+
+    def _add(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checked_out': self.checked_out,
+                'waiting': self.waiting,
+                'open': self.open,
+                'created': self.created,
+                'checkout_failures': self.checkout_failures
+            }
+
+    def connection_check_out_started(self, event):
+        self._add(waiting=1)
+
+    def connection_checked_out(self, event):
+        self._add(waiting=-1, checked_out=1)
+
+    def connection_check_out_failed(self, event):
+        self._add(waiting=-1, checkout_failures=1)
+
+    def connection_checked_in(self, event):
+        self._add(checked_out=-1)
+
+    def connection_created(self, event):
+        self._add(open=1, created=1)
+
+    def connection_closed(self, event):
+        self._add(open=-1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+class MongoClientFactory:
+    """Create one MongoClient per process, on first use.
+
+    A client created before a fork (e.g. gunicorn --preload) is never
+    reused in the child: the owning pid is checked on every access and a
+    fresh client is built in the new process.
+    """
+
+    def __init__(self, uri, options=None, client_class=MongoClient):
+        self.uri = uri
+        self.options = client_options_from_env() if options is None else options
+        self.client_class = client_class
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._client = None
+        self._pid = None
+        self._pool_stats = None
+        self._collections = {}
+
+    def add_listener(self, listener):
+        """Register a pymongo event listener for clients created from now on"""
+        self.listeners.append(listener)
+
+    def get_client(self):
+        pid = os.getpid()
+        if self._client is None or self._pid != pid:
+            with self._lock:
+                if self._client is None or self._pid != pid:
+                    self._pool_stats = PoolStatsListener()
+                    self._client = self.client_class(
+                        self.uri,
+                        event_listeners=[self._pool_stats, *self.listeners],
+                        **self.options
+                    )
+                    self._pid = pid
+                    self._collections = {}
+        return self._client
+
+    def get_collection(self, database_name, collection_name):
+        """Return a cached Collection handle from this process's client"""
+        client = self.get_client()
+        key = (database_name, collection_name)
+        collection = self._collections.get(key)
+        if collection is None:
+            collection = client[database_name][collection_name]
+            self._collections[key] = collection
+        return collection
+
+    def pool_stats(self):
+        """Connection pool usage for this process's client"""
+        stats = {
+            'pid': os.getpid(),
+            'connected': self._client is not None and self._pid == os.getpid(),
+            'max_pool_size': self.options.get('maxPoolSize', 100)
+        }
+        if stats['connected']:
+            stats.update(self._pool_stats.snapshot())
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
+            self._collections = {}
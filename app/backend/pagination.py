@@ -0,0 +1,132 @@
+import base64
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Page size limits for list endpoints
+DEFAULT_PAGE_LIMIT = int(os.getenv('TODOS_PAGE_DEFAULT_LIMIT', 50))
+MAX_PAGE_LIMIT = int(os.getenv('TODOS_PAGE_MAX_LIMIT', 200))
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Fields a list request may select with `fields=`; `_id` is always returned
+LIST_FIELDS = ('title', 'description', 'completed', 'created_at', 'updated_at')
+# Sort keys a list request may use with `sort=`; each has a keyset index
+SORT_FIELDS = ('created_at', 'updated_at')
+DEFAULT_SORT = ('created_at', -1)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def parse_limit(value):
+    """Parse the limit query parameter and clamp it to the server cap"""
+    if value is None or value == '':
+        return DEFAULT_PAGE_LIMIT
+    limit = int(value)
+    if limit < 1:
+        raise ValueError('Limit must be a positive integer')
+    return min(limit, MAX_PAGE_LIMIT)
+
+
+def parse_fields(value):
+    """Parse a comma-separated `fields` parameter; None means whole documents"""
+    if value is None or value == '':
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in LIST_FIELDS and field != '_id']
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return [field for field in fields if field != '_id']
+
+
+def parse_sort(value):
+    """Parse a `sort` parameter such as `-created_at` into (field, direction)"""
+    if value is None or value == '':
+        return DEFAULT_SORT
+    direction = -1 if value.startswith('-') else 1
+    field = value.lstrip('+-')
+    if field not in SORT_FIELDS:
+        raise ValueError(f'Cannot sort by {field}')
+    return field, direction
+
+
+def encode_cursor(todo, field='created_at'):
+    """Build an opaque cursor pointing just after the given todo"""
+    return encode_position(todo[field], todo['_id'])
+
+
+def _to_ms(timestamp):
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    # Mongo stores datetimes with millisecond precision
+    return round(timestamp.timestamp() * 1000)
+
+
+def encode_position(timestamp, object_id, issued_at=None):
+    """Build an opaque token for a (timestamp, _id) keyset position.
+    
+    `issued_at` optionally records when the client last caught up, for
+    tokens that expire (see `token_issued_at`).
+    """
+    payload = {
+        't': _to_ms(timestamp),
+        'id': str(object_id)
+    }
+    if issued_at is not None:
+        payload['i'] = _to_ms(issued_at)
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_payload(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(payload, dict):
+            raise TypeError('Cursor payload must be an object')
+        return payload
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into a (timestamp, ObjectId) keyset position"""
+    payload = _decode_payload(cursor)
+    try:
+        timestamp = EPOCH + timedelta(milliseconds=int(payload['t']))
+        return timestamp, ObjectId(payload['id'])
+    except (ValueError, TypeError, KeyError, InvalidId) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def encode_offset(offset):
+    """Build an opaque cursor for offset-based pages, such as ranked search results"""
+    raw = json.dumps({'o': offset}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_offset(cursor):
+    """Decode a cursor built by `encode_offset`"""
+    payload = _decode_payload(cursor)
+    try:
+        offset = int(payload['o'])
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+    if offset < 0:
+        raise InvalidCursor('Invalid cursor')
+    return offset
+
+
+def token_issued_at(cursor):
+    """Return the issue time recorded in a token, or None if it has none"""
+    payload = _decode_payload(cursor)
+    if 'i' not in payload:
+        return None
+    try:
+        return EPOCH + timedelta(milliseconds=int(payload['i']))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
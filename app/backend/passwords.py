@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import contextvars
+import os
+import threading
+import time
+import bcrypt
+try:
+    from backend.metrics import bcrypt_duration_seconds
+    from backend.profiling import note_bcrypt
+except ImportError:
+    from metrics import bcrypt_duration_seconds
+    from profiling import note_bcrypt
+
+# bcrypt releases the GIL while hashing, so a thread pool gives real parallelism
+# without the cost of shipping work to another process.
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+PASSWORD_POOL_WORKERS = int(os.getenv('PASSWORD_POOL_WORKERS', os.cpu_count() or 2))
+# Requests allowed to wait for a worker before new ones are rejected
+PASSWORD_POOL_MAX_PENDING = int(os.getenv('PASSWORD_POOL_MAX_PENDING', 32))
+# Seconds a request waits for its hash before giving up
+PASSWORD_POOL_TIMEOUT = float(os.getenv('PASSWORD_POOL_TIMEOUT', 10))
+
+
+class PoolSaturated(Exception):
+    """Raised when the password hashing pool cannot accept more work"""
+
+
+def hash_cost(hashed_password):
+    """Return the cost factor encoded in a bcrypt hash, e.g. 12 for $2b$12$..."""
+    try:
+        return int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def _timed(operation, fn):
+    """Wrap fn so its run time (excluding queueing) is recorded"""
+    def run(*args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            bcrypt_duration_seconds.observe(elapsed, operation)
+            note_bcrypt(elapsed)
+    return run
+
+
+class PasswordHasher:
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=PASSWORD_POOL_WORKERS,
+                 max_pending=PASSWORD_POOL_MAX_PENDING, timeout=PASSWORD_POOL_TIMEOUT):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+    def _get_executor(self):
+        # Created on first use so each forked worker process gets its own threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix='bcrypt'
+                    )
+        return self._executor
+
+    def _run(self, fn, *args):
+        """Run fn in the pool, rejecting immediately when it is saturated"""
+        if not self._slots.acquire(blocking=False):
+            raise PoolSaturated('Password hashing pool is saturated')
+        try:
+            # Run in the caller's context so the time lands in its request trace
+            future = self._get_executor().submit(contextvars.copy_context().run, fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise PoolSaturated('Timed out waiting for password hashing')
+
+    def hash_password(self, password):
+        """Hash a password with the configured cost factor"""
+        hashed = self._run(
+            _timed('hash', bcrypt.hashpw), password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds)
+        )
+        return hashed.decode('utf-8')
+
+    def verify_password(self, password, hashed_password):
+        """Check a password against a stored bcrypt hash"""
+        return self._run(
+            _timed('verify', bcrypt.checkpw), password.encode('utf-8'), hashed_password.encode('utf-8')
+        )
+
+    def needs_rehash(self, hashed_password):
+        """True when a stored hash was made with a different cost factor"""
+        return hash_cost(hashed_password) != self.rounds
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+# Create a singleton instance
+hasher = PasswordHasher()
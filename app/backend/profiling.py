@@ -0,0 +1,169 @@
+from contextvars import ContextVar
+from pathlib import Path
+from time import perf_counter, time_ns
+from flask import current_app, g, request
+from pymongo import monitoring
+import cProfile
+import hmac
+import os
+import random
+import tempfile
+import threading
+
+# Header an authorized caller sends, with PROFILE_TOKEN as its value, to profile one request
+PROFILE_HEADER = 'X-Profile-Token'
+# Profile dumps kept per endpoint; older ones are deleted
+PROFILE_KEEP_PER_ENDPOINT = int(os.getenv('PROFILE_KEEP_PER_ENDPOINT', 20))
+PROFILE_DEFAULT_DIR = os.path.join(tempfile.gettempdir(), 'backend-profiles')
+# Commands listed for one slow request; the totals still count all of them
+SLOW_REQUEST_MAX_COMMANDS = 50
+
+_current_trace = ContextVar('request_trace', default=None)
+# cProfile cannot profile two threads at once on newer Pythons, so profiled
+# requests take turns and a request arriving meanwhile is not profiled
+_profiler_lock = threading.Lock()
+
+
+class RequestTrace:
+    """Where one request spent its time: MongoDB commands and bcrypt"""
+
+    def __init__(self):
+        self.commands = []
+        self.command_count = 0
+        self.mongo_seconds = 0.0
+        self.bcrypt_seconds = 0.0
+        self._targets = {}
+
+    def command_started(self, event):
+        # Only the started event carries the database and collection
+        collection = event.command.get(event.command_name)
+        target = f'{event.database_name}.{collection}' if isinstance(collection, str) else event.database_name
+        self._targets[event.request_id] = target
+
+    def command_finished(self, event, outcome):
+        seconds = event.duration_micros / 1e6
+        self.command_count += 1
+        self.mongo_seconds += seconds
+        target = self._targets.pop(event.request_id, '')
+        if len(self.commands) < SLOW_REQUEST_MAX_COMMANDS:
+            self.commands.append((event.command_name, target, seconds, outcome))
+
+
+def note_bcrypt(seconds):
+    """Add password hashing time to the current request's trace, if any"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.bcrypt_seconds += seconds
+
+
+class RequestTraceListener(monitoring.CommandListener):
+    """Record MongoDB commands issued while a request is being traced.
+
+    pymongo publishes command events on the thread running the command,
+    so the request's trace is found through a context variable; commands
+    from background threads are ignored.
+    """
+
+    def started(self, event):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.command_started(event)
+
+    def succeeded(self, event):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.command_finished(event, 'success')
+
+    def failed(self, event):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.command_finished(event, 'failure')
+
+
+def _profile_requested():
+    token = current_app.config['PROFILE_TOKEN']
+    supplied = request.headers.get(PROFILE_HEADER)
+    if token and supplied:
+        return hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8'))
+    return False
+
+
+def _dump_profile(profiler, endpoint):
+    directory = Path(current_app.config['PROFILE_DIR'])
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{endpoint}.{time_ns()}.{os.getpid()}.prof'
+    profiler.dump_stats(path)
+    # Keep the newest dumps of this endpoint
+    dumps = sorted(
+        (p for p in directory.glob('*.prof') if p.name.rsplit('.', 3)[0] == endpoint),
+        key=lambda p: int(p.name.rsplit('.', 3)[1])
+    )
+    for old in dumps[:-PROFILE_KEEP_PER_ENDPOINT]:
+        old.unlink(missing_ok=True)
+    return path
+
+
+def _log_slow_request(trace, elapsed, response):
+    commands = ', '.join(
+        f'{name} {target} {seconds * 1000:.1f} ms' + ('' if outcome == 'success' else ' (failed)')
+        for name, target, seconds, outcome in trace.commands
+    )
+    current_app.logger.warning(
+        'Slow request %s %s (%s) %s in %.1f ms: mongo %.1f ms in %d commands, bcrypt %.1f ms, '
+        'other %.1f ms; commands: %s',
+        request.method, request.path, request.endpoint or 'unmatched', response.status_code,
+        elapsed * 1000, trace.mongo_seconds * 1000, trace.command_count,
+        trace.bcrypt_seconds * 1000,
+        (elapsed - trace.mongo_seconds - trace.bcrypt_seconds) * 1000, commands or 'none'
+    )
+
+
+def _stop_profiler():
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _profiler_lock.release()
+    return profiler
+
+
+def register_profiling(app):
+    """Profile sampled or requested requests and log slow ones.
+
+    Register before other after_request hooks so that timing and the
+    profile cover them too. Streamed bodies (export, events) are produced
+    after the hooks run and are not included.
+    """
+    @app.before_request
+    def start_profiling():
+        g.trace_start = perf_counter()
+        if app.config['SLOW_REQUEST_MS'] > 0:
+            g.trace_token = _current_trace.set(RequestTrace())
+        sampled = random.random() < app.config['PROFILE_SAMPLE_RATE']
+        g.profile_requested = _profile_requested()
+        if (sampled or g.profile_requested) and _profiler_lock.acquire(blocking=False):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def finish_profiling(response):
+        start = g.pop('trace_start', None)
+        if start is None:
+            return response
+        elapsed = perf_counter() - start
+        profiler = _stop_profiler()
+        if profiler is not None:
+            path = _dump_profile(profiler, request.endpoint or 'unmatched')
+            if g.profile_requested:
+                response.headers['X-Profile-File'] = path.name
+        trace = _current_trace.get()
+        if trace is not None and elapsed * 1000 >= app.config['SLOW_REQUEST_MS']:
+            _log_slow_request(trace, elapsed, response)
+        return response
+
+    @app.teardown_request
+    def reset_profiling(exc):
+        # Runs even when after_request did not, e.g. on an unhandled error
+        _stop_profiler()
+        token = g.pop('trace_token', None)
+        if token is not None:
+            _current_trace.reset(token)
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pymongo.read_preferences import Nearest, PrimaryPreferred, Secondary, SecondaryPreferred
+import os
+import threading
+
+# Where list, profile, search and stats reads go: 'primary' (default, no
+# routing), 'secondaryPreferred', 'secondary', 'nearest' or 'primaryPreferred'
+READ_PREFERENCE = os.getenv('READ_PREFERENCE', 'primary')
+# A user who wrote this recently reads from the primary; keep it above the
+# replication lag you expect
+READ_YOUR_WRITES_WINDOW_MS = int(os.getenv('READ_YOUR_WRITES_WINDOW_MS', 5000))
+# Secondaries lagging more than this are not read from (pymongo minimum is 90)
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv('MONGO_MAX_STALENESS_SECONDS', -1))
+# Users whose last write time is remembered in this process
+READ_ROUTER_MAX_USERS = int(os.getenv('READ_ROUTER_MAX_USERS', 100000))
+
+_MODES = {
+    'secondaryPreferred': SecondaryPreferred,
+    'secondary': Secondary,
+    'nearest': Nearest,
+    'primaryPreferred': PrimaryPreferred
+}
+
+# Marker for a user known to have never written
+_NEVER = datetime.min.replace(tzinfo=timezone.utc)
+
+
+class ReadRouter:
+    """Send a user's reads to secondaries unless they wrote recently.
+
+    Every write records the user's last write time here and in the user
+    document (`last_write_at`), and reading the user's version from the
+    primary refreshes it, so other processes learn about recent writes
+    too. A user whose last write is unknown or within the window reads
+    from the primary and so always sees their own writes.
+    """
+
+    def __init__(self, mode=READ_PREFERENCE, window_ms=READ_YOUR_WRITES_WINDOW_MS,
+                 max_staleness=MONGO_MAX_STALENESS_SECONDS, max_users=READ_ROUTER_MAX_USERS):
+        if mode != 'primary' and mode not in _MODES:
+            raise ValueError(f'Unknown read preference: {mode}')
+        self.read_preference = _MODES[mode](max_staleness=max_staleness) if mode in _MODES else None
+        self.window = timedelta(milliseconds=window_ms)
+        self.max_users = max_users
+        self._last_writes = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.read_preference is not None
+
+    def note_write(self, username, at=None):
+        """Record that the user has just written"""
+        self._remember(username, at or datetime.now(timezone.utc))
+
+    def note_last_write(self, username, last_write_at):
+        """Record the last write time read from the primary (None if never)"""
+        if last_write_at is None:
+            last_write_at = _NEVER
+        elif last_write_at.tzinfo is None:
+            last_write_at = last_write_at.replace(tzinfo=timezone.utc)
+        self._remember(username, last_write_at)
+
+    def _remember(self, username, last_write_at):
+        if not self.enabled:
+            return
+        with self._lock:
+            previous = self._last_writes.get(username)
+            if previous is None or last_write_at > previous:
+                self._last_writes[username] = last_write_at
+            self._last_writes.move_to_end(username)
+            while len(self._last_writes) > self.max_users:
+                self._last_writes.popitem(last=False)
+
+    def use_secondary(self, username):
+        if not self.enabled:
+            return False
+        with self._lock:
+            last_write_at = self._last_writes.get(username)
+        if last_write_at is None:
+            return False
+        return datetime.now(timezone.utc) - last_write_at > self.window
+
+    def collection(self, collection, username):
+        """The collection to read `username`'s documents from"""
+        if self.use_secondary(username):
+            return collection.with_options(read_preference=self.read_preference)
+        return collection
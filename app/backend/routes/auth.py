@@ -1,14 +1,24 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-import bcrypt
 from datetime import datetime
 try:
     from backend.models import db
+    from backend.passwords import PoolSaturated, hasher
+    from backend.conditional import make_etag, not_modified, with_etag
 except ImportError:
     from models import db
+    from conditional import make_etag, not_modified, with_etag
+    from passwords import PoolSaturated, hasher
 
 auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.errorhandler(PoolSaturated)
+def handle_pool_saturated(e):
+    # Shed load instead of queueing behind CPU-bound hashing
+    response = jsonify({'error': 'Server is busy, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     try:
@@ -36,13 +46,15 @@ def register():
             return jsonify({'error': 'User already exists'}), 400
         
         # Hash password
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        hashed_password = hasher.hash_password(password)
         
         # Store user in MongoDB
-        db.create_user(username, hashed_password.decode('utf-8'))
+        db.create_user(username, hashed_password)
         
         return jsonify({'message': 'User registered successfully'}), 201
         
+    except PoolSaturated:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -68,9 +80,17 @@ def login():
         
         # Verify password
         stored_password = user['password']
-        if not bcrypt.checkpw(password.encode('utf-8'), stored_password.encode('utf-8')):
+        if not hasher.verify_password(password, stored_password):
             return jsonify({'error': 'Invalid credentials'}), 401
         
+        # Transparently upgrade hashes made with a different cost factor.
+        # Best effort: a busy pool must not fail a verified login
+        if hasher.needs_rehash(stored_password):
+            try:
+                db.update_user_password(username, hasher.hash_password(password))
+            except PoolSaturated as e:
+                current_app.logger.warning('Skipped password rehash for %s: %s', username, e)
+        
         # Create JWT token
         access_token = create_access_token(identity=username)
         
@@ -81,6 +101,8 @@ def login():
             }
         }), 200
         
+    except PoolSaturated:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -89,15 +111,21 @@ def login():
 def profile():
     try:
         current_user = get_jwt_identity()
-        user = db.find_user(current_user)
+        user = db.find_user(current_user, secondary_ok=True)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        return jsonify({
+        etag = make_etag(current_user, user.get('version', 0), 'profile')
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        response = jsonify({
             'username': user['username'],
-            'created_at': user['created_at'].isoformat()
-        }), 200
+            'created_at': user['created_at']
+        })
+        return with_etag(response, etag), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
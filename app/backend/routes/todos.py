@@ -1,32 +1,394 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from datetime import datetime, timedelta, timezone
+import os
+import time
 from bson import ObjectId
 from bson.errors import InvalidId
 try:
-    from backend.models import db
+    from backend.models import TOMBSTONE_TTL_SECONDS, db
+    from backend.pagination import (
+        EPOCH, InvalidCursor, decode_cursor, decode_offset, encode_cursor, encode_offset,
+        encode_position, parse_fields, parse_limit, parse_sort, token_issued_at
+    )
+    from backend.conditional import make_etag, not_modified, with_etag
+    from backend.events import broker
+    from backend.cache import VersionedCache
+    from backend.group_commit import WriteBufferFull
 except ImportError:
-    from models import db
+    from models import TOMBSTONE_TTL_SECONDS, db
+    from events import broker
+    from cache import VersionedCache
+    from group_commit import WriteBufferFull
+    from conditional import make_etag, not_modified, with_etag
+    from pagination import (
+        EPOCH, InvalidCursor, decode_cursor, decode_offset, encode_cursor, encode_offset,
+        encode_position, parse_fields, parse_limit, parse_sort, token_issued_at
+    )
 
 todos_bp = Blueprint('todos', __name__)
 
+# Maximum number of operations accepted by POST /batch
+BATCH_MAX_OPERATIONS = int(os.getenv('TODOS_BATCH_MAX_OPERATIONS', 500))
+# Longest accepted search query
+SEARCH_MAX_QUERY_LENGTH = 200
+# Per-day stats window, in days
+STATS_DEFAULT_DAYS = 30
+STATS_MAX_DAYS = 366
+
+# Stats are reused until the TTL passes or the user's data version changes
+stats_cache = VersionedCache(ttl=float(os.getenv('STATS_CACHE_TTL_SECONDS', 10)))
+
+@todos_bp.errorhandler(WriteBufferFull)
+def handle_write_buffer_full(e):
+    # Shed load instead of letting grouped inserts queue without bound
+    response = jsonify({'error': 'Server is busy, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def _clean_title(data):
+    """Validate a title value; returns (title, error)"""
+    if not isinstance(data['title'], str):
+        return None, 'Title must be a string'
+    title = data['title'].strip()
+    if not title or len(title) == 0:
+        return None, 'Title cannot be empty'
+    if len(title) > 200:
+        return None, 'Title must be less than 200 characters'
+    return title, None
+
+def _clean_description(data):
+    """Validate a description value; returns (description, error)"""
+    if not isinstance(data.get('description', ''), str):
+        return None, 'Description must be a string'
+    description = data.get('description', '').strip()
+    if len(description) > 1000:
+        return None, 'Description must be less than 1000 characters'
+    return description, None
+
+def validate_new_todo(data):
+    """Validate a create payload; returns (fields, error)"""
+    if not data or not data.get('title'):
+        return None, 'Title is required'
+    title, error = _clean_title(data)
+    if error:
+        return None, error
+    description, error = _clean_description(data)
+    if error:
+        return None, error
+    return {'title': title, 'description': description}, None
+
+def validate_todo_update(data):
+    """Validate an update payload; returns (update_data, error)"""
+    data = data or {}
+    if not isinstance(data, dict):
+        return None, 'Update data must be an object'
+    update_data = {}
+    if 'title' in data:
+        title, error = _clean_title(data)
+        if error:
+            return None, error
+        update_data['title'] = title
+    if 'description' in data:
+        description, error = _clean_description(data)
+        if error:
+            return None, error
+        update_data['description'] = description
+    if 'completed' in data:
+        # Ensure completed is a boolean
+        update_data['completed'] = bool(data['completed'])
+    return update_data, None
+
+def _parse_completed(value):
+    """Parse the completed filter; returns (value, error) with None meaning no filter"""
+    if value is None or value == '':
+        return None, None
+    if value.lower() in ('true', '1'):
+        return True, None
+    if value.lower() in ('false', '0'):
+        return False, None
+    return None, 'Completed must be true or false'
+
+def _parse_include_archived(value):
+    return (value or '').lower() in ('true', '1')
+
+def _parse_todo_id(todo_id):
+    """Convert a string ID to ObjectId; returns None when invalid"""
+    try:
+        return ObjectId(todo_id)
+    except (ValueError, TypeError, InvalidId):
+        return None
+
 @todos_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_todos():
     try:
         current_user = get_jwt_identity()
-        user_todos = db.get_user_todos(current_user)
         
-        # Convert ObjectId to string for JSON serialization
-        for todo in user_todos:
-            todo['_id'] = str(todo['_id'])
-            todo['created_at'] = todo['created_at'].isoformat()
-            todo['updated_at'] = todo['updated_at'].isoformat()
+        # Keyset pagination on (created_at, _id)
+        try:
+            limit = parse_limit(request.args.get('limit'))
+        except ValueError:
+            return jsonify({'error': 'Limit must be a positive integer'}), 400
+        try:
+            fields = parse_fields(request.args.get('fields'))
+            sort = parse_sort(request.args.get('sort'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        completed, error = _parse_completed(request.args.get('completed'))
+        if error:
+            return jsonify({'error': error}), 400
+        include_archived = _parse_include_archived(request.args.get('include_archived'))
+        after = None
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                after = decode_cursor(cursor)
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+        
+        # Answer revalidation from the version counter alone
+        version = db.get_user_version(current_user)
+        etag = make_etag(current_user, version, limit, cursor,
+                         request.args.get('fields'), request.args.get('sort'), completed,
+                         include_archived)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        # A secondary may lag the version in the ETag, so its answers are not cached
+        secondary = db.reads_from_secondary(current_user)
+        user_todos, has_more = db.get_user_todos_page(
+            current_user, limit, after, completed=completed, sort=sort, fields=fields,
+            include_archived=include_archived, secondary_ok=secondary
+        )
+        next_cursor = encode_cursor(user_todos[-1], sort[0]) if has_more else None
+        if fields is not None and sort[0] not in fields:
+            # The sort field was only fetched to build the cursor
+            for todo in user_todos:
+                todo.pop(sort[0], None)
+        
+        response = jsonify({'todos': user_todos, 'next_cursor': next_cursor})
+        return (response if secondary else with_etag(response, etag)), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@todos_bp.route('/stats', methods=['GET'])
+@jwt_required()
+def get_stats():
+    try:
+        current_user = get_jwt_identity()
+        
+        try:
+            days = int(request.args.get('days', STATS_DEFAULT_DAYS))
+        except ValueError:
+            return jsonify({'error': 'Days must be a positive integer'}), 400
+        if days < 1:
+            return jsonify({'error': 'Days must be a positive integer'}), 400
+        days = min(days, STATS_MAX_DAYS)
+        
+        version = db.get_user_version(current_user)
+        # The per-day window moves at midnight UTC even without writes
+        etag = make_etag(current_user, version, 'stats', days, datetime.now(timezone.utc).date())
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        secondary = False
+        stats = stats_cache.get((current_user, days), version)
+        if stats is None:
+            secondary = db.reads_from_secondary(current_user)
+            stats = db.get_todo_stats(current_user, days, secondary_ok=secondary)
+            if not secondary:
+                stats_cache.set((current_user, days), version, stats)
+        
+        response = jsonify(dict(stats, days=days))
+        return (response if secondary else with_etag(response, etag)), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@todos_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_todos():
+    try:
+        current_user = get_jwt_identity()
+        
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Search query is required'}), 400
+        if len(query) > SEARCH_MAX_QUERY_LENGTH:
+            return jsonify({'error': f'Search query must be less than {SEARCH_MAX_QUERY_LENGTH} characters'}), 400
+        try:
+            limit = parse_limit(request.args.get('limit'))
+        except ValueError:
+            return jsonify({'error': 'Limit must be a positive integer'}), 400
+        offset = 0
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                offset = decode_offset(cursor)
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+        
+        version = db.get_user_version(current_user)
+        etag = make_etag(current_user, version, 'search', query, limit, cursor)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        secondary = db.reads_from_secondary(current_user)
+        results, has_more = db.search_todos(current_user, query, limit, offset, secondary_ok=secondary)
+        next_cursor = encode_offset(offset + limit) if has_more else None
+        
+        response = jsonify({'todos': results, 'next_cursor': next_cursor})
+        return (response if secondary else with_etag(response, etag)), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@todos_bp.route('/changes', methods=['GET'])
+@jwt_required()
+def get_changes():
+    try:
+        current_user = get_jwt_identity()
+        
+        try:
+            limit = parse_limit(request.args.get('limit'))
+        except ValueError:
+            return jsonify({'error': 'Limit must be a positive integer'}), 400
+        
+        now = datetime.now(timezone.utc)
+        since_token = request.args.get('since')
+        if since_token:
+            try:
+                since = decode_cursor(since_token)
+                issued_at = token_issued_at(since_token) or since[0]
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid sync token'}), 400
+            # Tombstones older than their TTL are gone, so the client must start over
+            if issued_at < now - timedelta(seconds=TOMBSTONE_TTL_SECONDS):
+                return jsonify({'error': 'Sync token expired', 'full_resync': True}), 410
+        else:
+            since = (EPOCH, ObjectId('0' * 24))
+            issued_at = now
+        
+        changed, deleted, has_more, last = db.get_changes(current_user, since, limit)
         
-        return jsonify({'todos': user_todos}), 200
+        if has_more:
+            # Mid-sync pages keep the issue time of the sync they continue
+            next_position = last
+        else:
+            issued_at = now
+            # Do not move past writes that may still be committing
+            window = timedelta(milliseconds=current_app.config['SYNC_SAFETY_WINDOW_MS'])
+            horizon = (now - window, ObjectId('0' * 24))
+            next_position = max(since, horizon)
         
+        return jsonify({
+            'changes': changed,
+            'deleted': deleted,
+            'has_more': has_more,
+            'next_since': encode_position(*next_position, issued_at=issued_at)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@todos_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_todos():
+    try:
+        current_user = get_jwt_identity()
+        batch_size = current_app.config['EXPORT_BATCH_SIZE']
+        # Refreshes the user's last write time so a recent writer reads from the primary
+        db.get_user_version(current_user)
+        cursor = db.iter_user_todos(
+            current_user, batch_size=batch_size,
+            include_archived=_parse_include_archived(request.args.get('include_archived'))
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        # Stream one JSON document per line straight from the cursor
+        try:
+            for todo in cursor:
+                yield current_app.json.dumps(todo) + '\n'
+        finally:
+            cursor.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename="todos.ndjson"'}
+    )
+
+def _events_serializer():
+    return URLSafeTimedSerializer(current_app.config['JWT_SECRET_KEY'], salt='todo-events')
+
+
+@todos_bp.route('/events/token', methods=['POST'])
+@jwt_required()
+def issue_events_token():
+    # EventSource cannot send headers. Instead of the access token, its URL
+    # carries this short-lived token that only opens an event stream
+    return jsonify({
+        'token': _events_serializer().dumps(get_jwt_identity()),
+        'expires_in': current_app.config['EVENTS_TOKEN_SECONDS']
+    })
+
+@todos_bp.route('/events', methods=['GET'])
+def todo_events():
+    token = request.args.get('token')
+    if token:
+        try:
+            current_user = _events_serializer().loads(
+                token, max_age=current_app.config['EVENTS_TOKEN_SECONDS']
+            )
+        except BadSignature:
+            return jsonify({'error': 'Invalid or expired event stream token'}), 401
+    else:
+        verify_jwt_in_request()
+        current_user = get_jwt_identity()
+    
+    subscription = None
+    try:
+        heartbeat = current_app.config['EVENTS_HEARTBEAT_SECONDS']
+        max_seconds = current_app.config['EVENTS_MAX_STREAM_SECONDS']
+        subscription = broker.subscribe(current_user)
+        # Change streams watch one deployment, so sharded setups use in-process events
+        if db.router is None:
+            broker.start_change_stream(db.todos)
     except Exception as e:
+        if subscription is not None:
+            subscription.close()
         return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        deadline = time.monotonic() + max_seconds
+        try:
+            yield 'retry: 3000\n\n'
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+                if event is None:
+                    yield ': keepalive\n\n'
+                    continue
+                payload = {k: v for k, v in event.items() if k not in ('id', 'type')}
+                lines = f"event: {event['type']}\ndata: {current_app.json.dumps(payload)}\n\n"
+                if 'id' in event:
+                    lines = f"id: {event['id']}\n" + lines
+                yield lines
+        finally:
+            subscription.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @todos_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -35,35 +397,22 @@ def create_todo():
         current_user = get_jwt_identity()
         data = request.get_json()
         
-        if not data or not data.get('title'):
-            return jsonify({'error': 'Title is required'}), 400
-        
         # Input validation and sanitization
-        title = data['title'].strip()
-        description = data.get('description', '').strip()
-        
-        if not title or len(title) == 0:
-            return jsonify({'error': 'Title cannot be empty'}), 400
-        if len(title) > 200:
-            return jsonify({'error': 'Title must be less than 200 characters'}), 400
-        if len(description) > 1000:
-            return jsonify({'error': 'Description must be less than 1000 characters'}), 400
+        fields, error = validate_new_todo(data)
+        if error:
+            return jsonify({'error': error}), 400
         
         # Create new todo
-        result = db.create_todo(
+        todo = db.create_todo(
             current_user,
-            title,
-            description
+            fields['title'],
+            fields['description']
         )
         
-        # Get the created todo
-        todo = db.todos.find_one({'_id': result.inserted_id})
-        todo['_id'] = str(todo['_id'])
-        todo['created_at'] = todo['created_at'].isoformat()
-        todo['updated_at'] = todo['updated_at'].isoformat()
-        
         return jsonify({'todo': todo}), 201
         
+    except WriteBufferFull:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -81,35 +430,16 @@ def update_todo(todo_id):
             return jsonify({'error': 'Invalid todo ID'}), 400
         
         # Prepare update data with validation
-        update_data = {}
-        if 'title' in data:
-            title = data['title'].strip()
-            if not title or len(title) == 0:
-                return jsonify({'error': 'Title cannot be empty'}), 400
-            if len(title) > 200:
-                return jsonify({'error': 'Title must be less than 200 characters'}), 400
-            update_data['title'] = title
-        if 'description' in data:
-            description = data['description'].strip()
-            if len(description) > 1000:
-                return jsonify({'error': 'Description must be less than 1000 characters'}), 400
-            update_data['description'] = description
-        if 'completed' in data:
-            # Ensure completed is a boolean
-            update_data['completed'] = bool(data['completed'])
+        update_data, error = validate_todo_update(data)
+        if error:
+            return jsonify({'error': error}), 400
         
         # Update todo
-        result = db.update_todo(object_id, current_user, update_data)
+        todo = db.update_todo(object_id, current_user, update_data)
         
-        if result.matched_count == 0:
+        if not todo:
             return jsonify({'error': 'Todo not found'}), 404
         
-        # Get updated todo
-        todo = db.todos.find_one({'_id': object_id})
-        todo['_id'] = str(todo['_id'])
-        todo['created_at'] = todo['created_at'].isoformat()
-        todo['updated_at'] = todo['updated_at'].isoformat()
-        
         return jsonify({'todo': todo}), 200
         
     except Exception as e:
@@ -151,18 +481,85 @@ def toggle_todo(todo_id):
             return jsonify({'error': 'Invalid todo ID'}), 400
         
         # Toggle todo
-        result = db.toggle_todo(object_id, current_user)
+        todo = db.toggle_todo(object_id, current_user)
         
-        if not result:
+        if not todo:
             return jsonify({'error': 'Todo not found'}), 404
         
-        # Get updated todo
-        todo = db.todos.find_one({'_id': object_id})
-        todo['_id'] = str(todo['_id'])
-        todo['created_at'] = todo['created_at'].isoformat()
-        todo['updated_at'] = todo['updated_at'].isoformat()
-        
         return jsonify({'todo': todo}), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@todos_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def batch_todos():
+    try:
+        current_user = get_jwt_identity()
+        data = request.get_json()
+        
+        if not isinstance(data, dict) or not isinstance(data.get('operations'), list) or not data['operations']:
+            return jsonify({'error': 'Operations are required'}), 400
+        if len(data['operations']) > BATCH_MAX_OPERATIONS:
+            return jsonify({'error': f'At most {BATCH_MAX_OPERATIONS} operations are allowed'}), 400
+        ordered = bool(data.get('ordered', True))
+        
+        # Validate every operation with the same rules as the single-item routes
+        operations = []
+        positions = []
+        results = [None] * len(data['operations'])
+        for i, op in enumerate(data['operations']):
+            kind = op.get('op') if isinstance(op, dict) else None
+            error = None
+            if kind == 'create':
+                fields, error = validate_new_todo(op)
+                parsed = ('create', fields)
+            elif kind in ('update', 'delete', 'toggle'):
+                object_id = _parse_todo_id(op.get('id'))
+                if object_id is None:
+                    error = 'Invalid todo ID'
+                elif kind == 'update':
+                    update_data, error = validate_todo_update(op.get('data'))
+                    parsed = ('update', object_id, update_data)
+                else:
+                    parsed = (kind, object_id)
+            else:
+                error = 'Unknown operation'
+            
+            if error:
+                results[i] = {'index': i, 'op': kind, 'status': 400, 'error': error}
+            else:
+                operations.append(parsed)
+                positions.append(i)
+        
+        # An ordered batch is all-or-nothing at validation time
+        if ordered and len(operations) < len(results):
+            for i, result in enumerate(results):
+                if result is None:
+                    results[i] = {'index': i, 'op': data['operations'][i]['op'], 'status': 424,
+                                  'error': 'Not executed due to invalid operation'}
+            return jsonify({'results': results}), 400
+        
+        outcomes = db.bulk_write_todos(current_user, operations, ordered=ordered) if operations else []
+        
+        for i, parsed, outcome in zip(positions, operations, outcomes):
+            kind = parsed[0]
+            result = {'index': i, 'op': kind}
+            if outcome['status'] == 'ok':
+                result['status'] = 201 if kind == 'create' else 200
+                if kind == 'delete':
+                    result['message'] = 'Todo deleted successfully'
+                else:
+                    result['todo'] = outcome['todo']
+            elif outcome['status'] == 'not_found':
+                result.update({'status': 404, 'error': 'Todo not found'})
+            elif outcome['status'] == 'skipped':
+                result.update({'status': 424, 'error': 'Not executed due to earlier error'})
+            else:
+                result.update({'status': 500, 'error': outcome['error']})
+            results[i] = result
+        
+        return jsonify({'results': results}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,122 @@
+from collections import OrderedDict
+import os
+import re
+import threading
+
+# 'auto' uses the Mongo text index and falls back to the in-process index;
+# 'text' and 'memory' force one of them
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+# Number of users whose in-process index is kept in memory
+SEARCH_INDEX_CACHE_SIZE = int(os.getenv('SEARCH_INDEX_CACHE_SIZE', 256))
+
+# Relative weight of each searchable field, shared with the todos text index
+FIELD_WEIGHTS = {'title': 3, 'description': 1}
+
+_TOKEN = re.compile(r'\w+')
+_PHRASE = re.compile(r'"([^"]*)"')
+
+
+def tokenize(text):
+    """Split text into lower-case word tokens"""
+    return _TOKEN.findall(text.casefold())
+
+
+def parse_query(query):
+    """Split a search string into (terms, excluded terms, phrases).
+
+    Follows MongoDB $text syntax: words are OR-ed, `-word` excludes
+    documents containing it and `"a phrase"` must appear verbatim.
+    """
+    phrases = [phrase.casefold() for phrase in _PHRASE.findall(query) if phrase.strip()]
+    rest = _PHRASE.sub(' ', query)
+    terms, excluded = [], []
+    for word in rest.split():
+        target = excluded if word.startswith('-') else terms
+        target.extend(tokenize(word))
+    for phrase in phrases:
+        terms.extend(tokenize(phrase))
+    return terms, excluded, phrases
+
+
+class InvertedIndex:
+    """Term -> postings index over one user's todos.
+
+    Scores approximate MongoDB's text score: for each matching term and
+    field, weight * (0.5 + 0.5 * frequency / field length). Stemming and
+    stop words are not applied.
+    """
+
+    def __init__(self, todos=()):
+        self.todos = {}
+        self.postings = {}
+        for todo in todos:
+            self.add(todo)
+
+    def add(self, todo):
+        self.todos[todo['_id']] = todo
+        for field, weight in FIELD_WEIGHTS.items():
+            tokens = tokenize(todo.get(field) or '')
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, frequency in counts.items():
+                postings = self.postings.setdefault(token, {})
+                score = weight * (0.5 + 0.5 * frequency / len(tokens))
+                postings[todo['_id']] = postings.get(todo['_id'], 0) + score
+
+    def _contains_phrase(self, todo, phrase):
+        return any(phrase in (todo.get(field) or '').casefold() for field in FIELD_WEIGHTS)
+
+    def search(self, query):
+        """Return matching todos, best first, each with a `score` field"""
+        terms, excluded, phrases = parse_query(query)
+        scores = {}
+        for term in set(terms):
+            for todo_id, score in self.postings.get(term, {}).items():
+                scores[todo_id] = scores.get(todo_id, 0) + score
+        for term in excluded:
+            for todo_id in self.postings.get(term, {}):
+                scores.pop(todo_id, None)
+        results = []
+        for todo_id, score in scores.items():
+            todo = self.todos[todo_id]
+            if all(self._contains_phrase(todo, phrase) for phrase in phrases):
+                results.append(dict(todo, score=score))
+        results.sort(key=lambda todo: (todo['score'], todo['_id']), reverse=True)
+        return results
+
+
+class SearchIndexCache:
+    """LRU of per-user inverted indexes keyed by the user's data version.
+
+    Every todo mutation bumps the user's version, so a cached index is
+    reused only while it still matches the stored data.
+    """
+
+    def __init__(self, max_users=SEARCH_INDEX_CACHE_SIZE):
+        self.max_users = max_users
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username, version, load):
+        """Return the user's index for `version`, building it with `load()` if needed"""
+        with self._lock:
+            cached = self._indexes.get(username)
+            if cached and cached[0] == version:
+                self._indexes.move_to_end(username)
+                return cached[1]
+        index = InvertedIndex(load())
+        with self._lock:
+            self._indexes[username] = (version, index)
+            self._indexes.move_to_end(username)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+# Create a singleton instance
+search_cache = SearchIndexCache()
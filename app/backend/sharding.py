@@ -0,0 +1,308 @@
+from bisect import bisect
+from flask import jsonify, request
+from pymongo import MongoClient, ReplaceOne
+import click
+import hashlib
+import os
+import re
+import threading
+import time
+try:
+    from backend.mongo import MongoClientFactory
+except ImportError:
+    from mongo import MongoClientFactory
+
+# Named shards, e.g. "a=mongodb://host-a:27017,b=mongodb://host-b1,host-b2/?replicaSet=rs";
+# empty means a single deployment. Users are placed by shard name, so a URI
+# can change (credentials, options, hosts) without moving anyone
+MONGO_SHARDS = os.getenv('MONGO_SHARDS', '')
+# Points per shard on the hash ring; more points spread users more evenly
+SHARD_VIRTUAL_NODES = int(os.getenv('SHARD_VIRTUAL_NODES', 128))
+# How long a process trusts its last comparison of the configured and stored ring
+SHARD_RING_CHECK_SECONDS = float(os.getenv('SHARD_RING_CHECK_SECONDS', 10))
+
+# Every shard stores the ring its users were last placed by in this collection
+RING_COLLECTION = 'shard_ring'
+
+# Collections whose documents belong to a single user and live on that user's shard
+SHARDED_COLLECTIONS = ('users', 'todos', 'todos_archive', 'todo_tombstones')
+
+
+# A new entry starts at "<name>=mongodb://" or "<name>=mongodb+srv://"; other
+# commas belong to a URI's host list
+_SHARD_SEPARATOR = re.compile(r',\s*(?=[\w-]+=mongodb(?:\+srv)?://)')
+_SHARD_ENTRY = re.compile(r'([\w-]+)=(mongodb(?:\+srv)?://.+)')
+
+
+def parse_shards(value):
+    """Parse MONGO_SHARDS into {name: uri}.
+
+    Error messages name the offending entry by position only, so URIs and
+    their credentials never end up in logs.
+    """
+    shards = {}
+    if not value.strip():
+        return shards
+    for position, entry in enumerate(_SHARD_SEPARATOR.split(value.strip()), 1):
+        match = _SHARD_ENTRY.fullmatch(entry.strip())
+        if match is None:
+            raise ValueError(f'MONGO_SHARDS entry {position} is not <name>=mongodb://...')
+        name, uri = match.groups()
+        if name in shards:
+            raise ValueError(f'MONGO_SHARDS names shard {name!r} twice')
+        shards[name] = uri
+    return shards
+
+
+class RingMismatch(Exception):
+    """The configured shards differ from the ring users were placed by"""
+
+
+class MoveConflict(Exception):
+    """The target shard already has a different user with the same username"""
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to shard names.
+
+    Adding a shard moves only the keys that now hash to it, roughly
+    1/N of them, instead of reshuffling every user.
+    """
+
+    def __init__(self, shards, virtual_nodes=SHARD_VIRTUAL_NODES):
+        if not shards:
+            raise ValueError('A hash ring needs at least one shard')
+        self.layout = {'shards': sorted(shards), 'virtual_nodes': virtual_nodes}
+        points = sorted(
+            (_hash(f'{shard}#{replica}'), shard)
+            for shard in shards
+            for replica in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, key):
+        index = bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._shards[index]
+
+
+class ShardRouter:
+    """Route each user's documents to one of several named MongoDB deployments.
+
+    The hash ring is built over shard names, never URIs, so rotating
+    credentials or editing URI options leaves every user where they are.
+    Renaming a shard moves users as if it had been replaced.
+
+    Each shard records the ring its users were placed by. Until `rebalance`
+    has moved everyone to a changed ring, `check_layout` raises RingMismatch
+    and the app refuses requests, so nobody is looked up on (or registers a
+    duplicate username on) a shard that does not hold their documents yet.
+    """
+
+    def __init__(self, shards, database_name, client_class=MongoClient, options=None,
+                 check_seconds=SHARD_RING_CHECK_SECONDS):
+        self.database_name = database_name
+        self.factories = {
+            name: MongoClientFactory(uri, options=options, client_class=client_class)
+            for name, uri in shards.items()
+        }
+        self.ring = HashRing(list(self.factories))
+        self.check_seconds = check_seconds
+        self._checked_at = None
+        self._check_lock = threading.Lock()
+
+    @property
+    def shards(self):
+        return list(self.factories)
+
+    def shard_for(self, username):
+        return self.ring.shard_for(username)
+
+    def database(self, shard):
+        return self.factories[shard].get_client()[self.database_name]
+
+    def databases(self):
+        """The application database on every shard"""
+        return [self.database(shard) for shard in self.factories]
+
+    def collection(self, username, name):
+        """The collection holding `username`'s documents"""
+        return self.factories[self.shard_for(username)].get_collection(self.database_name, name)
+
+    def stored_layouts(self):
+        """{shard: the ring layout stored on it, or None}"""
+        return {
+            shard: self.database(shard)[RING_COLLECTION].find_one({'_id': 'ring'}, {'_id': 0})
+            for shard in self.factories
+        }
+
+    def save_layout(self):
+        """Record the configured ring on every shard as the one users are placed by"""
+        for shard in self.factories:
+            self.database(shard)[RING_COLLECTION].replace_one(
+                {'_id': 'ring'}, {'_id': 'ring', **self.ring.layout}, upsert=True
+            )
+        with self._check_lock:
+            self._checked_at = time.monotonic()
+
+    def check_layout(self):
+        """Raise RingMismatch unless users are placed by the configured ring.
+
+        A deployment without a stored ring adopts the configured one. A match
+        is remembered for `check_seconds`, a mismatch is not.
+        """
+        with self._check_lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.check_seconds:
+                return
+        stored = self.stored_layouts()
+        differing = sorted(
+            shard for shard, layout in stored.items()
+            if layout is not None and layout != self.ring.layout
+        )
+        if differing:
+            raise RingMismatch(
+                f'Shards {", ".join(differing)} were placed by a different ring; run `shards rebalance`'
+            )
+        if any(layout is None for layout in stored.values()):
+            if any(layout is not None for layout in stored.values()):
+                # A shard joined without the ring changing shape, e.g. its ring record was lost
+                raise RingMismatch('Some shards have no ring record; run `shards rebalance`')
+            self.save_layout()
+            return
+        with self._check_lock:
+            self._checked_at = time.monotonic()
+
+    def add_listener(self, listener):
+        for factory in self.factories.values():
+            factory.add_listener(listener)
+
+    def close(self):
+        for factory in self.factories.values():
+            factory.close()
+
+
+def misplaced_users(router):
+    """Yield (username, current shard, target shard) for users on the wrong shard"""
+    for shard in router.shards:
+        for user in router.database(shard).users.find({}, {'username': 1}):
+            target = router.shard_for(user['username'])
+            if target != shard:
+                yield user['username'], shard, target
+
+
+def move_user(router, username, source, target):
+    """Copy a user's documents to the target shard, then delete them from the source.
+
+    Copies are replace-upserts by _id, so an interrupted move can simply be run
+    again. Writes made to the user on the source while it is moving are
+    not carried over; run migrations with writes paused. Raises MoveConflict,
+    before copying anything, if the username is taken on the target.
+    """
+    moved = {}
+    source_db = router.database(source)
+    target_db = router.database(target)
+    user = source_db.users.find_one({'username': username}, {'_id': 1})
+    if user and target_db.users.find_one({'username': username, '_id': {'$ne': user['_id']}}, {'_id': 1}):
+        raise MoveConflict(f'{username} is registered on both {source} and {target}')
+    for name in SHARDED_COLLECTIONS:
+        documents = list(source_db[name].find({'username': username}))
+        if documents:
+            target_db[name].bulk_write([
+                ReplaceOne({'_id': document['_id']}, document, upsert=True)
+                for document in documents
+            ], ordered=False)
+        moved[name] = len(documents)
+    for name in SHARDED_COLLECTIONS:
+        source_db[name].delete_many({'username': username})
+    return moved
+
+
+def rebalance(router, dry_run=False):
+    """Move every user to the shard the ring assigns it.
+
+    Returns (moves made, failures) where failures are (username, source,
+    target, error). A user that fails is skipped so the others still move;
+    the ring is recorded as current, letting the app serve again, only once
+    nobody is left to move.
+    """
+    moves = list(misplaced_users(router))
+    if dry_run:
+        return moves, []
+    done = []
+    failures = []
+    for username, source, target in moves:
+        try:
+            move_user(router, username, source, target)
+        except Exception as e:
+            failures.append((username, source, target, e))
+        else:
+            done.append((username, source, target))
+    if not failures:
+        router.save_layout()
+    return done, failures
+
+
+def register_ring_check(app, database):
+    """Answer API requests with 503 while `database.router` has a ring mismatch"""
+    @app.before_request
+    def check_shard_ring():
+        if database.router is None or not request.path.startswith('/api/'):
+            return None
+        try:
+            database.router.check_layout()
+        except RingMismatch:
+            return jsonify({'error': 'Shards are being rebalanced, try again later'}), 503
+        return None
+
+
+def _router():
+    try:
+        from backend import models
+    except ImportError:
+        import models
+    if models.db.router is None:
+        raise click.ClickException('Sharding is not configured; set MONGO_SHARDS')
+    return models.db.router
+
+
+@click.group('shards')
+def shards_cli():
+    """Inspect and rebalance username-hash shards"""
+
+
+@shards_cli.command('status')
+def status_command():
+    """Show users per shard and how many are on the wrong shard"""
+    router = _router()
+    misplaced = {}
+    for _, source, _ in misplaced_users(router):
+        misplaced[source] = misplaced.get(source, 0) + 1
+    for shard in router.shards:
+        users = router.database(shard).users.count_documents({})
+        click.echo(f'{shard}: {users} users, {misplaced.get(shard, 0)} to move')
+    try:
+        router.check_layout()
+        click.echo('ring: current')
+    except RingMismatch as e:
+        click.echo(f'ring: {e}')
+
+
+@shards_cli.command('rebalance')
+@click.option('--dry-run', is_flag=True, help='Only list the users that would move')
+def rebalance_command(dry_run):
+    """Move users to the shard the hash ring assigns them"""
+    moves, failures = rebalance(_router(), dry_run=dry_run)
+    for username, source, target in moves:
+        click.echo(f"{'would move' if dry_run else 'moved'} {username}: {source} -> {target}")
+    for username, source, target, error in failures:
+        click.echo(f'failed to move {username}: {source} -> {target}: {error}', err=True)
+    if failures:
+        raise click.ClickException(
+            f'{len(failures)} users could not be moved; fix them and run rebalance again'
+        )
+    if not moves:
+        click.echo('All users are on their shard')
@@ -0,0 +1,59 @@
+import os
+import threading
+import pymongo
+
+# How long a readiness probe waits for MongoDB to answer a ping
+READINESS_TIMEOUT_MS = int(os.getenv('READINESS_TIMEOUT_MS', 1000))
+
+
+def ping(databases, timeout_ms=None):
+    """Round trip to every database; raises if one does not answer in time"""
+    if timeout_ms is None:
+        for database in databases:
+            database.command('ping')
+        return
+    with pymongo.timeout(timeout_ms / 1000):
+        for database in databases:
+            database.command('ping')
+
+
+class Startup:
+    """Named startup tasks (index bootstrap, connection warm-up) and their progress.
+
+    Tasks run in order, either inside create_app or, with LAZY_STARTUP, in
+    a daemon thread so the process starts serving before MongoDB has been
+    reached. A failing task is logged and reported by /ready but does not
+    stop the ones after it, as index bootstrap never blocked startup.
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.tasks = []
+        self.results = {}
+        self.finished = threading.Event()
+
+    def add(self, name, task):
+        self.tasks.append((name, task))
+        self.results[name] = 'pending'
+
+    def run(self, background=False):
+        if background:
+            threading.Thread(target=self._run_tasks, name='startup', daemon=True).start()
+        else:
+            self._run_tasks()
+
+    def _run_tasks(self):
+        for name, task in self.tasks:
+            self.results[name] = 'running'
+            try:
+                task()
+            except Exception as e:
+                # Do not block startup on an unreachable database
+                self.logger.warning('Startup task %s failed: %s', name, e)
+                self.results[name] = 'failed'
+            else:
+                self.results[name] = 'ok'
+        self.finished.set()
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
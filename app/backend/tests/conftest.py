@@ -7,6 +7,8 @@ import backend.models as models
 
 # Ensure JWT secret for tests
 os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key")
+# Cheapest bcrypt cost keeps the suite fast
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
 
 # Replace real Mongo client with in-memory mongomock
 models.client = mongomock.MongoClient()
@@ -16,6 +18,90 @@ models.todos_collection = models.db_instance.todos
 models.db = models.Database()
 
 from backend.app import create_app  # noqa: E402
+from backend.routes.todos import stats_cache  # noqa: E402
+from backend.search import search_cache  # noqa: E402
+
+# Collection methods whose first argument is a query filter
+QUERY_METHODS = (
+    "find", "find_one", "find_one_and_update", "find_one_and_delete", "update_one",
+    "update_many", "delete_one", "delete_many", "count_documents"
+)
+
+
+class RecordingCursor:
+    """Pass a cursor through, noting the sort applied to its query"""
+
+    def __init__(self, cursor, entry):
+        self._cursor = cursor
+        self._entry = entry
+
+    def sort(self, key_or_list, direction=1):
+        if isinstance(key_or_list, str):
+            self._entry["sort"] = [(key_or_list, direction)]
+            self._cursor = self._cursor.sort(key_or_list, direction)
+        else:
+            self._entry["sort"] = list(key_or_list)
+            self._cursor = self._cursor.sort(key_or_list)
+        return self
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __next__(self):
+        return next(self._cursor)
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def chain(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return self if result is self._cursor else result
+        return chain
+
+
+class RecordingCollection:
+    """Pass a collection through, logging the filter and sort of every query"""
+
+    def __init__(self, collection, log):
+        self._collection = collection
+        self._log = log
+
+    def with_options(self, **kwargs):
+        return RecordingCollection(self._collection.with_options(**kwargs), self._log)
+
+    def aggregate(self, pipeline, *args, **kwargs):
+        match = pipeline[0].get("$match", {}) if pipeline else {}
+        sort = pipeline[1].get("$sort") if len(pipeline) > 1 else None
+        self._log.append({
+            "collection": self._collection.name, "filter": match,
+            "sort": list(sort.items()) if sort else None
+        })
+        return self._collection.aggregate(pipeline, *args, **kwargs)
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in QUERY_METHODS:
+            return attr
+
+        def record(filter=None, *args, **kwargs):
+            entry = {"collection": self._collection.name, "filter": filter or {}, "sort": kwargs.get("sort")}
+            self._log.append(entry)
+            result = attr(filter, *args, **kwargs)
+            return RecordingCursor(result, entry) if name == "find" else result
+        return record
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "after_route_tests: run after every other test, e.g. to inspect the query log"
+    )
+
+
+def pytest_collection_modifyitems(items):
+    # Stable sort keeps the order within both groups
+    items.sort(key=lambda item: item.get_closest_marker("after_route_tests") is not None)
 
 
 @pytest.fixture
@@ -30,6 +116,18 @@ def client(app):
     return app.test_client()
 
 
+@pytest.fixture(scope="session")
+def query_log():
+    """Every query `models.db` issued during the session: collection, filter and sort"""
+    return []
+
+
+@pytest.fixture(autouse=True)
+def record_queries(monkeypatch, query_log):
+    for name in ("users", "todos", "tombstones", "archive"):
+        monkeypatch.setattr(models.db, name, RecordingCollection(getattr(models.db, name), query_log))
+
+
 @pytest.fixture(autouse=True)
 def clean_db():
     """Clean database before each test."""
@@ -37,6 +135,11 @@ def clean_db():
     # Clean collections after each test
     models.users_collection.delete_many({})
     models.todos_collection.delete_many({})
+    models.tombstones_collection.delete_many({})
+    models.archive_collection.delete_many({})
+    # Cached results are keyed by username and data version, which recur across tests
+    stats_cache.clear()
+    search_cache.clear()
 
 
 @pytest.fixture
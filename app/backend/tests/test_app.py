@@ -8,3 +8,89 @@ def test_health_check(client):
     assert data["status"] == "ok"
     assert "Backend is running" in data["message"]
 
+
+def test_ready_after_startup(client):
+    resp = client.get("/ready")
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["status"] == "ready"
+    assert data["checks"] == {"indexes": "ok", "mongo": "ok"}
+
+
+def test_lazy_startup_runs_in_background(monkeypatch):
+    import threading
+    from backend import indexes
+    from backend.app import create_app
+
+    release = threading.Event()
+    ensure_indexes = indexes.ensure_indexes
+
+    def slow_ensure_indexes(database):
+        release.wait(5)
+        return ensure_indexes(database)
+
+    monkeypatch.setenv("LAZY_STARTUP", "true")
+    monkeypatch.setattr(indexes, "ensure_indexes", slow_ensure_indexes)
+    app = create_app()
+    client = app.test_client()
+    # Liveness does not wait for startup work, readiness does
+    assert client.get("/").status_code == 200
+    resp = client.get("/ready")
+    assert resp.status_code == 503
+    assert resp.get_json()["status"] == "starting"
+
+    release.set()
+    assert app.extensions["startup"].wait(5)
+    resp = client.get("/ready")
+    assert resp.status_code == 200
+    assert resp.get_json()["checks"] == {"warmup": "ok", "indexes": "ok", "mongo": "ok"}
+
+
+def test_ready_reports_unreachable_database(monkeypatch):
+    from backend import startup
+    from backend.app import create_app
+
+    def unreachable(databases, timeout_ms=None):
+        raise ConnectionError("connection refused")
+
+    monkeypatch.setattr(startup, "ping", unreachable)
+    resp = create_app().test_client().get("/ready")
+    assert resp.status_code == 503
+    assert resp.get_json()["checks"]["mongo"] == "unavailable"
+
+
+
+def _sample_todo():
+    from datetime import datetime, timezone
+    from bson import ObjectId
+
+    return {
+        "_id": ObjectId(),
+        "username": "testuser",
+        "title": "Title",
+        "description": "Opis z šumniki",
+        "completed": False,
+        "created_at": datetime(2024, 1, 2, 3, 4, 5, 678000),
+        "updated_at": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    }
+
+
+def test_json_provider_serializes_bson_types(app):
+    todo = _sample_todo()
+    data = app.json.loads(app.json.dumps(todo))
+    assert data["_id"] == str(todo["_id"])
+    assert data["created_at"] == "2024-01-02T03:04:05.678000"
+    assert data["updated_at"] == "2024-01-02T03:04:05+00:00"
+
+
+def test_json_provider_backends_agree(app, monkeypatch):
+    from backend.json_provider import orjson
+
+    if orjson is None:
+        pytest.skip("orjson not installed")
+    todo = _sample_todo()
+    monkeypatch.setattr(app.json, "fast", True)
+    fast = app.json.loads(app.json.dumps(todo, separators=(",", ":")))
+    monkeypatch.setattr(app.json, "fast", False)
+    stdlib = app.json.loads(app.json.dumps(todo, separators=(",", ":")))
+    assert fast == stdlib
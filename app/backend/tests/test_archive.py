@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+
+import backend.models as models
+from backend.archive import run_archival
+
+
+def _seed(username="testuser"):
+    old = datetime.utcnow() - timedelta(days=800)
+    models.todos_collection.insert_many([
+        {"username": username, "title": "Old done", "description": "", "completed": True,
+         "created_at": old, "updated_at": old},
+        {"username": username, "title": "Old open", "description": "", "completed": False,
+         "created_at": old + timedelta(seconds=1), "updated_at": old},
+    ])
+    models.db.create_todo(username, "Recent")
+
+
+def test_archival_moves_only_old_completed_todos(auth_headers):
+    _seed()
+
+    assert run_archival(models.db, days=365, batch_size=1) == 1
+    assert models.todos_collection.count_documents({}) == 2
+    archived = models.archive_collection.find_one({})
+    assert archived["title"] == "Old done"
+    assert "archived_at" in archived
+    # Nothing left to do on a second run
+    assert run_archival(models.db, days=365) == 0
+
+
+def test_archival_keeps_todos_changed_mid_batch(auth_headers, monkeypatch):
+    _seed()
+    original = models.db.archive.bulk_write
+
+    def copy_then_change(requests, ordered=True):
+        result = original(requests, ordered=ordered)
+        models.todos_collection.update_one(
+            {"title": "Old done"}, {"$set": {"completed": False, "updated_at": datetime.utcnow()}}
+        )
+        return result
+
+    monkeypatch.setattr(models.db, "archive", models.archive_collection)
+    monkeypatch.setattr(models.archive_collection, "bulk_write", copy_then_change)
+    assert models.db.archive_completed_todos(datetime.utcnow() - timedelta(days=365)) == 0
+    assert models.todos_collection.count_documents({"title": "Old done"}) == 1
+    assert models.archive_collection.count_documents({}) == 0
+
+
+def test_archival_drops_todos_deleted_mid_batch(client, auth_headers, monkeypatch):
+    _seed()
+    todo_id = str(models.todos_collection.find_one({"title": "Old done"})["_id"])
+    original = models.db.archive.bulk_write
+
+    def copy_then_delete(requests, ordered=True):
+        result = original(requests, ordered=ordered)
+        assert client.delete(f"/api/todos/{todo_id}", headers=auth_headers).status_code == 200
+        return result
+
+    monkeypatch.setattr(models.db, "archive", models.archive_collection)
+    monkeypatch.setattr(models.archive_collection, "bulk_write", copy_then_delete)
+    assert models.db.archive_completed_todos(datetime.utcnow() - timedelta(days=365)) == 0
+    assert models.archive_collection.count_documents({}) == 0
+    titles = [todo["title"] for todo in
+              client.get("/api/todos/?include_archived=true", headers=auth_headers).get_json()["todos"]]
+    assert "Old done" not in titles
+
+
+def test_list_and_export_include_archived(client, auth_headers):
+    _seed()
+    etag = client.get("/api/todos/", headers=auth_headers).headers["ETag"]
+    run_archival(models.db, days=365)
+
+    hot = client.get("/api/todos/", headers={**auth_headers, "If-None-Match": etag})
+    assert hot.status_code == 200
+    assert [todo["title"] for todo in hot.get_json()["todos"]] == ["Recent", "Old open"]
+
+    everything = client.get("/api/todos/?include_archived=true", headers=auth_headers).get_json()["todos"]
+    assert [todo["title"] for todo in everything] == ["Recent", "Old open", "Old done"]
+
+    paged = []
+    cursor = None
+    while True:
+        path = "/api/todos/?include_archived=true&limit=1" + (f"&cursor={cursor}" if cursor else "")
+        data = client.get(path, headers=auth_headers).get_json()
+        paged.extend(todo["title"] for todo in data["todos"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert paged == ["Recent", "Old open", "Old done"]
+
+    export = client.get("/api/todos/export?include_archived=1", headers=auth_headers)
+    assert len(export.get_data(as_text=True).splitlines()) == 3
+    assert len(client.get("/api/todos/export", headers=auth_headers).get_data(as_text=True).splitlines()) == 2
+
+
+def test_archive_command(app):
+    _seed("cliUser")
+    result = app.test_cli_runner().invoke(args=["archive", "--days", "365"])
+    assert result.exit_code == 0
+    assert "Archived 1 todos" in result.output
+
+
+def test_archival_is_reported_to_delta_sync_and_etags(client, auth_headers):
+    _seed()
+    etag = client.get("/api/todos/", headers=auth_headers).headers["ETag"]
+    token = client.get("/api/todos/changes", headers=auth_headers).get_json()["next_since"]
+    run_archival(models.db, days=365)
+
+    assert client.get("/api/todos/", headers={**auth_headers, "If-None-Match": etag}).status_code == 200
+    archived_id = str(models.archive_collection.find_one({})["_id"])
+    data = client.get(f"/api/todos/changes?since={token}", headers=auth_headers).get_json()
+    assert data["deleted"] == [archived_id]
+
+
+def test_archived_todos_can_be_deleted_and_restored(client, auth_headers):
+    _seed()
+    _seed()
+    run_archival(models.db, days=365)
+    first, second = [str(todo["_id"]) for todo in models.archive_collection.find({})]
+
+    assert client.delete(f"/api/todos/{first}", headers=auth_headers).status_code == 200
+    assert models.archive_collection.count_documents({}) == 1
+
+    resp = client.patch(f"/api/todos/{second}/toggle", headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.get_json()["todo"]["completed"] is False
+    assert models.archive_collection.count_documents({}) == 0
+    restored = models.todos_collection.find_one({"title": "Old done"})
+    assert str(restored["_id"]) == second
+    assert "archived_at" not in restored
+    assert models.tombstones_collection.count_documents({"_id": restored["_id"]}) == 0
+
+
+def test_archival_continues_past_a_batch_that_moved_nothing(client, monkeypatch):
+    _seed()
+    original = models.db.archive_completed_todos
+    calls = []
+
+    def first_batch_raced(cutoff, batch_size=500):
+        calls.append(cutoff)
+        return 0 if len(calls) == 1 else original(cutoff, batch_size)
+
+    monkeypatch.setattr(models.db, "archive_completed_todos", first_batch_raced)
+    assert run_archival(models.db, days=365) == 1
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import backend.models as models
+from backend.asgi import create_asgi_app
+
+
+async def _asgi_get(app, path, headers):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 12345),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+
+def test_asgi_app_serves_requests_concurrently(app, auth_headers, monkeypatch):
+    latency = 0.05
+    original = models.db.get_user_version
+
+    def slow_version(username):
+        time.sleep(latency)  # stands in for a Mongo round trip
+        return original(username)
+
+    monkeypatch.setattr(models.db, "get_user_version", slow_version)
+    asgi_app = create_asgi_app(app, max_inflight=16)
+
+    async def burst():
+        return await asyncio.gather(
+            *(_asgi_get(asgi_app, "/api/todos/", auth_headers) for _ in range(16))
+        )
+
+    start = time.perf_counter()
+    statuses = asyncio.run(burst())
+    elapsed = time.perf_counter() - start
+
+    assert statuses == [200] * 16
+    # Serial handling would take 16 * latency
+    assert elapsed < 16 * latency / 2
+
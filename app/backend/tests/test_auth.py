@@ -95,3 +95,86 @@ def test_profile_user_not_found(client, app):
     assert resp.status_code == 404
     assert "not found" in resp.get_json()["error"]
 
+
+
+def test_login_rehashes_password_with_different_cost(client):
+    import bcrypt
+    import backend.models as models
+    from backend.passwords import hash_cost, hasher
+
+    old_hash = bcrypt.hashpw(b"password123", bcrypt.gensalt(rounds=5)).decode("utf-8")
+    models.db.create_user("frank", old_hash)
+
+    resp = client.post("/api/auth/login", json={"username": "frank", "password": "password123"})
+    assert resp.status_code == 200
+    stored = models.db.find_user("frank")["password"]
+    assert hash_cost(stored) == hasher.rounds
+    assert bcrypt.checkpw(b"password123", stored.encode("utf-8"))
+
+
+def test_login_succeeds_when_rehash_pool_is_saturated(client, monkeypatch):
+    import bcrypt
+    import backend.models as models
+    from backend.passwords import PoolSaturated, hasher
+
+    old_hash = bcrypt.hashpw(b"password123", bcrypt.gensalt(rounds=5)).decode("utf-8")
+    models.db.create_user("grace", old_hash)
+
+    def saturated(password):
+        raise PoolSaturated("Timed out waiting for password hashing")
+
+    monkeypatch.setattr(hasher, "hash_password", saturated)
+    resp = client.post("/api/auth/login", json={"username": "grace", "password": "password123"})
+    assert resp.status_code == 200
+    assert "access_token" in resp.get_json()
+    # The old hash stays and is upgraded on a later login
+    assert models.db.find_user("grace")["password"] == old_hash
+
+
+def test_password_pool_rejects_when_saturated():
+    import threading
+    import pytest
+    from backend.passwords import PasswordHasher, PoolSaturated
+
+    pool = PasswordHasher(rounds=4, workers=1, max_pending=0)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait()
+
+    worker = threading.Thread(target=pool._run, args=(block,))
+    worker.start()
+    started.wait()
+    try:
+        with pytest.raises(PoolSaturated):
+            pool.hash_password("password123")
+    finally:
+        release.set()
+        worker.join()
+        pool.shutdown()
+    assert pool.verify_password("password123", pool.hash_password("password123"))
+
+
+def test_login_returns_503_when_pool_saturated(client, monkeypatch):
+    from backend.passwords import PoolSaturated, hasher
+
+    client.post("/api/auth/register", json={"username": "grace", "password": "password123"})
+
+    def saturated(*args):
+        raise PoolSaturated("saturated")
+
+    monkeypatch.setattr(hasher, "_run", saturated)
+    resp = client.post("/api/auth/login", json={"username": "grace", "password": "password123"})
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
+
+
+def test_profile_etag_not_modified(client):
+    client.post("/api/auth/register", json={"username": "heidi", "password": "password123"})
+    login = client.post("/api/auth/login", json={"username": "heidi", "password": "password123"})
+    headers = {"Authorization": f"Bearer {login.get_json()['access_token']}"}
+    etag = client.get("/api/auth/profile", headers=headers).headers["ETag"]
+    resp = client.get("/api/auth/profile", headers={**headers, "If-None-Match": etag})
+    assert resp.status_code == 304
@@ -0,0 +1,41 @@
+from backend.cache import VersionedCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_versioned_cache_expires_after_ttl():
+    clock = FakeClock()
+    cache = VersionedCache(ttl=5, clock=clock)
+    cache.set("key", 1, "value")
+    assert cache.get("key", 1) == "value"
+    clock.now = 5
+    assert cache.get("key", 1) is None
+
+
+def test_versioned_cache_misses_on_new_version():
+    cache = VersionedCache(ttl=60)
+    cache.set("key", 1, "value")
+    assert cache.get("key", 2) is None
+    assert cache.get("key", 1) is None
+
+
+def test_versioned_cache_evicts_least_recently_used():
+    cache = VersionedCache(ttl=60, max_entries=2)
+    cache.set("a", 1, "a")
+    cache.set("b", 1, "b")
+    cache.get("a", 1)
+    cache.set("c", 1, "c")
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == "a"
+
+
+def test_versioned_cache_disabled_with_zero_ttl():
+    cache = VersionedCache(ttl=0)
+    cache.set("key", 1, "value")
+    assert cache.get("key", 1) is None
@@ -0,0 +1,70 @@
+import gzip
+import zlib
+
+import pytest
+
+from backend import compression
+
+
+def _create_many(client, headers, count=30):
+    for i in range(count):
+        client.post("/api/todos/", json={"title": f"Todo {i}", "description": "x" * 100}, headers=headers)
+
+
+def test_large_list_is_gzipped(client, auth_headers):
+    _create_many(client, auth_headers)
+
+    resp = client.get("/api/todos/", headers={**auth_headers, "Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    body = gzip.decompress(resp.get_data())
+    assert len(body) > len(resp.get_data())
+    assert b"Todo 29" in body
+
+
+def test_small_responses_are_not_compressed(client, auth_headers):
+    resp = client.get("/api/todos/", headers={**auth_headers, "Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+    assert resp.get_json() == {"todos": [], "next_cursor": None}
+
+
+def test_no_compression_without_accept_encoding(client, auth_headers):
+    _create_many(client, auth_headers)
+    resp = client.get("/api/todos/", headers=auth_headers)
+    assert "Content-Encoding" not in resp.headers
+
+
+def test_compressed_etag_still_revalidates(client, auth_headers):
+    headers = {**auth_headers, "Accept-Encoding": "gzip"}
+    _create_many(client, headers)
+    first = client.get("/api/todos/", headers=headers)
+    assert first.headers["ETag"].startswith("W/")
+    resp = client.get("/api/todos/", headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert resp.status_code == 304
+
+
+def test_export_is_stream_compressed(client, auth_headers):
+    _create_many(client, auth_headers, 5)
+    resp = client.get("/api/todos/export", headers={**auth_headers, "Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in resp.headers
+    lines = gzip.decompress(resp.get_data()).decode().splitlines()
+    assert len(lines) == 5
+
+
+def test_event_stream_chunks_are_flushed(client, app, auth_headers):
+    app.config["EVENTS_MAX_STREAM_SECONDS"] = 0
+    resp = client.get("/api/todos/events", headers={**auth_headers, "Accept-Encoding": "gzip"}, buffered=False)
+    chunks = iter(resp.response)
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # The first chunk decodes on its own, without waiting for the stream to end
+    assert decompressor.decompress(next(chunks)) == b"retry: 3000\n\n"
+    resp.close()
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli not installed")
+def test_brotli_preferred_when_available(client, auth_headers):
+    _create_many(client, auth_headers)
+    resp = client.get("/api/todos/", headers={**auth_headers, "Accept-Encoding": "gzip, br"})
+    assert resp.headers["Content-Encoding"] == "br"
+    assert b"Todo 29" in compression.brotli.decompress(resp.get_data())
@@ -0,0 +1,96 @@
+import threading
+
+import mongomock
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import backend.models as models
+from backend.group_commit import GroupCommitBuffer, WriteBufferFull
+
+
+class RecordingCollection:
+    """mongomock collection that records insert_many batch sizes"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.batches = []
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def insert_many(self, documents, ordered=True):
+        self.batches.append(len(documents))
+        return self._collection.insert_many(documents, ordered=ordered)
+
+
+def _insert_concurrently(buffer, collection, documents):
+    errors = [None] * len(documents)
+
+    def insert(i):
+        try:
+            buffer.insert(collection, documents[i])
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=insert, args=(i,)) for i in range(len(documents))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_concurrent_inserts_share_one_insert_many():
+    collection = RecordingCollection(mongomock.MongoClient().db.todos)
+    buffer = GroupCommitBuffer(window_ms=200, max_batch=10)
+
+    errors = _insert_concurrently(buffer, collection, [{"n": i} for i in range(10)])
+    assert errors == [None] * 10
+    assert collection.batches == [10]
+    assert collection.count_documents({}) == 10
+
+
+def test_each_insert_gets_its_own_error():
+    collection = RecordingCollection(mongomock.MongoClient().db.todos)
+    collection.insert_one({"_id": "taken"})
+    buffer = GroupCommitBuffer(window_ms=200, max_batch=3)
+
+    errors = _insert_concurrently(buffer, collection, [{"_id": "a"}, {"_id": "taken"}, {"_id": "b"}])
+    assert sum(isinstance(error, DuplicateKeyError) for error in errors) == 1
+    assert errors.count(None) == 2
+    assert collection.count_documents({}) == 3
+
+
+def test_buffer_rejects_inserts_beyond_pending_limit():
+    buffer = GroupCommitBuffer(max_pending=1)
+    buffer._slots.acquire()
+    with pytest.raises(WriteBufferFull):
+        buffer.insert(mongomock.MongoClient().db.todos, {"n": 1})
+
+
+def test_create_todo_route_with_group_commit(client, monkeypatch):
+    monkeypatch.setattr(models.db, "write_buffer", GroupCommitBuffer(window_ms=1))
+    client.post("/api/auth/register", json={"username": "groupUser", "password": "secret123"})
+    token = client.post(
+        "/api/auth/login", json={"username": "groupUser", "password": "secret123"}
+    ).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    resp = client.post("/api/todos/", json={"title": "Grouped"}, headers=headers)
+    assert resp.status_code == 201
+    listed = client.get("/api/todos/", headers=headers).get_json()["todos"]
+    assert listed == [resp.get_json()["todo"]]
+
+
+def test_create_todo_returns_503_when_buffer_full(client, monkeypatch):
+    buffer = GroupCommitBuffer(max_pending=1)
+    buffer._slots.acquire()
+    monkeypatch.setattr(models.db, "write_buffer", buffer)
+    client.post("/api/auth/register", json={"username": "groupUser", "password": "secret123"})
+    token = client.post(
+        "/api/auth/login", json={"username": "groupUser", "password": "secret123"}
+    ).get_json()["access_token"]
+
+    resp = client.post("/api/todos/", json={"title": "Busy"}, headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
@@ -0,0 +1,129 @@
+import os
+
+import pytest
+
+import backend.models as models
+from backend.indexes import ensure_indexes, find_covering_index, index_drift
+
+
+def test_indexes_created_on_startup(app):
+    drift = index_drift(models.db_instance)
+    assert drift["missing"] == []
+    assert drift["changed"] == []
+
+
+def test_ensure_indexes_is_idempotent(app):
+    assert ensure_indexes(models.db_instance) == []
+
+
+def test_index_drift_reports_missing_and_extra(app):
+    models.todos_collection.drop_index("username_created_at_id")
+    models.todos_collection.create_index("title", name="title_1")
+    try:
+        drift = index_drift(models.db_instance)
+        assert ("todos", "username_created_at_id") in drift["missing"]
+        assert ("todos", "title_1") in drift["extra"]
+    finally:
+        models.todos_collection.drop_index("title_1")
+        ensure_indexes(models.db_instance)
+
+
+def test_index_drift_understands_live_text_indexes():
+    from backend.indexes import INDEXES, _text_signature
+
+    spec = next(spec for spec in INDEXES["todos"] if spec["name"] == "username_text")
+    live_key = [("username", 1), ("_fts", "text"), ("_ftsx", 1)]
+    assert _text_signature(live_key, spec["weights"]) == _text_signature(spec["keys"])
+
+
+def test_indexes_check_command(app):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["indexes", "check"])
+    assert result.exit_code == 0
+    assert "No index drift" in result.output
+
+
+def test_username_is_unique(app):
+    from pymongo.errors import DuplicateKeyError
+
+    models.db.create_user("uniq", "hash")
+    with pytest.raises(DuplicateKeyError):
+        models.db.create_user("uniq", "hash")
+
+
+def _query_shape(entry):
+    """(collection, equality fields, sort) an index must serve, or None for _id lookups"""
+    query = entry["filter"]
+    if "_id" in query:
+        return None
+    equality, ranges = [], []
+    for field, value in query.items():
+        if field.startswith("$"):
+            continue
+        operators = set(value) if isinstance(value, dict) else set()
+        if operators and operators != {"$in"} and all(op.startswith("$") for op in operators):
+            ranges.append(field)
+        else:
+            equality.append(field)
+    if "$text" in query:
+        sort = [("title", "text")]
+    elif entry["sort"]:
+        # {'$meta': ...} sorts are computed, not read from an index
+        sort = [(field, direction) for field, direction in entry["sort"] if not isinstance(direction, dict)]
+    else:
+        sort = [(field, 1) for field in ranges[:1]]
+    return entry["collection"], tuple(sorted(equality)), tuple(sort)
+
+
+@pytest.mark.after_route_tests
+def test_recorded_queries_have_covering_index(query_log):
+    """Every query the route tests made through `models.db` is served by a registered index"""
+    shapes = {_query_shape(entry) for entry in query_log} - {None}
+    if not shapes:
+        pytest.skip("no queries recorded; run together with the route tests")
+    unserved = sorted(shape for shape in shapes if find_covering_index(shape[0], shape[1], list(shape[2])) is None)
+    assert unserved == []
+
+
+MONGODB_TEST_URI = os.getenv("MONGODB_TEST_URI")
+
+
+def _plan_stages(plan):
+    # Plans from the slot-based engine (MongoDB 7+) nest the classic tree under queryPlan
+    plan = plan.get("queryPlan", plan)
+    stages = [plan.get("stage")]
+    for child in plan.get("inputStages", []) + [plan.get("inputStage", {})]:
+        if child:
+            stages.extend(_plan_stages(child))
+    return stages
+
+
+@pytest.mark.after_route_tests
+@pytest.mark.skipif(not MONGODB_TEST_URI, reason="MONGODB_TEST_URI not set")
+def test_explain_plans_use_indexes(query_log):
+    """Replay one recorded query per shape on a real mongod so a query losing its index is caught"""
+    from pymongo import MongoClient
+
+    replays = {}
+    for entry in query_log:
+        shape = _query_shape(entry)
+        if shape is not None:
+            replays.setdefault(shape, entry)
+    if not replays:
+        pytest.skip("no queries recorded; run together with the route tests")
+
+    client = MongoClient(MONGODB_TEST_URI, serverSelectionTimeoutMS=2000)
+    database = client["todoapp_explain_test"]
+    try:
+        ensure_indexes(database)
+        database.todos.insert_one({"username": "u", "completed": False, "created_at": 1, "updated_at": 1})
+        for shape, entry in sorted(replays.items()):
+            cursor = database[entry["collection"]].find(entry["filter"])
+            if entry["sort"]:
+                cursor = cursor.sort(entry["sort"])
+            stages = _plan_stages(cursor.explain()["queryPlanner"]["winningPlan"])
+            assert "COLLSCAN" not in stages, shape
+            assert any(stage and "IXSCAN" in stage for stage in stages), shape
+    finally:
+        client.drop_database("todoapp_explain_test")
+        client.close()
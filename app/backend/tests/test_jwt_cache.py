@@ -0,0 +1,71 @@
+import pytest
+from flask_jwt_extended import view_decorators
+
+from backend import jwt_cache
+from backend.jwt_cache import TokenCache
+from backend.metrics import jwt_token_cache_total
+
+
+def test_token_cache_honors_expiry():
+    now = [1000.0]
+    cache = TokenCache(max_size=10, clock=lambda: now[0])
+    cache.put("token", {"sub": "u", "exp": 1010})
+    assert cache.get("token") == {"sub": "u", "exp": 1010}
+    now[0] = 1010
+    assert cache.get("token") is None
+    assert len(cache) == 0
+
+
+def test_token_cache_is_bounded_lru():
+    cache = TokenCache(max_size=2)
+    cache.put("a", {"sub": "a"})
+    cache.put("b", {"sub": "b"})
+    cache.get("a")
+    cache.put("c", {"sub": "c"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"sub": "a"}
+
+
+def test_token_cache_invalidate_subject():
+    cache = TokenCache(max_size=10)
+    cache.put("a1", {"sub": "a"})
+    cache.put("a2", {"sub": "a"})
+    cache.put("b1", {"sub": "b"})
+    cache.invalidate_subject("a")
+    assert cache.get("a1") is None and cache.get("a2") is None
+    assert cache.get("b1") == {"sub": "b"}
+
+
+def test_repeated_requests_hit_the_cache(client, auth_headers):
+    hits = jwt_token_cache_total.value("hit")
+
+    assert client.get("/api/todos/", headers=auth_headers).status_code == 200
+    assert client.get("/api/todos/", headers=auth_headers).status_code == 200
+    assert jwt_token_cache_total.value("hit") >= hits + 1
+
+
+def test_tampered_token_is_rejected(client, auth_headers):
+    client.get("/api/todos/", headers=auth_headers)
+    token = auth_headers["Authorization"].split()[1]
+    tampered = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+    resp = client.get("/api/todos/", headers={"Authorization": f"Bearer {tampered}"})
+    assert resp.status_code == 422
+
+
+def test_revocation_hook_rejects_cached_token(app, client, auth_headers):
+    assert client.get("/api/todos/", headers=auth_headers).status_code == 200
+
+    jwt = app.extensions["flask-jwt-extended"]
+    jwt.add_revocation_hook(lambda claims: claims["sub"] == "testuser")
+    assert client.get("/api/todos/", headers=auth_headers).status_code == 401
+
+
+def test_cache_is_installed_where_jwt_required_decodes(app):
+    # Fails when a flask_jwt_extended upgrade stops calling decode_token from view_decorators
+    assert view_decorators.decode_token is jwt_cache.cached_decode_token
+
+
+def test_install_fails_loudly_without_decode_token(monkeypatch):
+    monkeypatch.delattr(view_decorators, "decode_token")
+    with pytest.raises(RuntimeError):
+        jwt_cache.install_decode_cache()
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from backend.metrics import Histogram, MongoCommandMetrics, mongo_command_duration_seconds
+
+
+def test_metrics_endpoint_reports_per_endpoint_latency(client, auth_headers):
+    client.get("/api/todos/", headers=auth_headers)
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+    body = resp.get_data(as_text=True)
+    assert 'http_requests_total{endpoint="todos.get_todos",method="GET",status="200"}' in body
+    assert 'http_request_duration_seconds_count{endpoint="auth.login",method="POST"}' in body
+    assert 'bcrypt_duration_seconds_count{operation="verify"}' in body
+    assert "mongo_pool_max_connections" in body
+
+
+def test_metrics_require_token_when_configured(monkeypatch):
+    from backend.app import create_app
+
+    monkeypatch.setenv("METRICS_TOKEN", "scrape-secret")
+    client = create_app().test_client()
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer guess"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+
+
+def test_metrics_without_token_only_for_loopback(client):
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "10.0.0.7"}).status_code == 401
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "::1"}).status_code == 200
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "a")
+    histogram.observe(0.5, "a")
+    histogram.observe(5, "a")
+    lines = histogram.render()
+    assert 'test_seconds_bucket{route="a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{route="a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="a"} 3' in lines
+
+
+def test_mongo_command_listener_records_latency():
+    listener = MongoCommandMetrics()
+    before = mongo_command_duration_seconds.count("find", "success")
+    listener.succeeded(SimpleNamespace(command_name="find", duration_micros=1500))
+    assert mongo_command_duration_seconds.count("find", "success") == before + 1
@@ -0,0 +1,75 @@
+import backend.mongo as mongo
+from backend.mongo import MongoClientFactory, PoolStatsListener, client_options_from_env
+
+
+class FakeClient:
+    def __init__(self, uri, **kwargs):
+        self.uri = uri
+        self.kwargs = kwargs
+
+    def __getitem__(self, name):
+        return {"users": f"{name}.users", "todos": f"{name}.todos"}
+
+    def close(self):
+        pass
+
+
+def test_client_options_from_env(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "25")
+    monkeypatch.setenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "500")
+    monkeypatch.setenv("MONGO_COMPRESSORS", "zlib")
+    monkeypatch.setenv("MONGO_WRITE_CONCERN", "majority")
+    options = client_options_from_env()
+    assert options == {
+        "maxPoolSize": 25,
+        "waitQueueTimeoutMS": 500,
+        "compressors": "zlib",
+        "w": "majority",
+    }
+
+
+def test_factory_connects_lazily_once_per_process(monkeypatch):
+    factory = MongoClientFactory("mongodb://example", options={"maxPoolSize": 5},
+                                 client_class=FakeClient)
+    assert factory.pool_stats()["connected"] is False
+
+    first = factory.get_client()
+    assert factory.get_client() is first
+    assert first.kwargs["maxPoolSize"] == 5
+
+    # Simulate a forked worker: a different pid gets its own client
+    monkeypatch.setattr(mongo.os, "getpid", lambda: -1)
+    assert factory.get_client() is not first
+
+
+def test_factory_caches_collections():
+    factory = MongoClientFactory("mongodb://example", options={}, client_class=FakeClient)
+    assert factory.get_collection("todoapp", "todos") == "todoapp.todos"
+    assert factory.get_collection("todoapp", "todos") is factory.get_collection("todoapp", "todos")
+
+
+def test_pool_stats_listener_tracks_checkouts():
+    listener = PoolStatsListener()
+    listener.connection_created(None)
+    listener.connection_check_out_started(None)
+    listener.connection_check_out_started(None)
+    listener.connection_checked_out(None)
+    stats = listener.snapshot()
+    assert stats["checked_out"] == 1
+    assert stats["waiting"] == 1
+    assert stats["open"] == 1
+    listener.connection_check_out_failed(None)
+    listener.connection_checked_in(None)
+    stats = listener.snapshot()
+    assert stats["checked_out"] == 0
+    assert stats["waiting"] == 0
+    assert stats["checkout_failures"] == 1
+
+
+def test_factory_pool_stats_when_connected():
+    factory = MongoClientFactory("mongodb://example", options={}, client_class=FakeClient)
+    factory.get_client()
+    stats = factory.pool_stats()
+    assert stats["connected"] is True
+    assert stats["checked_out"] == 0
+    assert stats["max_pool_size"] == 100
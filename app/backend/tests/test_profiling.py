@@ -0,0 +1,85 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from backend import profiling
+from backend.app import create_app
+from backend.passwords import PasswordHasher
+
+
+@pytest.fixture
+def profiled_app(monkeypatch, tmp_path):
+    def make(**env):
+        monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        app = create_app()
+        app.config.update({"TESTING": True})
+        return app
+    return make
+
+
+def test_header_with_token_profiles_request(profiled_app, tmp_path):
+    client = profiled_app(PROFILE_TOKEN="s3cret").test_client()
+    resp = client.get("/", headers={"X-Profile-Token": "s3cret"})
+    assert resp.status_code == 200
+    name = resp.headers["X-Profile-File"]
+    assert name.startswith("health_check.")
+    assert (tmp_path / name).exists()
+
+
+def test_header_with_wrong_token_is_ignored(profiled_app, tmp_path):
+    client = profiled_app(PROFILE_TOKEN="s3cret").test_client()
+    resp = client.get("/", headers={"X-Profile-Token": "guess"})
+    assert "X-Profile-File" not in resp.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sampled_requests_keep_newest_dumps_per_endpoint(profiled_app, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_KEEP_PER_ENDPOINT", 2)
+    client = profiled_app(PROFILE_SAMPLE_RATE="1").test_client()
+    for _ in range(3):
+        client.get("/")
+    client.get("/ready")
+    dumps = sorted(path.name.rsplit(".", 3)[0] for path in tmp_path.iterdir())
+    assert dumps == ["health_check", "health_check", "readiness_check"]
+
+
+def test_slow_request_is_logged(profiled_app, caplog):
+    client = profiled_app(SLOW_REQUEST_MS="0.001").test_client()
+    with caplog.at_level(logging.WARNING):
+        client.post("/api/auth/register", json={"username": "slowuser", "password": "secret123"})
+        client.post("/api/auth/login", json={"username": "slowuser", "password": "secret123"})
+    messages = [record.getMessage() for record in caplog.records if "Slow request" in record.getMessage()]
+    assert len(messages) == 2
+    assert messages[1].startswith("Slow request POST /api/auth/login (auth.login) 200 in ")
+    assert "bcrypt" in messages[1]
+
+
+def test_trace_records_mongo_commands():
+    trace = profiling.RequestTrace()
+    token = profiling._current_trace.set(trace)
+    try:
+        listener = profiling.RequestTraceListener()
+        listener.started(SimpleNamespace(
+            command_name="find", command={"find": "todos"}, database_name="todoapp", request_id=7
+        ))
+        listener.succeeded(SimpleNamespace(command_name="find", duration_micros=2500, request_id=7))
+    finally:
+        profiling._current_trace.reset(token)
+    assert trace.command_count == 1
+    assert trace.mongo_seconds == pytest.approx(0.0025)
+    assert trace.commands == [("find", "todoapp.todos", 0.0025, "success")]
+
+
+def test_trace_includes_bcrypt_time_from_pool_threads():
+    hasher = PasswordHasher(rounds=4, workers=1)
+    trace = profiling.RequestTrace()
+    token = profiling._current_trace.set(trace)
+    try:
+        hasher.hash_password("secret123")
+    finally:
+        profiling._current_trace.reset(token)
+        hasher.shutdown()
+    assert trace.bcrypt_seconds > 0
@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo.read_preferences import SecondaryPreferred
+
+import backend.models as models
+from backend.replicas import ReadRouter
+
+
+class RecordingCollection:
+    """Wrap a collection and record the read preference of each find"""
+
+    def __init__(self, collection, reads):
+        self._collection = collection
+        self._reads = reads
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def with_options(self, **kwargs):
+        return RecordingCollection(self._collection.with_options(**kwargs), self._reads)
+
+    def find(self, *args, **kwargs):
+        self._reads.append(type(self._collection.read_preference).__name__)
+        return self._collection.find(*args, **kwargs)
+
+    def find_one(self, *args, **kwargs):
+        self._reads.append(type(self._collection.read_preference).__name__)
+        return self._collection.find_one(*args, **kwargs)
+
+
+@pytest.fixture
+def routed_db():
+    reads = []
+    router = ReadRouter(mode="secondaryPreferred", window_ms=60000)
+    database = models.Database(
+        users=RecordingCollection(models.users_collection, reads),
+        todos=RecordingCollection(models.todos_collection, reads),
+        read_router=router,
+    )
+    return database, router, reads
+
+
+def test_primary_mode_never_routes():
+    router = ReadRouter(mode="primary")
+    router.note_last_write("user", None)
+    assert router.use_secondary("user") is False
+
+
+def test_unknown_read_preference_is_rejected():
+    with pytest.raises(ValueError):
+        ReadRouter(mode="everywhere")
+
+
+def test_reads_after_a_write_stay_on_primary(routed_db):
+    database, router, reads = routed_db
+    database.create_user("writer", "hash")
+    database.create_todo("writer", "Fresh")
+
+    database.get_user_version("writer")
+    reads.clear()
+    todos, _ = database.get_user_todos_page("writer", 10)
+    assert [todo["title"] for todo in todos] == ["Fresh"]
+    assert reads == ["Primary"]
+
+
+def test_reads_go_to_secondary_once_the_window_passed(routed_db):
+    database, router, reads = routed_db
+    database.create_user("reader", "hash")
+    models.users_collection.update_one(
+        {"username": "reader"},
+        {"$set": {"last_write_at": datetime.now(timezone.utc) - timedelta(minutes=5)}},
+    )
+    # A fresh router, as in another process, learns the marker from the version read
+    database.read_router = ReadRouter(mode="secondaryPreferred", window_ms=60000)
+
+    assert database.find_user("reader", secondary_ok=True) is not None
+    assert reads[-1] == "Primary"
+    database.get_user_version("reader")
+    database.get_user_todos_page("reader", 10)
+    database.find_user("reader", secondary_ok=True)
+    assert reads[-2:] == ["SecondaryPreferred", "SecondaryPreferred"]
+    # Authentication reads never leave the primary
+    database.find_user("reader")
+    assert reads[-1] == "Primary"
+
+
+def test_router_keeps_latest_write_time():
+    router = ReadRouter(mode="secondaryPreferred", window_ms=1000)
+    router.note_write("user")
+    router.note_last_write("user", datetime.now(timezone.utc) - timedelta(hours=1))
+    assert router.use_secondary("user") is False
+    assert isinstance(router.read_preference, SecondaryPreferred)
+
+
+@pytest.fixture
+def secondary_reader(client, auth_headers, monkeypatch):
+    """testuser's last write is long past, so its reads may go to a secondary"""
+    models.users_collection.update_one(
+        {"username": "testuser"},
+        {"$set": {"last_write_at": datetime.now(timezone.utc) - timedelta(minutes=5)}},
+    )
+    monkeypatch.setattr(models.db, "read_router", ReadRouter(mode="secondaryPreferred", window_ms=60000))
+    # mongomock has no $text; search uses the in-process index
+    monkeypatch.setattr(models.db, "text_search_unavailable", True)
+    return auth_headers
+
+
+@pytest.mark.parametrize("path", ["/api/todos/", "/api/todos/stats", "/api/todos/search?q=milk"])
+def test_secondary_reads_get_no_etag(client, secondary_reader, path):
+    resp = client.get(path, headers=secondary_reader)
+    assert resp.status_code == 200
+    assert "ETag" not in resp.headers
+
+    # After a write the user reads from the primary again and gets validators
+    client.post("/api/todos/", json={"title": "Buy milk"}, headers=secondary_reader)
+    resp = client.get(path, headers=secondary_reader)
+    assert resp.status_code == 200
+    assert "ETag" in resp.headers
+
+
+def test_secondary_stats_are_not_cached(client, secondary_reader):
+    from backend.routes.todos import stats_cache
+
+    client.get("/api/todos/stats", headers=secondary_reader)
+    version = models.db.get_user_version("testuser")
+    assert stats_cache.get(("testuser", 30), version) is None
+
+
+def test_export_refreshes_the_read_your_writes_marker(client, secondary_reader, monkeypatch):
+    client.get("/api/todos/", headers=secondary_reader)
+    assert models.db.read_router.use_secondary("testuser")
+    # Another process writes for the user
+    models.users_collection.update_one(
+        {"username": "testuser"}, {"$set": {"last_write_at": datetime.now(timezone.utc)}}
+    )
+    resp = client.get("/api/todos/export", headers=secondary_reader)
+    resp.get_data()
+    assert not models.db.read_router.use_secondary("testuser")
+
+
+def test_secondary_ok_false_forces_primary(routed_db):
+    database, router, reads = routed_db
+    database.create_user("pinned", "hash")
+    database.read_router = ReadRouter(mode="secondaryPreferred", window_ms=60000)
+    database.read_router.note_last_write("pinned", datetime.now(timezone.utc) - timedelta(minutes=5))
+    database.get_user_todos_page("pinned", 10, secondary_ok=False)
+    database.get_user_todos_page("pinned", 10)
+    assert reads[-2:] == ["Primary", "SecondaryPreferred"]
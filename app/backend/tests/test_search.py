@@ -0,0 +1,134 @@
+from backend.search import InvertedIndex, SearchIndexCache, parse_query
+
+
+def _create(client, headers, title, description=""):
+    return client.post(
+        "/api/todos/", json={"title": title, "description": description}, headers=headers
+    ).get_json()["todo"]
+
+
+def test_parse_query():
+    assert parse_query('milk -eggs "whole wheat"') == (
+        ["milk", "whole", "wheat"], ["eggs"], ["whole wheat"]
+    )
+
+
+def test_inverted_index_ranks_title_matches_first():
+    index = InvertedIndex([
+        {"_id": 1, "title": "Call mom", "description": "about the milk"},
+        {"_id": 2, "title": "Buy milk", "description": ""},
+        {"_id": 3, "title": "Walk dog", "description": ""},
+    ])
+    assert [todo["_id"] for todo in index.search("milk")] == [2, 1]
+    assert index.search("milk -mom")[0]["_id"] == 2
+    assert [todo["_id"] for todo in index.search('"buy milk"')] == [2]
+
+
+def test_search_index_cache_rebuilds_on_new_version():
+    cache = SearchIndexCache(max_users=1)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return [{"_id": 1, "title": "a", "description": ""}]
+
+    first = cache.get("u", 1, load)
+    assert cache.get("u", 1, load) is first
+    assert cache.get("u", 2, load) is not first
+    cache.get("other", 1, load)
+    cache.get("u", 2, load)
+    assert len(loads) == 4
+
+
+def test_search_todos(client, auth_headers):
+    _create(client, auth_headers, "Buy milk", "from the store")
+    _create(client, auth_headers, "Call plumber", "kitchen sink leaks milk")
+    _create(client, auth_headers, "Walk dog")
+    other = {"username": "otherUser", "password": "secret123"}
+    client.post("/api/auth/register", json=other)
+    token = client.post("/api/auth/login", json=other).get_json()["access_token"]
+    _create(client, {"Authorization": f"Bearer {token}"}, "Milk for someone else")
+
+    resp = client.get("/api/todos/search?q=milk", headers=auth_headers)
+    assert resp.status_code == 200
+    todos = resp.get_json()["todos"]
+    assert [todo["title"] for todo in todos] == ["Buy milk", "Call plumber"]
+    assert todos[0]["score"] > todos[1]["score"]
+
+
+def test_search_sees_new_and_deleted_todos(client, auth_headers):
+    first = _create(client, auth_headers, "Read book")
+    assert len(client.get("/api/todos/search?q=book", headers=auth_headers).get_json()["todos"]) == 1
+
+    _create(client, auth_headers, "Return book")
+    client.delete(f"/api/todos/{first['_id']}", headers=auth_headers)
+    todos = client.get("/api/todos/search?q=book", headers=auth_headers).get_json()["todos"]
+    assert [todo["title"] for todo in todos] == ["Return book"]
+
+
+def test_search_paginates(client, auth_headers):
+    for i in range(5):
+        _create(client, auth_headers, f"Task {i}")
+
+    titles = []
+    cursor = None
+    while True:
+        path = "/api/todos/search?q=task&limit=2" + (f"&cursor={cursor}" if cursor else "")
+        data = client.get(path, headers=auth_headers).get_json()
+        titles.extend(todo["title"] for todo in data["todos"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert sorted(titles) == [f"Task {i}" for i in range(5)]
+
+
+def test_search_requires_query(client, auth_headers):
+    assert client.get("/api/todos/search", headers=auth_headers).status_code == 400
+    assert client.get("/api/todos/search?q=x&cursor=bad", headers=auth_headers).status_code == 400
+
+
+class _TextFailingCollection:
+    """Wrap a collection so $text queries fail with the given error code"""
+
+    def __init__(self, collection, code):
+        self._collection = collection
+        self._code = code
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def find(self, filter=None, *args, **kwargs):
+        from pymongo.errors import OperationFailure
+
+        if filter and "$text" in filter:
+            raise OperationFailure("text search failed", code=self._code)
+        return self._collection.find(filter, *args, **kwargs)
+
+
+def _database_with_text_error(code):
+    import backend.models as models
+
+    todos = _TextFailingCollection(models.todos_collection, code)
+    database = models.Database(users=models.users_collection, todos=todos)
+    database.create_user("searcher", "hash")
+    database.create_todo("searcher", "Buy milk")
+    return database
+
+
+def test_search_falls_back_only_without_text_index():
+    from backend.models import INDEX_NOT_FOUND
+
+    database = _database_with_text_error(INDEX_NOT_FOUND)
+    todos, has_more = database.search_todos("searcher", "milk", 10)
+    assert [todo["title"] for todo in todos] == ["Buy milk"]
+    assert has_more is False
+
+
+def test_search_raises_other_text_errors():
+    import pytest
+    from pymongo.errors import OperationFailure
+
+    unauthorized = 13
+    database = _database_with_text_error(unauthorized)
+    with pytest.raises(OperationFailure):
+        database.search_todos("searcher", "milk", 10)
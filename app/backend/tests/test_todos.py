@@ -207,3 +207,639 @@ def test_create_todo_missing_title(client):
     assert resp.status_code == 400
     assert "required" in resp.get_json()["error"]
 
+
+
+def test_list_todos_paginates_with_cursor(client):
+    headers = _login_headers(client)
+    for i in range(5):
+        _create_todo(client, headers, f"Todo {i}")
+
+    seen = []
+    cursor = None
+    while True:
+        url = "/api/todos/?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        resp = client.get(url, headers=headers)
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert len(data["todos"]) <= 2
+        seen.extend(t["_id"] for t in data["todos"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+
+
+def test_list_todos_cursor_breaks_created_at_ties(client):
+    import backend.models as models
+    from datetime import datetime, timezone
+
+    headers = _login_headers(client)
+    now = datetime.now(timezone.utc)
+    models.todos_collection.insert_many([
+        {"username": "todoUser", "title": f"T{i}", "description": "", "completed": False,
+         "created_at": now, "updated_at": now}
+        for i in range(4)
+    ])
+
+    first = client.get("/api/todos/?limit=3", headers=headers).get_json()
+    second = client.get(
+        f"/api/todos/?limit=3&cursor={first['next_cursor']}", headers=headers
+    ).get_json()
+    ids = [t["_id"] for t in first["todos"] + second["todos"]]
+    assert len(ids) == 4
+    assert len(set(ids)) == 4
+    assert second["next_cursor"] is None
+
+
+def test_list_todos_limit_is_capped(client, monkeypatch):
+    import backend.pagination as pagination
+
+    monkeypatch.setattr(pagination, "MAX_PAGE_LIMIT", 2)
+    headers = _login_headers(client)
+    for i in range(3):
+        _create_todo(client, headers, f"Todo {i}")
+    data = client.get("/api/todos/?limit=1000", headers=headers).get_json()
+    assert len(data["todos"]) == 2
+    assert data["next_cursor"]
+
+
+def test_list_todos_invalid_cursor(client):
+    headers = _login_headers(client)
+    resp = client.get("/api/todos/?cursor=not-a-cursor", headers=headers)
+    assert resp.status_code == 400
+    assert "Invalid cursor" in resp.get_json()["error"]
+
+
+def test_list_todos_invalid_limit(client):
+    headers = _login_headers(client)
+    resp = client.get("/api/todos/?limit=0", headers=headers)
+    assert resp.status_code == 400
+
+
+def test_export_todos_streams_ndjson(client, app):
+    import json
+
+    app.config["EXPORT_BATCH_SIZE"] = 2
+    headers = _login_headers(client)
+    for i in range(3):
+        _create_todo(client, headers, f"Todo {i}")
+    _create_todo(client, _login_headers(client, "otherUser"), "Not mine")
+
+    resp = client.get("/api/todos/export", headers=headers)
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/x-ndjson"
+    assert resp.is_streamed
+    lines = resp.get_data(as_text=True).splitlines()
+    todos = [json.loads(line) for line in lines]
+    assert [t["title"] for t in todos] == ["Todo 2", "Todo 1", "Todo 0"]
+
+
+def test_export_todos_requires_token(client):
+    resp = client.get("/api/todos/export")
+    assert resp.status_code == 401
+
+
+def test_batch_mixed_operations(client):
+    headers = _login_headers(client)
+    first = _create_todo(client, headers, "First").get_json()["todo"]
+    second = _create_todo(client, headers, "Second").get_json()["todo"]
+
+    resp = client.post(
+        "/api/todos/batch",
+        json={
+            "operations": [
+                {"op": "create", "title": "Third", "description": "new"},
+                {"op": "update", "id": first["_id"], "data": {"title": "First updated"}},
+                {"op": "toggle", "id": first["_id"]},
+                {"op": "delete", "id": second["_id"]},
+                {"op": "toggle", "id": str(ObjectId())},
+            ]
+        },
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    results = resp.get_json()["results"]
+    assert [r["status"] for r in results] == [201, 200, 200, 200, 404]
+    assert results[0]["todo"]["title"] == "Third"
+    assert results[2]["todo"]["title"] == "First updated"
+    assert results[2]["todo"]["completed"] is True
+
+    todos = client.get("/api/todos/", headers=headers).get_json()["todos"]
+    assert sorted(t["title"] for t in todos) == ["First updated", "Third"]
+
+
+def test_batch_ordered_rejects_invalid_operations(client):
+    headers = _login_headers(client)
+    resp = client.post(
+        "/api/todos/batch",
+        json={"operations": [
+            {"op": "create", "title": "Valid"},
+            {"op": "create", "title": "a" * 201},
+        ]},
+        headers=headers,
+    )
+    assert resp.status_code == 400
+    results = resp.get_json()["results"]
+    assert results[0]["status"] == 424
+    assert "less than 200 characters" in results[1]["error"]
+    assert client.get("/api/todos/", headers=headers).get_json()["todos"] == []
+
+
+def test_batch_unordered_applies_valid_operations(client):
+    headers = _login_headers(client)
+    resp = client.post(
+        "/api/todos/batch",
+        json={
+            "ordered": False,
+            "operations": [
+                {"op": "create", "title": "Valid"},
+                {"op": "delete", "id": "notanid"},
+                {"op": "explode"},
+            ],
+        },
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    results = resp.get_json()["results"]
+    assert results[0]["status"] == 201
+    assert results[1]["error"] == "Invalid todo ID"
+    assert results[2]["error"] == "Unknown operation"
+    assert len(client.get("/api/todos/", headers=headers).get_json()["todos"]) == 1
+
+
+def test_batch_cannot_touch_other_users_todos(client):
+    owner = _login_headers(client, "ownerUser")
+    todo = _create_todo(client, owner).get_json()["todo"]
+    intruder = _login_headers(client, "intruderUser")
+    resp = client.post(
+        "/api/todos/batch",
+        json={"operations": [{"op": "delete", "id": todo["_id"]}]},
+        headers=intruder,
+    )
+    assert resp.get_json()["results"][0]["status"] == 404
+    assert len(client.get("/api/todos/", headers=owner).get_json()["todos"]) == 1
+
+
+def test_batch_ordered_stops_at_missing_todo(client):
+    headers = _login_headers(client)
+    todo = _create_todo(client, headers, "Kept").get_json()["todo"]
+    resp = client.post(
+        "/api/todos/batch",
+        json={"operations": [
+            {"op": "create", "title": "Before"},
+            {"op": "toggle", "id": str(ObjectId())},
+            {"op": "create", "title": "After"},
+            {"op": "delete", "id": todo["_id"]},
+        ]},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    assert [r["status"] for r in resp.get_json()["results"]] == [201, 404, 424, 424]
+    todos = client.get("/api/todos/", headers=headers).get_json()["todos"]
+    assert sorted(t["title"] for t in todos) == ["Before", "Kept"]
+
+
+def test_update_data_must_be_an_object(client):
+    headers = _login_headers(client)
+    todo = _create_todo(client, headers).get_json()["todo"]
+    resp = client.post(
+        "/api/todos/batch",
+        json={"ordered": False, "operations": [
+            {"op": "update", "id": todo["_id"], "data": "title"},
+            {"op": "toggle", "id": todo["_id"]},
+        ]},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    results = resp.get_json()["results"]
+    assert (results[0]["status"], results[0]["error"]) == (400, "Update data must be an object")
+    assert results[1]["status"] == 200
+
+    resp = client.put(f"/api/todos/{todo['_id']}", json=["title"], headers=headers)
+    assert resp.status_code == 400
+    resp = client.post("/api/todos/batch", json=["operations"], headers=headers)
+    assert resp.status_code == 400
+
+
+def test_batch_requires_operations(client):
+    headers = _login_headers(client)
+    resp = client.post("/api/todos/batch", json={"operations": []}, headers=headers)
+    assert resp.status_code == 400
+    assert "required" in resp.get_json()["error"]
+
+
+def test_create_response_matches_stored_todo(client):
+    headers = _login_headers(client)
+    created = _create_todo(client, headers).get_json()["todo"]
+    listed = client.get("/api/todos/", headers=headers).get_json()["todos"][0]
+    assert created == listed
+
+
+def test_toggle_twice_restores_status(client):
+    headers = _login_headers(client)
+    todo = _create_todo(client, headers).get_json()["todo"]
+    first = client.patch(f"/api/todos/{todo['_id']}/toggle", headers=headers).get_json()["todo"]
+    second = client.patch(f"/api/todos/{todo['_id']}/toggle", headers=headers).get_json()["todo"]
+    assert first["completed"] is True
+    assert second["completed"] is False
+
+
+def test_toggle_other_users_todo_not_found(client):
+    owner = _login_headers(client, "ownerUser")
+    todo = _create_todo(client, owner).get_json()["todo"]
+    intruder = _login_headers(client, "intruderUser")
+    resp = client.patch(f"/api/todos/{todo['_id']}/toggle", headers=intruder)
+    assert resp.status_code == 404
+
+
+def test_list_todos_etag_not_modified(client, monkeypatch):
+    import backend.models as models
+
+    headers = _login_headers(client)
+    _create_todo(client, headers)
+    first = client.get("/api/todos/", headers=headers)
+    etag = first.headers["ETag"]
+    assert etag
+
+    def fail(*args, **kwargs):
+        raise AssertionError("todos must not be loaded for a 304")
+
+    monkeypatch.setattr(models.db, "get_user_todos_page", fail)
+    resp = client.get("/api/todos/", headers={**headers, "If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.headers["ETag"] == etag
+
+
+def test_list_todos_etag_changes_after_mutation(client):
+    headers = _login_headers(client)
+    todo = _create_todo(client, headers).get_json()["todo"]
+    etag = client.get("/api/todos/", headers=headers).headers["ETag"]
+
+    client.patch(f"/api/todos/{todo['_id']}/toggle", headers=headers)
+    resp = client.get("/api/todos/", headers={**headers, "If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+def test_list_todos_etag_depends_on_page(client):
+    headers = _login_headers(client)
+    _create_todo(client, headers)
+    etag = client.get("/api/todos/", headers=headers).headers["ETag"]
+    resp = client.get("/api/todos/?limit=1", headers={**headers, "If-None-Match": etag})
+    assert resp.status_code == 200
+
+
+def _read_events(resp):
+    body = "".join(
+        chunk.decode() if isinstance(chunk, bytes) else chunk for chunk in resp.response
+    )
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], fields.get("data")))
+    return events
+
+
+def test_todo_events_stream_mutations(client, app):
+    import json
+
+    app.config["EVENTS_MAX_STREAM_SECONDS"] = 0.2
+    app.config["EVENTS_HEARTBEAT_SECONDS"] = 0.05
+    headers = _login_headers(client)
+    other = _login_headers(client, "otherUser")
+
+    stream = client.get("/api/todos/events", headers=headers, buffered=False)
+    assert stream.mimetype == "text/event-stream"
+
+    todo = _create_todo(client, headers).get_json()["todo"]
+    client.patch(f"/api/todos/{todo['_id']}/toggle", headers=headers)
+    client.delete(f"/api/todos/{todo['_id']}", headers=headers)
+    _create_todo(client, other, "Not mine")
+
+    events = _read_events(stream)
+    assert [name for name, _ in events] == ["created", "toggled", "deleted"]
+    assert json.loads(events[1][1])["todo"]["completed"] is True
+    assert json.loads(events[2][1])["_id"] == todo["_id"]
+
+
+def test_todo_events_accept_stream_token_only(client, app):
+    app.config["EVENTS_MAX_STREAM_SECONDS"] = 0
+    headers = _login_headers(client)
+    access_token = headers["Authorization"].split()[1]
+    assert client.get(f"/api/todos/events?jwt={access_token}").status_code == 401
+    assert client.get(f"/api/todos/events?token={access_token}").status_code == 401
+
+    data = client.post("/api/todos/events/token", headers=headers).get_json()
+    assert data["expires_in"] == app.config["EVENTS_TOKEN_SECONDS"]
+    assert client.get(f"/api/todos/events?token={data['token']}").status_code == 200
+    # The stream token does not authorize anything else
+    assert client.get("/api/todos/", headers={"Authorization": f"Bearer {data['token']}"}).status_code == 422
+
+
+def test_todo_events_reject_expired_stream_token(client, app):
+    headers = _login_headers(client)
+    token = client.post("/api/todos/events/token", headers=headers).get_json()["token"]
+    app.config["EVENTS_TOKEN_SECONDS"] = -1
+    assert client.get(f"/api/todos/events?token={token}").status_code == 401
+
+
+def test_event_subscription_resyncs_after_overflow():
+    from backend.events import RESYNC, EventBroker
+
+    broker = EventBroker(source="inprocess")
+    subscription = broker.subscribe("slowuser")
+    for i in range(subscription.queue.maxsize + 1):
+        broker.publish("slowuser", "created", {"todo": {"n": i}})
+    assert subscription.get(timeout=0) == RESYNC
+    assert subscription.get(timeout=0) is None
+    subscription.close()
+    assert broker._subscribers == {}
+
+
+def test_deletes_are_published_locally_without_pre_images():
+    import threading
+    from types import SimpleNamespace
+    from backend.events import EventBroker
+
+    class Stream:
+        def __init__(self):
+            self.closed = threading.Event()
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def __iter__(self):
+            self.closed.wait(5)
+            return iter(())
+
+    def coll_mod(*args, **kwargs):
+        raise RuntimeError("no collMod on this server")
+
+    stream = Stream()
+    collection = SimpleNamespace(
+        name="todos", watch=lambda *a, **k: stream, database=SimpleNamespace(command=coll_mod)
+    )
+    broker = EventBroker(source="auto")
+    assert broker.start_change_stream(collection)
+    assert broker.delete_pre_images is False
+    subscription = broker.subscribe("alice")
+    broker.publish_local("alice", "updated", {"todo": {}})
+    broker.publish_local("alice", "deleted", {"_id": "1"})
+    event = subscription.get(timeout=0)
+    assert (event["type"], event["_id"]) == ("deleted", "1")
+    assert subscription.get(timeout=0) is None
+
+    # With pre-images the change stream reports deletes itself
+    broker.delete_pre_images = True
+    broker.publish_local("alice", "deleted", {"_id": "2"})
+    assert subscription.get(timeout=0) is None
+    broker._dispatch({
+        "operationType": "delete", "documentKey": {"_id": "2"},
+        "fullDocumentBeforeChange": {"_id": "2", "username": "alice"}
+    })
+    assert subscription.get(timeout=0)["_id"] == "2"
+    stream.closed.set()
+
+
+def test_change_stream_closes_with_last_subscriber():
+    import threading
+    from types import SimpleNamespace
+    from backend.events import EventBroker
+
+    class Stream:
+        def __init__(self):
+            self.closed = threading.Event()
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def __iter__(self):
+            self.closed.wait(5)
+            return iter(())
+
+        def close(self):
+            self.closed.set()
+
+    streams = []
+    coll_mods = []
+
+    def watch(*args, **kwargs):
+        streams.append(Stream())
+        return streams[-1]
+
+    collection = SimpleNamespace(
+        name="todos", watch=watch,
+        database=SimpleNamespace(command=lambda *a, **k: coll_mods.append(a))
+    )
+    broker = EventBroker(source="auto")
+    first = broker.subscribe("alice")
+    second = broker.subscribe("bob")
+    assert broker.start_change_stream(collection)
+    assert broker.start_change_stream(collection)
+    assert len(streams) == 1
+
+    first.close()
+    assert not streams[0].closed.is_set()
+    second.close()
+    assert streams[0].closed.is_set()
+    assert broker.change_stream_active is False
+
+    # The next subscriber reopens it; pre-images are only enabled once
+    third = broker.subscribe("alice")
+    assert broker.start_change_stream(collection)
+    assert len(streams) == 2
+    assert broker.delete_pre_images is True
+    assert len(coll_mods) == 1
+    third.close()
+    assert streams[1].closed.is_set()
+
+
+def test_changes_returns_everything_without_token(client):
+    headers = _login_headers(client)
+    first = _create_todo(client, headers, "First").get_json()["todo"]
+    _create_todo(client, headers, "Second")
+    _create_todo(client, _login_headers(client, "otherUser"), "Not mine")
+
+    resp = client.get("/api/todos/changes", headers=headers)
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert sorted(todo["title"] for todo in data["changes"]) == ["First", "Second"]
+    assert data["deleted"] == []
+    assert data["has_more"] is False
+    assert data["next_since"]
+    assert first["_id"] in [todo["_id"] for todo in data["changes"]]
+
+
+def test_changes_since_token_reports_updates_and_deletions(client, app):
+    app.config["SYNC_SAFETY_WINDOW_MS"] = 0
+    headers = _login_headers(client)
+    kept = _create_todo(client, headers, "Kept").get_json()["todo"]
+    removed = _create_todo(client, headers, "Removed").get_json()["todo"]
+    token = client.get("/api/todos/changes", headers=headers).get_json()["next_since"]
+
+    client.patch(f"/api/todos/{kept['_id']}/toggle", headers=headers)
+    client.delete(f"/api/todos/{removed['_id']}", headers=headers)
+
+    data = client.get(f"/api/todos/changes?since={token}", headers=headers).get_json()
+    assert [todo["_id"] for todo in data["changes"]] == [kept["_id"]]
+    assert data["changes"][0]["completed"] is True
+    assert data["deleted"] == [removed["_id"]]
+
+
+def test_changes_pages_through_equal_timestamps(client):
+    import backend.models as models
+    from datetime import datetime
+
+    headers = _login_headers(client)
+    stamp = datetime(2024, 1, 1)
+    models.todos_collection.insert_many([
+        {"username": "todoUser", "title": f"T{i}", "description": "", "completed": False,
+         "created_at": stamp, "updated_at": stamp}
+        for i in range(5)
+    ])
+
+    seen = []
+    token = None
+    while True:
+        path = "/api/todos/changes?limit=2" + (f"&since={token}" if token else "")
+        data = client.get(path, headers=headers).get_json()
+        seen.extend(todo["title"] for todo in data["changes"])
+        token = data["next_since"]
+        if not data["has_more"]:
+            break
+    assert sorted(seen) == [f"T{i}" for i in range(5)]
+
+
+def test_changes_rejects_invalid_token(client):
+    headers = _login_headers(client)
+    resp = client.get("/api/todos/changes?since=garbage", headers=headers)
+    assert resp.status_code == 400
+
+
+def test_changes_expired_token_requires_full_resync(client):
+    from backend.pagination import encode_position
+    from datetime import datetime
+
+    headers = _login_headers(client)
+    stale = datetime(2000, 1, 1)
+    token = encode_position(stale, ObjectId(), issued_at=stale)
+    resp = client.get(f"/api/todos/changes?since={token}", headers=headers)
+    assert resp.status_code == 410
+    assert resp.get_json()["full_resync"] is True
+
+
+def test_list_todos_sparse_fields(client):
+    headers = _login_headers(client)
+    _create_todo(client, headers, "First", "x" * 500)
+
+    resp = client.get("/api/todos/?fields=title,completed", headers=headers)
+    assert resp.status_code == 200
+    todo = resp.get_json()["todos"][0]
+    assert set(todo) == {"_id", "title", "completed"}
+
+
+def test_list_todos_sparse_fields_still_paginate(client):
+    headers = _login_headers(client)
+    for i in range(3):
+        _create_todo(client, headers, f"Todo {i}")
+
+    titles = []
+    cursor = None
+    while True:
+        path = "/api/todos/?fields=title&limit=2" + (f"&cursor={cursor}" if cursor else "")
+        data = client.get(path, headers=headers).get_json()
+        titles.extend(todo["title"] for todo in data["todos"])
+        assert all(set(todo) == {"_id", "title"} for todo in data["todos"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert sorted(titles) == ["Todo 0", "Todo 1", "Todo 2"]
+
+
+def test_list_todos_filter_completed(client):
+    headers = _login_headers(client)
+    done = _create_todo(client, headers, "Done").get_json()["todo"]
+    _create_todo(client, headers, "Open")
+    client.patch(f"/api/todos/{done['_id']}/toggle", headers=headers)
+
+    completed = client.get("/api/todos/?completed=true", headers=headers).get_json()["todos"]
+    pending = client.get("/api/todos/?completed=false", headers=headers).get_json()["todos"]
+    assert [todo["title"] for todo in completed] == ["Done"]
+    assert [todo["title"] for todo in pending] == ["Open"]
+
+
+def test_list_todos_sort(client):
+    import backend.models as models
+    from datetime import datetime, timedelta
+
+    headers = _login_headers(client)
+    start = datetime(2024, 1, 1)
+    models.todos_collection.insert_many([
+        {"username": "todoUser", "title": f"T{i}", "description": "", "completed": False,
+         "created_at": start + timedelta(minutes=i), "updated_at": start - timedelta(minutes=i)}
+        for i in range(3)
+    ])
+
+    def titles(sort):
+        data = client.get(f"/api/todos/?sort={sort}", headers=headers).get_json()
+        return [todo["title"] for todo in data["todos"]]
+
+    assert titles("-created_at") == ["T2", "T1", "T0"]
+    assert titles("created_at") == ["T0", "T1", "T2"]
+    assert titles("updated_at") == ["T2", "T1", "T0"]
+
+
+def test_list_todos_rejects_bad_query_params(client):
+    headers = _login_headers(client)
+    assert client.get("/api/todos/?fields=password", headers=headers).status_code == 400
+    assert client.get("/api/todos/?sort=title", headers=headers).status_code == 400
+    assert client.get("/api/todos/?completed=maybe", headers=headers).status_code == 400
+
+
+def test_stats_counts_todos(client):
+    headers = _login_headers(client)
+    done = _create_todo(client, headers, "Done").get_json()["todo"]
+    _create_todo(client, headers, "Open")
+    _create_todo(client, _login_headers(client, "otherUser"), "Not mine")
+    client.patch(f"/api/todos/{done['_id']}/toggle", headers=headers)
+
+    resp = client.get("/api/todos/stats", headers=headers)
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert (data["total"], data["completed"], data["open"]) == (2, 1, 1)
+    assert len(data["per_day"]) == 1
+    assert data["per_day"][0]["created"] == 2
+    assert data["per_day"][0]["completed"] == 1
+
+
+def test_stats_cache_invalidated_by_mutation(client, monkeypatch):
+    import backend.models as models
+
+    headers = _login_headers(client)
+    _create_todo(client, headers)
+    assert client.get("/api/todos/stats", headers=headers).get_json()["total"] == 1
+
+    calls = []
+    original = models.db.get_todo_stats
+    monkeypatch.setattr(models.db, "get_todo_stats", lambda *a, **k: calls.append(1) or original(*a, **k))
+    assert client.get("/api/todos/stats", headers=headers).get_json()["total"] == 1
+    assert calls == []
+
+    _create_todo(client, headers, "Second")
+    assert client.get("/api/todos/stats", headers=headers).get_json()["total"] == 2
+    assert calls == [1]
+
+
+def test_stats_rejects_bad_days(client):
+    headers = _login_headers(client)
+    assert client.get("/api/todos/stats?days=0", headers=headers).status_code == 400
+    assert client.get("/api/todos/stats?days=week", headers=headers).status_code == 400
@@ -9,6 +9,8 @@ const API_BASE_URL = process.env.REACT_APP_API_URL || (process.env.NODE_ENV ===
 function App() {
   const [user, setUser] = useState(null);
   const [todos, setTodos] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [newTodo, setNewTodo] = useState({ title: '', description: '' });
   const [loginForm, setLoginForm] = useState({ username: '', password: '' });
   const [registerForm, setRegisterForm] = useState({ username: '', password: '' });
@@ -27,6 +29,60 @@ function App() {
     }
   }, []);
 
+  // Apply change events pushed by the server so other tabs and devices stay in sync
+  useEffect(() => {
+    if (!user || typeof EventSource === 'undefined') return undefined;
+
+    let source = null;
+    let retryTimer = null;
+    let stopped = false;
+    const upsert = (event) => {
+      const { todo } = JSON.parse(event.data);
+      setTodos(prev => prev.some(t => t._id === todo._id)
+        ? prev.map(t => (t._id === todo._id ? todo : t))
+        : [todo, ...prev]);
+    };
+    const reconnect = () => {
+      if (!stopped) retryTimer = setTimeout(connect, 3000);
+    };
+    // EventSource cannot send the Authorization header, so the URL carries a
+    // short-lived stream token instead of the access token
+    const connect = async () => {
+      let token;
+      try {
+        const response = await axios.post(`${API_BASE_URL}/todos/events/token`);
+        token = response.data.token;
+      } catch (error) {
+        console.error('Error opening event stream:', error);
+        reconnect();
+        return;
+      }
+      if (stopped) return;
+      source = new EventSource(`${API_BASE_URL}/todos/events?token=${encodeURIComponent(token)}`);
+      source.addEventListener('created', upsert);
+      source.addEventListener('updated', upsert);
+      source.addEventListener('toggled', upsert);
+      source.addEventListener('deleted', (event) => {
+        const { _id } = JSON.parse(event.data);
+        setTodos(prev => prev.filter(t => t._id !== _id));
+      });
+      // The server dropped events for this stream; reload the list
+      source.addEventListener('resync', () => fetchTodos());
+      // The stream token has expired by the time the stream ends, so
+      // reconnect with a new one rather than let EventSource retry
+      source.onerror = () => {
+        source.close();
+        reconnect();
+      };
+    };
+    connect();
+    return () => {
+      stopped = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
+  }, [user]);
+
   const fetchUserProfile = async () => {
     try {
       const response = await axios.get(`${API_BASE_URL}/auth/profile`);
@@ -38,15 +94,35 @@ function App() {
     }
   };
 
+  // Load only the first page; later pages are fetched with "Load more"
   const fetchTodos = async () => {
     try {
       const response = await axios.get(`${API_BASE_URL}/todos/`);
       setTodos(response.data.todos);
+      setNextCursor(response.data.next_cursor || null);
     } catch (error) {
       console.error('Error fetching todos:', error);
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(`${API_BASE_URL}/todos/`, {
+        params: { cursor: nextCursor },
+      });
+      // Todos pushed by the event stream may already be in the list
+      setTodos(prev => prev.concat(
+        response.data.todos.filter(todo => !prev.some(t => t._id === todo._id))
+      ));
+      setNextCursor(response.data.next_cursor || null);
+    } catch (error) {
+      alert('Error loading todos: ' + (error.response?.data?.error || error.message));
+    }
+    setLoadingMore(false);
+  };
+
   const handleLogin = async (e) => {
     e.preventDefault();
     setLoading(true);
@@ -83,6 +159,7 @@ function App() {
     delete axios.defaults.headers.common['Authorization'];
     setUser(null);
     setTodos([]);
+    setNextCursor(null);
   };
 
   const handleAddTodo = async (e) => {
@@ -92,7 +169,8 @@ function App() {
     setLoading(true);
     try {
       const response = await axios.post(`${API_BASE_URL}/todos/`, newTodo);
-      setTodos([response.data.todo, ...todos]);
+      const created = response.data.todo;
+      setTodos(prev => [created, ...prev.filter(t => t._id !== created._id)]);
       setNewTodo({ title: '', description: '' });
     } catch (error) {
       alert('Error adding todo: ' + (error.response?.data?.error || error.message));
@@ -103,7 +181,7 @@ function App() {
   const handleToggleTodo = async (todoId) => {
     try {
       const response = await axios.patch(`${API_BASE_URL}/todos/${todoId}/toggle`);
-      setTodos(todos.map(todo => 
+      setTodos(prev => prev.map(todo => 
         todo._id === todoId ? response.data.todo : todo
       ));
     } catch (error) {
@@ -116,7 +194,7 @@ function App() {
     
     try {
       await axios.delete(`${API_BASE_URL}/todos/${todoId}`);
-      setTodos(todos.filter(todo => todo._id !== todoId));
+      setTodos(prev => prev.filter(todo => todo._id !== todoId));
     } catch (error) {
       alert('Error deleting todo: ' + (error.response?.data?.error || error.message));
     }
@@ -141,7 +219,7 @@ function App() {
     setLoading(true);
     try {
       const response = await axios.put(`${API_BASE_URL}/todos/${todoId}`, editForm);
-      setTodos(todos.map(todo => 
+      setTodos(prev => prev.map(todo => 
         todo._id === todoId ? response.data.todo : todo
       ));
       setEditingTodo(null);
@@ -328,6 +406,11 @@ function App() {
               ))}
             </div>
           )}
+          {nextCursor && (
+            <button onClick={handleLoadMore} className="load-more-btn" disabled={loadingMore}>
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
       </main>
     </div>
@@ -143,3 +143,26 @@ test('logout clears user and todos', async () => {
   await waitFor(() => expect(screen.getAllByText(/login/i).length).toBeGreaterThanOrEqual(1));
   expect(localStorage.getItem('token')).toBeNull();
 });
+
+test('loads the next page on demand', async () => {
+  localStorage.setItem('token', 'abc');
+  axios.get
+    .mockResolvedValueOnce(profileResponse)
+    .mockResolvedValueOnce({ data: { ...todosResponse.data, next_cursor: 'c1' } })
+    .mockResolvedValueOnce({
+      data: {
+        todos: [{ ...todosResponse.data.todos[0], _id: '2', title: 'Second todo' }],
+        next_cursor: null,
+      },
+    });
+
+  render(<App />);
+  await waitFor(() => expect(screen.getByText(/first todo/i)).toBeInTheDocument());
+  expect(axios.get).toHaveBeenCalledTimes(2);
+
+  fireEvent.click(screen.getByText(/load more/i));
+
+  await waitFor(() => expect(screen.getByText(/second todo/i)).toBeInTheDocument());
+  expect(axios.get).toHaveBeenLastCalledWith(expect.stringMatching(/\/todos\/$/), { params: { cursor: 'c1' } });
+  expect(screen.queryByText(/load more/i)).not.toBeInTheDocument();
+});